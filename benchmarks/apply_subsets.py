@@ -0,0 +1,80 @@
+"""Compare apply_subsets() with the loop that appends one subset at a time.
+
+This builds a data frame with one row per id and random, overlapping subsets
+and reports the time needed by the vectorized apply_subsets() and by the
+implementation it replaced. Run it from the repository root:
+
+    python benchmarks/apply_subsets.py --ids 100000 --subsets 10
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fractalis.analytics.tasks.shared import utils
+
+
+def synthetic_data(ids: int, subsets: int, rows_per_id: int) -> tuple:
+    """Random data and subsets that each contain half of the ids."""
+    rng = np.random.RandomState(0)
+    id_values = np.array(['sample_{}'.format(i) for i in range(ids)],
+                         dtype=object)
+    df = pd.DataFrame({
+        'id': np.tile(id_values, rows_per_id),
+        'feature': np.repeat(['feature_{}'.format(i)
+                              for i in range(rows_per_id)], ids),
+        'value': rng.normal(size=ids * rows_per_id)
+    })[['id', 'feature', 'value']]
+    subset_lists = [rng.choice(id_values, ids // 2, replace=False).tolist()
+                    for _ in range(subsets)]
+    return df, subset_lists
+
+
+def append_subsets(df: pd.DataFrame, subsets: list) -> pd.DataFrame:
+    """apply_subsets() the way it used to be implemented."""
+    if not subsets:
+        subsets = [df['id']]
+    _df = pd.DataFrame()
+    for i, subset in enumerate(subsets):
+        df_subset = df[df['id'].isin(subset)]
+        if not df_subset.shape[0]:
+            continue
+        subset_col = [i] * df_subset.shape[0]
+        df_subset = df_subset.assign(subset=subset_col)
+        _df = _df.append(df_subset)
+    if _df.shape[0] == 0:
+        raise ValueError("No data match given subsets.")
+    return _df
+
+
+def best_time(apply, df: pd.DataFrame, subsets: list, repeat: int) -> tuple:
+    """Return the best run time and the result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = apply(df, subsets)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--ids', type=int, default=100000)
+    parser.add_argument('--subsets', type=int, default=10)
+    parser.add_argument('--rows-per-id', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df, subsets = synthetic_data(args.ids, args.subsets, args.rows_per_id)
+    vectorized_time, expected = best_time(utils.apply_subsets, df, subsets,
+                                          args.repeat)
+    append_time, result = best_time(append_subsets, df, subsets,
+                                    args.repeat)
+    assert result.equals(expected)
+    print('{:<12} {:>10}'.format('subsets', 'time [s]'))
+    print('{:<12} {:>10.3f}'.format('append', append_time))
+    print('{:<12} {:>10.3f}'.format('vectorized', vectorized_time))
+    print('speedup: {:.1f}x'.format(append_time / vectorized_time))
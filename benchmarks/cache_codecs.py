@@ -0,0 +1,121 @@
+"""Compare the cache formats and compression codecs of the data cache.
+
+For every combination of format and codec this writes the data to a temporary
+file and reports the write time, the read time and the size on disk. Run it
+from the repository root:
+
+    python benchmarks/cache_codecs.py --codecs none gzip lz4 zstd:1 zstd:9
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from fractalis.data import encoding
+from fractalis.data.cache import CacheFormat
+from fractalis.data.etl import ETL
+from fractalis.analytics.task import AnalyticTask
+
+TCGA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'fractalis',
+                        'data', 'etls', 'demo_tcga_coad', 'data')
+# fields of the demo TCGA COAD data by data type
+TCGA_NUMERICAL = ['days_to_death', 'year_of_birth']
+TCGA_CATEGORICAL = ['gender', 'miR1269a_expression', 'race', 'tumor_stage']
+
+
+def tcga_data(fields: list, numerical: bool) -> pd.DataFrame:
+    """The given demo TCGA COAD fields in the long format, transformed like
+    the demo ETLs of their data type do."""
+    dfs = [pd.read_csv(os.path.join(TCGA_DIR, '{}.tsv'.format(field)),
+                       sep='\t', dtype=str) for field in fields]
+    df = pd.concat(dfs)
+    if numerical:
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+    return df.reset_index(drop=True)
+
+
+def synthetic_data(features: int, ids: int) -> pd.DataFrame:
+    """Random 'numerical_array' data with ADA-like ids."""
+    rng = np.random.RandomState(0)
+    id_values = np.array(['{:024x}'.format(i) for i in range(ids)],
+                         dtype=object)
+    feature_values = np.array(['gene_{}'.format(i) for i in range(features)],
+                              dtype=object)
+    return pd.DataFrame({
+        'id': np.tile(id_values, features),
+        'feature': np.repeat(feature_values, ids),
+        'value': rng.lognormal(size=features * ids)
+    }, columns=['id', 'feature', 'value'])
+
+
+def measure(write, read, file_path: str, repeat: int) -> tuple:
+    """Return the best write time, the best read time and the file size."""
+    write_times, read_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write(file_path)
+        write_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        read(file_path)
+        read_times.append(time.perf_counter() - start)
+    return min(write_times), min(read_times), os.path.getsize(file_path)
+
+
+def make_io(df: pd.DataFrame, format_name: str, codec: str) -> tuple:
+    """Return functions writing and reading df with the given format."""
+    if format_name == 'encrypted':
+        return (lambda path: ETL.secure_load(df, path, codec=codec),
+                lambda path: AnalyticTask.secure_load(path, codec=codec))
+    cache_format = CacheFormat.factory(format_name)
+    cache_format.codec = codec
+    return lambda path: cache_format.write(df, path), cache_format.read
+
+
+def run(name: str, df: pd.DataFrame, codecs: list, repeat: int) -> None:
+    print('\n{} ({} rows)'.format(name, df.shape[0]))
+    print('{:<10} {:<10} {:>10} {:>10} {:>12}'.format(
+        'format', 'codec', 'write [s]', 'read [s]', 'size [kB]'))
+    file_path = os.path.join(tempfile.mkdtemp(), 'cache')
+    combinations = [('pickle', codec) for codec in codecs] + \
+                   [('parquet', codec) for codec in codecs] + \
+                   [('feather', 'none')] + \
+                   [('encrypted', codec) for codec in codecs]
+    for format_name, codec in combinations:
+        write, read = make_io(df, format_name, codec)
+        # noinspection PyBroadException
+        try:
+            write_time, read_time, size = measure(write, read,
+                                                  file_path, repeat)
+        except Exception as e:
+            print('{:<10} {:<10} failed: {}'.format(format_name, codec, e))
+            continue
+        print('{:<10} {:<10} {:>10.3f} {:>10.3f} {:>12.0f}'.format(
+            format_name, codec, write_time, read_time, size / 1024))
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--codecs', nargs='+',
+                        default=['none', 'gzip', 'lz4', 'zstd:1', 'zstd:3',
+                                 'zstd:9'])
+    parser.add_argument('--features', type=int, default=2000)
+    parser.add_argument('--ids', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--encode', action='store_true',
+                        help='Dictionary encode the data first.')
+    args = parser.parse_args()
+    datasets = [('TCGA COAD demo numerical',
+                 tcga_data(TCGA_NUMERICAL, numerical=True)),
+                ('TCGA COAD demo categorical',
+                 tcga_data(TCGA_CATEGORICAL, numerical=False)),
+                ('synthetic numerical_array',
+                 synthetic_data(args.features, args.ids))]
+    for name, df in datasets:
+        run(name, encoding.encode(df) if args.encode else df,
+            args.codecs, args.repeat)
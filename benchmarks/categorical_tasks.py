@@ -0,0 +1,87 @@
+"""Compare the task pipeline on dictionary encoded and on decoded frames.
+
+Encoded caches are loaded with categorical id, feature and value columns.
+This builds such frames for several features and one categorical variable
+and reports the time the steps a boxplot task runs on its input need
+(concat(), apply_id_filter(), apply_subsets() and apply_categories()) when
+the frames are decoded to plain strings first, as load_value() used to do,
+and when they are handed over as they are. Run it from the repository root:
+
+    python benchmarks/categorical_tasks.py --ids 100000 --features 5
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fractalis.analytics.tasks.shared import utils
+from fractalis.data import encoding
+
+
+def synthetic_data(ids: int, features: int, subsets: int) -> tuple:
+    """Encoded features, an encoded category, an id filter and subsets."""
+    rng = np.random.RandomState(0)
+    id_values = np.array(['sample_{}'.format(i) for i in range(ids)],
+                         dtype=object)
+    dfs = [encoding.encode(pd.DataFrame({
+        'id': id_values,
+        'feature': 'feature_{}'.format(i),
+        'value': rng.normal(size=ids)
+    })[['id', 'feature', 'value']]) for i in range(features)]
+    category = encoding.encode(pd.DataFrame({
+        'id': id_values,
+        'feature': 'category',
+        'value': rng.choice(['a', 'b', 'c'], ids).astype(object)
+    })[['id', 'feature', 'value']])
+    id_filter = rng.choice(id_values, ids // 2, replace=False).tolist()
+    subset_lists = [rng.choice(id_filter, ids // 4, replace=False).tolist()
+                    for _ in range(subsets)]
+    return dfs, [category], id_filter, subset_lists
+
+
+def pipeline(dfs: list, categories: list, id_filter: list,
+             subsets: list) -> pd.DataFrame:
+    """The steps a boxplot task runs on its input."""
+    df = utils.concat(dfs)
+    df = utils.apply_id_filter(df=df, id_filter=id_filter)
+    df = utils.apply_subsets(df=df, subsets=subsets)
+    return utils.apply_categories(df=df, categories=categories)
+
+
+def decoded_pipeline(dfs: list, categories: list, id_filter: list,
+                     subsets: list) -> pd.DataFrame:
+    """The pipeline on input that was decoded like load_value() used to."""
+    return pipeline([encoding.decode(df) for df in dfs],
+                    [encoding.decode(df) for df in categories],
+                    id_filter, subsets)
+
+
+def best_time(apply, args: tuple, repeat: int) -> tuple:
+    """Return the best run time and the result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = apply(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--ids', type=int, default=100000)
+    parser.add_argument('--features', type=int, default=5)
+    parser.add_argument('--subsets', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = synthetic_data(args.ids, args.features, args.subsets)
+    encoded_time, result = best_time(pipeline, data, args.repeat)
+    decoded_time, expected = best_time(decoded_pipeline, data, args.repeat)
+    assert encoding.decode(result).equals(expected)
+    print('{:<12} {:>10}'.format('input', 'time [s]'))
+    print('{:<12} {:>10.3f}'.format('decoded', decoded_time))
+    print('{:<12} {:>10.3f}'.format('encoded', encoded_time))
+    print('speedup: {:.1f}x'.format(decoded_time / encoded_time))
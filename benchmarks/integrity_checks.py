@@ -0,0 +1,95 @@
+"""Compare the integrity checks of every data type.
+
+For every data type this builds synthetic data in the Fractalis format and
+reports the time needed by the checks the way they used to be implemented,
+by the current checks and by the checks in the sampling mode used for trusted
+sources. Run it from the repository root:
+
+    python benchmarks/integrity_checks.py --rows 20000000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fractalis.data.check import IntegrityCheck
+
+
+def synthetic_data(data_type: str, rows: int, encode: bool) -> pd.DataFrame:
+    """Random data of the given type with the given number of rows."""
+    rng = np.random.RandomState(0)
+    if data_type == 'numerical_array':
+        ids = 500
+        features = -(-rows // ids)
+        id_values = np.array(['sample_{}'.format(i) for i in range(ids)],
+                             dtype=object)
+        feature_values = np.array(['gene_{}'.format(i)
+                                   for i in range(features)], dtype=object)
+        df = pd.DataFrame({
+            'id': np.tile(id_values, features)[:rows],
+            'feature': np.repeat(feature_values, ids)[:rows],
+            'value': rng.lognormal(size=rows)
+        })
+    else:
+        df = pd.DataFrame({
+            'id': np.array(['sample_{}'.format(i) for i in range(rows)],
+                           dtype=object),
+            'feature': np.array(['feature'] * rows, dtype=object),
+        })
+        if data_type == 'numerical':
+            df['value'] = rng.lognormal(size=rows)
+        else:
+            df['value'] = np.array(['a', 'b', 'c'],
+                                   dtype=object)[rng.randint(3, size=rows)]
+    df = df[['id', 'feature', 'value']]
+    if encode:
+        for column in ['id', 'feature']:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def previous_check(data_type: str, data: pd.DataFrame) -> None:
+    """The uniqueness checks the way they used to be implemented."""
+    if data_type == 'numerical_array':
+        if data.groupby(['id', 'feature']).count().max().max() > 1:
+            raise ValueError()
+        return
+    if len(data['id'].unique().tolist()) != data.shape[0]:
+        raise ValueError()
+    if len(data['feature'].unique().tolist()) != 1:
+        raise ValueError()
+
+
+def best_time(check, data: pd.DataFrame, repeat: int) -> float:
+    """Return the best run time of the check."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        check(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000000)
+    parser.add_argument('--sample-size', type=int, default=100000)
+    parser.add_argument('--encode', action='store_true',
+                        help="Use categoricals for 'id' and 'feature'.")
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    print('{:<16} {:>10} {:>10} {:>10}'.format(
+        'data type', 'previous', 'full', 'sampled'))
+    for data_type in ['categorical', 'numerical', 'numerical_array']:
+        data = synthetic_data(data_type, args.rows, args.encode)
+        full = IntegrityCheck.factory(data_type)
+        sampled = IntegrityCheck.factory(data_type, args.sample_size)
+        times = [best_time(lambda df: previous_check(data_type, df),
+                           data, args.repeat),
+                 best_time(full.check, data, args.repeat),
+                 best_time(sampled.check, data, args.repeat)]
+        print('{:<16} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            data_type, *times))
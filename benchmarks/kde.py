@@ -0,0 +1,66 @@
+"""Compare the shared Gaussian KDE with scipy.stats.gaussian_kde().
+
+For every sample size this draws values from the given distribution and
+reports the time scipy and the shared KDE need to evaluate the density at the
+grid used by the histogram, together with the largest absolute error of the
+shared KDE relative to the highest density a Gaussian KDE with the same
+bandwidth can reach. Run it from the repository root:
+
+    python benchmarks/kde.py --sizes 1000 10000 100000 500000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import scipy.stats
+
+from fractalis.analytics.tasks.shared import kde
+
+
+def scipy_kde(values: np.ndarray, xs: np.ndarray,
+              bw_factor: float) -> np.ndarray:
+    """The KDE the way the histogram used to compute it."""
+    def bw(obj):
+        return np.power(obj.n, -1.0 / 5) * bw_factor
+    return scipy.stats.gaussian_kde(values, bw_method=bw)(xs)
+
+
+def best_time(estimate, values: np.ndarray, xs: np.ndarray,
+              bw_factor: float, repeat: int) -> tuple:
+    """Return the best run time and the result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = estimate(values, xs, bw_factor)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--distribution', default='lognormal',
+                        choices=['normal', 'lognormal', 'exponential'])
+    parser.add_argument('--bw-factor', type=float, default=0.5)
+    parser.add_argument('--points', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    print('{:>10} {:>10} {:>10} {:>10}'.format(
+        'values', 'scipy [s]', 'kde [s]', 'error'))
+    for size in args.sizes:
+        values = getattr(rng, args.distribution)(size=size)
+        xs = np.linspace(values.min(), values.max(), args.points)
+        scipy_time, expected = best_time(scipy_kde, values, xs,
+                                         args.bw_factor, args.repeat)
+        kde_time, result = best_time(kde.gaussian_kde, values, xs,
+                                     args.bw_factor, args.repeat)
+        peak = 1 / (np.sqrt(2 * np.pi) * kde.bandwidth(values,
+                                                       args.bw_factor))
+        error = np.abs(result - expected).max() / peak
+        print('{:>10} {:>10.4f} {:>10.4f} {:>10.1e}'.format(
+            size, scipy_time, kde_time, error))
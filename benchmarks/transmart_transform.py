@@ -0,0 +1,81 @@
+"""Compare the tranSMART hypercube transform with a row by row transform.
+
+This builds a synthetic highdim hypercube in the format returned by
+parse_observations() and reports the time needed by the vectorized
+transform_highdim() and by a transform that resolves the dimension elements
+cell by cell, like the tranSMART ETL used to. Run it from the repository root:
+
+    python benchmarks/transmart_transform.py --cells 5000000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from fractalis.data.etls.transmart import shared
+
+
+def synthetic_hypercube(cells: int, assays: int) -> dict:
+    """Random highdim hypercube with the given number of cells."""
+    rng = np.random.RandomState(0)
+    biomarkers = -(-cells // assays)
+    dimension_elements = {
+        'assay': [{'sampleCode': 'sample_{}'.format(i)}
+                  for i in range(assays)],
+        'biomarker': [{'label': 'gene_{}'.format(i)}
+                      for i in range(biomarkers)]
+    }
+    dimension_indexes = np.column_stack([
+        np.arange(cells) % assays,
+        np.arange(cells) // assays
+    ])
+    return {
+        'dimensionElements': dimension_elements,
+        'dimensionIndexes': dimension_indexes,
+        'values': rng.lognormal(size=cells)
+    }
+
+
+def row_by_row_transform(raw_data: dict) -> pd.DataFrame:
+    """The transform resolving the dimension elements for every cell."""
+    sample_idx = shared.get_dimension_index(raw_data, 'assay')
+    feature_idx = shared.get_dimension_index(raw_data, 'biomarker')
+    rows = []
+    for indexes, value in zip(raw_data['dimensionIndexes'],
+                              raw_data['values']):
+        sample = raw_data['dimensionElements']['assay'][indexes[sample_idx]]
+        feature = \
+            raw_data['dimensionElements']['biomarker'][indexes[feature_idx]]
+        rows.append([sample['sampleCode'], value, feature['label']])
+    return pd.DataFrame(rows, columns=['id', 'value', 'feature'])
+
+
+def best_time(transform, raw_data: dict, repeat: int) -> tuple:
+    """Return the best run time and the result of the transform."""
+    times = []
+    df = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = transform(raw_data)
+        times.append(time.perf_counter() - start)
+    return min(times), df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cells', type=int, default=5000000)
+    parser.add_argument('--assays', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    raw_data = synthetic_hypercube(args.cells, args.assays)
+    vectorized_time, expected = best_time(shared.transform_highdim,
+                                          raw_data, args.repeat)
+    row_time, df = best_time(row_by_row_transform, raw_data, args.repeat)
+    assert df.equals(expected)
+    print('{:<12} {:>10}'.format('transform', 'time [s]'))
+    print('{:<12} {:>10.2f}'.format('row by row', row_time))
+    print('{:<12} {:>10.2f}'.format('vectorized', vectorized_time))
+    print('speedup: {:.1f}x'.format(row_time / vectorized_time))
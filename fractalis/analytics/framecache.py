@@ -0,0 +1,146 @@
+"""This module provides FrameCache, a size-bounded LRU cache for the data
+frames loaded by analytic tasks.
+
+Every worker process has its own cache, so consecutive tasks working on the
+same data (e.g. a boxplot redrawn on every brush in the front-end) do not
+have to read and decompress the same file over and over again. The hits,
+misses and evictions of all caches are added up in redis and served by
+/misc/metrics.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from pandas import DataFrame
+
+from fractalis import redis
+
+logger = logging.getLogger(__name__)
+
+METRICS = ['hits', 'misses', 'evictions']
+FRAME_CACHE_METRICS_KEY = 'metrics:frame_cache'
+
+
+class FrameCache:
+    """LRU cache of data frames with a memory budget in bytes. Cached frames
+    are never handed out directly. get() always returns a copy, so tasks that
+    modify their input (e.g. via dropna(inplace=True)) cannot corrupt the
+    cache.
+    """
+
+    def __init__(self, max_size: int, metrics_key: str = None) -> None:
+        """
+        :param max_size: Memory budget in bytes. 0 disables the cache.
+        :param metrics_key: Redis hash the counters are added to. Not
+        recorded if None.
+        """
+        self.max_size = max_size
+        self.metrics_key = metrics_key
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames = OrderedDict()
+
+    @staticmethod
+    def frame_size(df: DataFrame) -> int:
+        """Estimate the memory consumed by the given data frame.
+        :param df: The data frame.
+        :return: The size in bytes.
+        """
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def get(self, key: Hashable, load: Callable[[], DataFrame]) -> DataFrame:
+        """Return a copy of the data frame cached for the given key. On a
+        miss the data frame is loaded with the given function and cached.
+        :param key: The cache key. Must change whenever the underlying
+        data change.
+        :param load: Function without arguments returning the data frame.
+        :return: A copy of the cached data frame.
+        """
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            self.record(hits=1)
+            logger.debug("Frame cache hit for '{}'. {}".format(
+                key, self.stats()))
+            return self._frames[key][0].copy()
+        self.misses += 1
+        evictions = self.evictions
+        df = load()
+        self.put(key, df)
+        self.record(misses=1, evictions=self.evictions - evictions)
+        logger.debug("Frame cache miss for '{}'. {}".format(key, self.stats()))
+        return df.copy() if key in self._frames else df
+
+    def put(self, key: Hashable, df: DataFrame) -> None:
+        """Add the data frame to the cache and evict the least recently used
+        entries until the cache fits into its budget again. Data frames that
+        exceed the whole budget are not cached at all.
+        :param key: The cache key.
+        :param df: The data frame to cache.
+        """
+        if self.max_size <= 0:
+            return
+        size = self.frame_size(df)
+        if size > self.max_size:
+            return
+        self.discard(key)
+        self._frames[key] = (df, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size) = self._frames.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Remove the entry with the given key if it exists.
+        :param key: The cache key.
+        """
+        if key in self._frames:
+            _, size = self._frames.pop(key)
+            self.size -= size
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        self._frames.clear()
+        self.size = self.hits = self.misses = self.evictions = 0
+
+    def record(self, **counts: int) -> None:
+        """Add the given counts to the totals of all caches. Metrics are nice
+        to have, so failing to record them does not fail the task.
+        :param counts: Count of every metric in METRICS to add.
+        """
+        if self.metrics_key is None:
+            return
+        try:
+            pipe = redis.pipeline()
+            for metric, count in counts.items():
+                if count:
+                    pipe.hincrby(self.metrics_key, metric, count)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Could not record frame cache metrics. "
+                           "{}".format(e))
+
+    def stats(self) -> dict:
+        """Return the counters of this cache.
+        :return: Dict with hits, misses, evictions, entries, size, max_size.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._frames),
+            'size': self.size,
+            'max_size': self.max_size
+        }
+
+
+def get_metrics() -> dict:
+    """Read the totals of the frame caches of all worker processes.
+    :return: Dict with the hits, misses and evictions.
+    """
+    totals = redis.hgetall(FRAME_CACHE_METRICS_KEY)
+    return {metric: int(totals.get(metric, 0)) for metric in METRICS}
@@ -1,27 +1,53 @@
 """This module provides AnalyticTask, which is a modification of a standard
 Celery task tailored to Fractalis."""
+import os
 import abc
 import json
 import re
+import pickle
 import logging
 from uuid import UUID
 from typing import List, Tuple, Union
 
-from pandas import read_pickle, DataFrame
+from pandas import DataFrame, concat
 from celery import Task
 from Cryptodome.Cipher import AES
 
 from fractalis import redis, app
+from fractalis.analytics.framecache import FrameCache, \
+    FRAME_CACHE_METRICS_KEY
+from fractalis.data import compression, encryption, feature_index, \
+    matrix, summary
+from fractalis.data.cache import CacheFormat
 from fractalis.utils import get_cache_encrypt_key
 
 logger = logging.getLogger(__name__)
 
+# frames loaded by the tasks of this worker process
+frame_cache = FrameCache(app.config['FRACTALIS_FRAME_CACHE_SIZE'],
+                         metrics_key=FRAME_CACHE_METRICS_KEY)
+
 
 class AnalyticTask(Task, metaclass=abc.ABCMeta):
     """AnalyticTask is a tailored Celery Task that enforces a certain pattern
     for all Fractalis analytic tasks and provides certain functionality like
     the parsing of the arguments before submitting it to celery.
     """
+
+    # The priority class decides the queue of the task, see
+    # FRACTALIS_TASK_QUEUES. Tasks that may run for minutes, for instance
+    # because they call R, should use 'heavy'.
+    priority_class = 'interactive'
+
+    # Arguments listed here are passed to main() as feature x id matrices
+    # instead of data frames in the id/feature/value format, if possible.
+    matrix_args = []
+
+    # The summaries (see fractalis.data.summary) of the matrices loaded for
+    # the current call by argument name. An entry is None if the matrix has
+    # no summary or has been filtered. Reset by prepare_args().
+    data_summaries = {}
+
     @property
     @abc.abstractmethod
     def name(self) -> str:
@@ -49,11 +75,26 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
         pass
 
     @staticmethod
-    def secure_load(file_path: str) -> DataFrame:
+    def secure_load(file_path: str, chunk_ids: List[int] = None,
+                    codec: str = 'none') -> DataFrame:
         """Decrypt data so they can be loaded into a pandas data frame.
         :param file_path: The location of the encrypted file.
+        :param chunk_ids: Decrypt only these chunks. All if None. Files
+        written before the cache was encrypted in chunks are always
+        decrypted as a whole.
+        :param codec: The codec the chunks have been compressed with.
         :return: The decrypted file loaded into a pandas data frame.
         """
+        if encryption.is_chunked(file_path):
+            key = encryption.derive_key(app.config['SECRET_KEY'])
+            # we still need a frame with the right columns
+            empty = chunk_ids is not None and not chunk_ids
+            chunks = encryption.read_chunks(file_path, key,
+                                            [0] if empty else chunk_ids)
+            df = concat([pickle.loads(compression.decompress(chunk, codec))
+                         for chunk in chunks])
+            return df[:0] if empty else df
+        # files written before the cache was encrypted in chunks
         key = get_cache_encrypt_key(app.config['SECRET_KEY'])
         with open(file_path, 'rb') as f:
             nonce, tag, ciphertext = [f.read(x) for x in (16, 16, -1)]
@@ -66,7 +107,8 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
 
     def data_task_id_to_data_frame(
             self, data_task_id: str,
-            session_data_tasks: List[str], decrypt: bool) -> DataFrame:
+            session_data_tasks: List[str], decrypt: bool,
+            columns: List[str] = None, filters: dict = None) -> DataFrame:
         """Attempts to load the data frame associated with the provided data id
         :param data_task_id: The data id associated with the previously loaded
         data.
@@ -74,8 +116,107 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
         this the requesting session. This is used for permission checks.
         :param decrypt: Specify whether the data have to be decrypted for usage
         only part of the data, for instance some genes out of thousands.
+        :param columns: Load only these columns. All if None.
+        :param filters: The filters to apply to the data. If the data have a
+        feature index, only the parts of the file containing the requested
+        features are read.
         :return: A pandas data frame associated with the data id.
         """
+        data_state = self.get_data_state(data_task_id, session_data_tasks)
+        file_path = data_state['file_path']
+        row_groups = None
+        index = None
+        if filters and filters.get('feature'):
+            key = encryption.derive_key(app.config['SECRET_KEY']) \
+                if decrypt else None
+            index = feature_index.read(file_path, key)
+            if index is not None:
+                row_groups = feature_index.row_groups(
+                    index, filters['feature'])
+
+        def load() -> DataFrame:
+            # data states created before codecs were configurable do not
+            # specify one. Encrypted files were uncompressed back then.
+            codec = data_state.get('codec', 'none' if decrypt else 'gzip')
+            if decrypt:
+                df = self.secure_load(file_path, row_groups, codec)
+                return df if columns is None else df[columns]
+            # data states created before formats were configurable
+            # do not specify one and are always gzipped pickles
+            cache_format = CacheFormat.factory(
+                data_state.get('format', 'pickle'))
+            cache_format.codec = codec
+            if index is not None:
+                cache_format.row_group_size = index['row_group_size']
+            return cache_format.read(file_path, columns=columns,
+                                     row_groups=row_groups)
+
+        # the file version makes sure we never hand out outdated data
+        stat = os.stat(file_path)
+        key = (data_task_id, stat.st_mtime_ns, stat.st_size,
+               tuple(columns) if columns is not None else None,
+               tuple(row_groups) if row_groups is not None else None,
+               decrypt)
+        df = frame_cache.get(key, load)
+        if filters:
+            df = self.apply_filters(df, filters)
+        return df
+
+    def data_task_id_to_matrix(
+            self, data_task_id: str, session_data_tasks: List[str],
+            decrypt: bool, filters: Union[dict, None]) -> DataFrame:
+        """Attempts to load the feature x id matrix stored for the provided
+        data id. The matrix is memory mapped, so only the requested rows are
+        read from disk. If no matrix is available this falls back to the
+        data frame in the id/feature/value format.
+        :param data_task_id: The data id associated with the previously loaded
+        data.
+        :param session_data_tasks: A list of data tasks previously executed by
+        this the requesting session. This is used for permission checks.
+        :param decrypt: Specify whether the data have to be decrypted.
+        :param filters: The filters to apply to the data.
+        :return: A matrix or a data frame associated with the data id.
+        """
+        filters = filters or {}
+        data_state = self.get_data_state(data_task_id, session_data_tasks)
+        file_path = data_state['file_path']
+        if (not decrypt and matrix.exists(file_path) and
+                set(filters.keys()) <= {'id', 'feature'}):
+            return matrix.read(file_path,
+                               features=filters.get('feature') or None,
+                               ids=filters.get('id') or None)
+        return self.data_task_id_to_data_frame(
+            data_task_id, session_data_tasks, decrypt, filters=filters)
+
+    def data_task_id_to_summary(
+            self, data_task_id: str, session_data_tasks: List[str],
+            decrypt: bool, filters: Union[dict, None]) -> Union[dict, None]:
+        """Attempts to load the summaries stored for the matrix of the provided
+        data id. Summaries describe the complete data, so there are none if
+        the data are filtered.
+        :param data_task_id: The data id associated with the previously loaded
+        data.
+        :param session_data_tasks: A list of data tasks previously executed by
+        this the requesting session. This is used for permission checks.
+        :param decrypt: Specify whether the data have to be decrypted.
+        :param filters: The filters to apply to the data.
+        :return: The feature and id summaries or None.
+        """
+        if decrypt or (filters and any(filters.values())):
+            return None
+        data_state = self.get_data_state(data_task_id, session_data_tasks)
+        return summary.read(data_state['file_path'])
+
+    def get_data_state(self, data_task_id: str,
+                       session_data_tasks: List[str]) -> dict:
+        """Check whether the data associated with the given id can be used
+        in the analysis and return its data state.
+        :param data_task_id: The data id associated with the previously loaded
+        data.
+        :param session_data_tasks: A list of data tasks previously executed by
+        this the requesting session. This is used for permission checks.
+        :return: The data state stored in redis.
+        """
         if data_task_id not in session_data_tasks:
             error = "No permission to use data_task_id '{}' " \
                     "for analysis".format(data_task_id)
@@ -95,12 +236,7 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
                     "analysis task.".format(data_task_id)
             logger.error(error)
             raise ValueError(error)
-        file_path = data_state['file_path']
-        if decrypt:
-            return self.secure_load(file_path)
-        else:
-            df = read_pickle(file_path, compression='gzip')
-        return df
+        return data_state
 
     @staticmethod
     def apply_filters(df: DataFrame, filters: dict) -> DataFrame:
@@ -152,6 +288,27 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
             data_task_id = None
         return data_task_id, filters
 
+    def load_value(self, arg: str, value: str,
+                   session_data_tasks: List[str], decrypt: bool) -> DataFrame:
+        """Load the data referenced by a single data task id argument.
+        :param arg: The name of the argument.
+        :param value: A string that contains a data task id.
+        :param session_data_tasks: We use this list to check access.
+        :param decrypt: Indicates whether cache must be decrypted to be used.
+        :return: The data, filtered according to the argument.
+        """
+        data_task_id, filters = self.parse_value(value)
+        if arg in self.matrix_args:
+            self.data_summaries.setdefault(arg, []).append(
+                self.data_task_id_to_summary(
+                    data_task_id, session_data_tasks, decrypt, filters))
+            return self.data_task_id_to_matrix(
+                data_task_id, session_data_tasks, decrypt, filters)
+        # encoded columns are handed to the task as they are. Task code
+        # must accept categorical as well as plain string columns.
+        return self.data_task_id_to_data_frame(
+            data_task_id, session_data_tasks, decrypt, filters=filters)
+
     def prepare_args(self, session_data_tasks: List[str],
                      args: dict, decrypt: bool) -> dict:
         """Replace data task ids in the arguments with their associated
@@ -162,31 +319,21 @@ class AnalyticTask(Task, metaclass=abc.ABCMeta):
         :param decrypt: Indicates whether cache must be decrypted to be used.
         :return: The new parsed arguments
         """
+        self.data_summaries = {}
         parsed_args = {}
         for arg in args:
             value = args[arg]
 
             # value is data id
             if self.contains_data_task_id(value):
-                data_task_id, filters = self.parse_value(value)
-                df = self.data_task_id_to_data_frame(
-                    data_task_id, session_data_tasks, decrypt)
-                if filters:
-                    df = self.apply_filters(df, filters)
-                value = df
+                value = self.load_value(arg, value,
+                                        session_data_tasks, decrypt)
 
             # value is list containing data ids
             if (isinstance(value, list) and
                     value and self.contains_data_task_id(value[0])):
-                dfs = []
-                for el in value:
-                    data_task_id, filters = self.parse_value(el)
-                    df = self.data_task_id_to_data_frame(
-                        data_task_id, session_data_tasks, decrypt)
-                    if filters:
-                        df = self.apply_filters(df, filters)
-                    dfs.append(df)
-                value = dfs
+                value = [self.load_value(arg, el, session_data_tasks, decrypt)
+                         for el in value]
 
             parsed_args[arg] = value
 
@@ -1,14 +1,13 @@
 """Module containing the Celery task for Boxplot statistics."""
 
 from typing import List, TypeVar
-from functools import reduce
 
 import pandas as pd
 import numpy as np
 import scipy.stats
 
 from fractalis.analytics.task import AnalyticTask
-from fractalis.analytics.tasks.shared import utils
+from fractalis.analytics.tasks.shared import utils, kde
 
 
 T = TypeVar('T')
@@ -40,43 +39,57 @@ class BoxplotTask(AnalyticTask):
             raise ValueError("Must at least specify one "
                              "non empty numerical feature.")
         # merge dfs into single one
-        df = reduce(lambda l, r: l.append(r), features)
+        df = utils.concat(features)
         df = utils.apply_transformation(df=df, transformation=transformation)
         df.dropna(inplace=True)
         df = utils.apply_id_filter(df=df, id_filter=id_filter)
         df = utils.apply_subsets(df=df, subsets=subsets)
         df = utils.apply_categories(df=df, categories=categories)
-        df['outlier'] = None
         results = {
             'statistics': {},
             'features': df['feature'].unique().tolist(),
             'categories': df['category'].unique().tolist(),
             'subsets': df['subset'].unique().tolist()
         }
+        # sort all values once by group (feature, subset and category in
+        # order of appearance) and value. Ids without category are ignored.
+        key = np.zeros(df.shape[0], dtype=np.int64)
+        for column, uniques in [('feature', results['features']),
+                                ('subset', results['subsets']),
+                                ('category', results['categories'])]:
+            uniques = pd.Index(uniques, dtype=object)
+            key = key * len(uniques) + utils.index_positions(uniques,
+                                                             df[column])
+        key[df['category'].isnull().values] = -1
+        values = df['value'].values.astype(np.float64)
+        order = np.lexsort((values, key))
+        order = order[key[order] >= 0]
+        sorted_values = values[order]
+        _, starts, counts = np.unique(key[order], return_index=True,
+                                      return_counts=True)
+        quartiles = [self.percentiles(sorted_values, starts, counts, q)
+                     for q in (25, 50, 75)]
+        outlier = np.full(df.shape[0], None, dtype=object)
         group_values = []
-        for feature in results['features']:
-            for subset in results['subsets']:
-                for category in results['categories']:
-                    values = df[(df['subset'] == subset) &
-                                (df['category'] == category) &
-                                (df['feature'] == feature)]['value'].tolist()
-                    if len(values) < 2:
-                        continue
-                    # FIXME: v This is ugly. Look at kaplan_meier_survival.py
-                    label = '{}//{}//s{}'.format(feature, category, subset + 1)
-                    group_values.append(values)
-                    stats = self.boxplot_statistics(values)
-                    u_outliers = np.array(values) > stats['u_wsk']
-                    l_outliers = np.array(values) < stats['l_wsk']
-                    outliers = np.bitwise_or(u_outliers, l_outliers)
-                    df.loc[(df['subset'] == subset) &
-                           (df['category'] == category) &
-                           (df['feature'] == feature), 'outlier'] = outliers
-                    kde = scipy.stats.gaussian_kde(values)
-                    xs = np.linspace(start=stats['l_wsk'],
-                                     stop=stats['u_wsk'], num=100)
-                    stats['kde'] = kde(xs).tolist()
-                    results['statistics'][label] = stats
+        for i, (start, count) in enumerate(zip(starts, counts)):
+            if count < 2:
+                continue
+            rows = order[start:start + count]
+            values = sorted_values[start:start + count]
+            feature, subset, category = df.iloc[rows[0]][
+                ['feature', 'subset', 'category']]
+            # FIXME: v This is ugly. Look at kaplan_meier_survival.py
+            label = '{}//{}//s{}'.format(feature, category, subset + 1)
+            group_values.append(values)
+            stats = self.boxplot_statistics(
+                values, *[quartile[i] for quartile in quartiles])
+            outlier[rows] = (values > stats['u_wsk']) | \
+                (values < stats['l_wsk'])
+            xs = np.linspace(start=stats['l_wsk'],
+                             stop=stats['u_wsk'], num=100)
+            stats['kde'] = kde.gaussian_kde(values, xs).tolist()
+            results['statistics'][label] = stats
+        df['outlier'] = outlier
         results['data'] = df.to_json(orient='records')
         f_value, p_value = scipy.stats.f_oneway(*group_values)
         results['anova'] = {
@@ -86,21 +99,41 @@ class BoxplotTask(AnalyticTask):
         return results
 
     @staticmethod
-    def boxplot_statistics(values: List[float]) -> dict:
+    def percentiles(sorted_values: np.ndarray, starts: np.ndarray,
+                    counts: np.ndarray, q: float) -> np.ndarray:
+        """Compute the given percentile of many groups at once. Interpolates
+        linearly, just like np.percentile().
+        :param sorted_values: The values of all groups, sorted within every
+        group.
+        :param starts: The position of the first value of every group.
+        :param counts: The number of values of every group.
+        :param q: The percentile between 0 and 100.
+        :return: The percentile of every group.
+        """
+        position = (counts - 1) * (q / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, counts - 1)
+        weight = position - below
+        return sorted_values[starts + below] * (1 - weight) + \
+            sorted_values[starts + above] * weight
+
+    @staticmethod
+    def boxplot_statistics(values: np.ndarray, l_qrt: float, median: float,
+                           u_qrt: float) -> dict:
         """Compute boxplot statistics for the given values.
-        :param values: A one dimensional list of numbers.
+        :param values: A sorted one dimensional array of numbers.
+        :param l_qrt: The lower quartile of the values.
+        :param median: The median of the values.
+        :param u_qrt: The upper quartile of the values.
         :return: A dictionary containing all important boxplot statistics.
         """
-        l_qrt = np.percentile(values, 25)
-        median = np.percentile(values, 50)
-        u_qrt = np.percentile(values, 75)
         iqr = u_qrt - l_qrt
-        values = sorted(values)
-        # lower whisker as defined by John W. Tukey
-        l_wsk = next(value for value in values if value >= l_qrt - 1.5 * iqr)
-        values = values[::-1]
-        # upper whisker as defined by John W. Tukey
-        u_wsk = next(value for value in values if value <= u_qrt + 1.5 * iqr)
+        # whiskers as defined by John W. Tukey: the most extreme values
+        # within 1.5 IQR of the quartiles
+        l_wsk = values[np.searchsorted(values, l_qrt - 1.5 * iqr,
+                                       side='left')]
+        u_wsk = values[np.searchsorted(values, u_qrt + 1.5 * iqr,
+                                       side='right') - 1]
         return {
             'l_qrt': l_qrt,
             'median': median,
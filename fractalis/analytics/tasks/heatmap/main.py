@@ -1,11 +1,12 @@
 """Module containing analysis code for heatmap analytics."""
 
-from typing import List, TypeVar
-from functools import reduce
+from typing import List, TypeVar, Union
 import logging
 
 import pandas as pd
+import numpy as np
 
+from fractalis import app
 from fractalis.analytics.task import AnalyticTask
 from fractalis.analytics.tasks.shared import utils, array_stats
 
@@ -19,6 +20,9 @@ class HeatmapTask(AnalyticTask):
     submittable celery task."""
 
     name = 'compute-heatmap'
+    # the statistics are computed with limma or DESeq2 in R
+    priority_class = 'heavy'
+    matrix_args = ['numerical_arrays']
 
     def main(self, numerical_arrays: List[pd.DataFrame],
              numericals: List[pd.DataFrame],
@@ -28,60 +32,71 @@ class HeatmapTask(AnalyticTask):
              id_filter: List[T],
              max_rows: int,
              subsets: List[List[T]]) -> dict:
-        # merge input data into single df
-        df = reduce(lambda a, b: a.append(b), numerical_arrays)
+        # merge input data into single matrix
+        df = utils.to_matrix(numerical_arrays)
         if not subsets:
             # empty subsets equals all samples in one subset
-            subsets = [df['id'].unique().tolist()]
+            subsets = [utils.get_ids(df)]
         else:
-            # if subsets are defined we drop the rows that are not part of one
+            # if subsets are defined we drop the ids that are not part of one
             flattened_subsets = [x for subset in subsets for x in subset]
-            df = df[df['id'].isin(flattened_subsets)]
+            df = utils.apply_id_filter(df=df, id_filter=flattened_subsets)
         # apply id filter
         df = utils.apply_id_filter(df=df, id_filter=id_filter)
+        summary = None
+        if ranking_method in ['mean', 'median', 'variance']:
+            summary = self.get_feature_summary(df)
+        if summary is None:
+            # drop features without any value for the remaining ids
+            df = utils.drop_empty_features(df)
+        else:
+            # the same as drop_empty_features() but without reading the data
+            summary = summary[summary['count'] > 0]
         # drop subset ids that are not in the df
         subsets = utils.drop_unused_subset_ids(df=df, subsets=subsets)
         # make sure the input data are still valid after the pre-processing
-        if df.shape[0] < 1:
+        num_features = df.shape[0] if summary is None else summary.shape[0]
+        if num_features < 1 or df.shape[1] < 1:
             error = "Either the input data set is too small or " \
                     "the subset sample ids do not match the data."
             logger.error(error)
             raise ValueError(error)
 
-        # make matrix of input data
-        df = df.pivot(index='feature', columns='id', values='value')
-
-        # create z-score matrix used for visualising the heatmap
-        z_df = [(df.iloc[i] - df.iloc[i].mean()) / df.iloc[i].std(ddof=0)
-                for i in range(df.shape[0])]
-        z_df = pd.DataFrame(z_df, columns=df.columns, index=df.index)
-
-        method = 'limma'
+        method = app.config['FRACTALIS_LIMMA_METHOD']
         if ranking_method in ['mean', 'median', 'variance']:
             method = ranking_method
         # compute statistic for ranking
-        stats = array_stats.get_stats(df=df, subsets=subsets,
-                                      params=params,
-                                      ranking_method=method)
-
-        # sort by ranking_value
-        self.sort(df, stats[ranking_method], ranking_method)
-        self.sort(z_df, stats[ranking_method], ranking_method)
-        self.sort(stats, stats[ranking_method], ranking_method)
-
-        # discard rows according to max_rows
-        df = df[:max_rows]
-        z_df = z_df[:max_rows]
-        stats = stats[:max_rows]
-
-        # prepare output for front-end
-        df['feature'] = df.index
-        z_df['feature'] = z_df.index
-        df = pd.melt(df, id_vars='feature', var_name='id')
-        z_df = pd.melt(z_df, id_vars='feature', var_name='id')
-        df = df.merge(z_df, on=['id', 'feature'])
-        df.rename(columns={'value_x': 'value', 'value_y': 'zscore'},
-                  inplace=True)
+        if summary is None:
+            stats = array_stats.get_stats(df=df, subsets=subsets,
+                                          params=params,
+                                          ranking_method=method)
+        else:
+            stats = pd.DataFrame({method: summary[method].values,
+                                  'feature': summary.index.values},
+                                 columns=[method, 'feature'])
+
+        # keep the max_rows best ranking features, best first
+        rows = self.rank(stats[ranking_method].values, ranking_method,
+                         max_rows)
+        stats = stats.iloc[rows]
+        # only the remaining features have to be read
+        df = df.loc[stats['feature'].tolist()]
+
+        # create z-score matrix used for visualising the heatmap
+        values = df.values.astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_values = (values - np.nanmean(values, axis=1, keepdims=True)) \
+                / np.nanstd(values, axis=1, keepdims=True)
+
+        # prepare output for front-end: one row per id and feature, in the
+        # order pd.melt() would create them
+        num_features, num_ids = values.shape
+        df = pd.DataFrame({
+            'feature': np.tile(df.index.values, num_ids),
+            'id': np.repeat(df.columns.values, num_features),
+            'value': values.ravel(order='F'),
+            'zscore': z_values.ravel(order='F')
+        }, columns=['feature', 'id', 'value', 'zscore'])
         df = utils.apply_subsets(df, subsets)
 
         return {
@@ -89,13 +104,49 @@ class HeatmapTask(AnalyticTask):
             'stats': stats.to_dict(orient='list')
         }
 
+    def get_feature_summary(
+            self, df: pd.DataFrame) -> Union[pd.DataFrame, None]:
+        """Return the feature summary computed when the data were loaded, if
+        the given matrix still contains the complete data of a single
+        numerical array. See fractalis.data.summary.
+        :param df: The matrix after all ids have been filtered.
+        :return: The feature summary or None if it does not apply.
+        """
+        summaries = self.data_summaries.get('numerical_arrays', [])
+        if len(summaries) != 1 or summaries[0] is None:
+            return None
+        feature_summary = summaries[0]['feature']
+        num_ids = summaries[0]['id'].shape[0]
+        if df.shape != (feature_summary.shape[0], num_ids):
+            return None
+        return feature_summary
+
     @staticmethod
-    def sort(df, order, method):
-        order = order.tolist()
+    def rank(values: np.ndarray, method: str, max_rows: int) -> np.ndarray:
+        """Find the features with the highest ranking without sorting all of
+        them. P-values rank in ascending order, logFC and t by their absolute
+        value and all other statistics in descending order. Ties keep their
+        original order and NaN ranks last.
+        :param values: The ranking statistic of every feature.
+        :param method: The name of the ranking statistic.
+        :param max_rows: The maximum number of features to return.
+        :return: The positions of the best features, best first.
+        """
         if method == 'P.Value' or method == 'adj.P.Val':
-            order = [1 - x for x in order]
+            keys = -np.asarray(values, dtype=np.float64)
         elif method == 'logFC' or method == 't':
-            order = [abs(x) for x in order]
-        df['sort_value'] = order
-        df.sort_values('sort_value', ascending=False, inplace=True)
-        df.drop('sort_value', axis=1, inplace=True)
+            keys = np.abs(np.asarray(values, dtype=np.float64))
+        else:
+            keys = np.asarray(values, dtype=np.float64)
+        nans = np.isnan(keys)
+        rows = np.flatnonzero(~nans)
+        if max_rows < rows.shape[0]:
+            # the value of the last feature that makes the cut
+            kth = keys[rows][np.argpartition(
+                -keys[rows], max_rows - 1)[max_rows - 1]]
+            above = keys[rows] > kth
+            ties = np.flatnonzero(keys[rows] == kth)
+            above[ties[:max_rows - np.count_nonzero(above)]] = True
+            rows = rows[above]
+        rows = rows[np.argsort(-keys[rows], kind='mergesort')]
+        return np.append(rows, np.flatnonzero(nans))[:max_rows]
@@ -2,15 +2,13 @@
 histogram."""
 
 import logging
-from functools import partial
 from typing import List
 
 import pandas as pd
 import numpy as np
-import scipy.stats
 
 from fractalis.analytics.task import AnalyticTask
-from fractalis.analytics.tasks.shared import utils
+from fractalis.analytics.tasks.shared import utils, kde
 
 
 logger = logging.getLogger(__name__)
@@ -63,15 +61,10 @@ class HistogramTask(AnalyticTask):
                 mean = np.mean(values)
                 median = np.median(values)
                 std = np.std(values)
-
-                def bw(obj, fac):
-                    return np.power(obj.n, -1.0 / (obj.d + 4)) * fac
-
-                kde = scipy.stats.gaussian_kde(
-                    values, bw_method=partial(bw, fac=bw_factor))
                 xs = np.linspace(
                     start=np.min(values), stop=np.max(values), num=200)
-                dist = kde(xs).tolist()
+                dist = kde.gaussian_kde(values.values, xs,
+                                        bw_factor=bw_factor).tolist()
                 if not stats.get(category):
                     stats[category] = {}
                 stats[category][subset] = {
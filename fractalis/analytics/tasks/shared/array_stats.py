@@ -7,15 +7,11 @@ import logging
 
 import pandas as pd
 import numpy as np
-from rpy2 import robjects as robj
-from rpy2.robjects import r, pandas2ri
-from rpy2.robjects.packages import importr
+
+from fractalis.analytics.tasks.shared import limma, rpool
 
 
 T = TypeVar('T')
-importr('limma')
-importr('DESeq2')
-pandas2ri.activate()
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +25,8 @@ def get_stats(df: pd.DataFrame, subsets: List[List[T]],
         stats = get_variance_stats(df)
     elif ranking_method == 'limma':
         stats = get_limma_stats(df, subsets)
+    elif ranking_method == 'limma_numpy':
+        stats = limma.get_limma_stats(df, subsets)
     elif ranking_method == 'DESeq2':
         stats = get_deseq2_stats(df, subsets, **params)
     else:
@@ -84,7 +82,6 @@ def get_limma_stats(df: pd.DataFrame, subsets: List[List[T]]) -> pd.DataFrame:
     flattened_subsets = [x for subset in subsets for x in subset]
     df = df[flattened_subsets]
     ids = list(df)
-    features = df.index
 
     # creating the design vector according to the subsets
     design_vector = [''] * len(ids)
@@ -110,6 +107,24 @@ def get_limma_stats(df: pd.DataFrame, subsets: List[List[T]]) -> pd.DataFrame:
         for j in range(i):
             comparisons.append('group{}-group{}'.format(i+1, j+1))
 
+    return rpool.run(fit_limma, df, design_vector, groups, comparisons)
+
+
+def fit_limma(df: pd.DataFrame, design_vector: List[str], groups: List[str],
+              comparisons: List[str]) -> pd.DataFrame:
+    """Run the R part of get_limma_stats(). Must be called in an R worker,
+    see rpool.
+    :param df: Matrix of measurements with one column per sample and group.
+    :param design_vector: The group of every column, starting at '1'.
+    :param groups: The name of every group.
+    :param comparisons: The contrasts to compute, e.g. 'group2-group1'.
+    :return: Results of limma analysis. See get_limma_stats().
+    """
+    from rpy2 import robjects as robj
+    from rpy2.robjects import r, pandas2ri
+    ids = list(df)
+    features = df.index
+
     # fitting according to limma doc Chapter 8: Linear Models Overview
     r_form = robj.Formula('~ 0+factor(c({}))'.format(','.join(design_vector)))
     r_design = r['model.matrix'](r_form)
@@ -164,6 +179,19 @@ def get_deseq2_stats(df: pd.DataFrame,
     total_row_counts = df.sum(axis=1)
     keep = total_row_counts[total_row_counts >= min_total_row_count].index
     df = df.loc[keep]
+    return rpool.run(fit_deseq2, df, subsets)
+
+
+def fit_deseq2(df: pd.DataFrame, subsets: List[List[T]]) -> pd.DataFrame:
+    """Run the R part of get_deseq2_stats(). Must be called in an R worker,
+    see rpool.
+    :param df: Matrix of counts with one column per sample and subset.
+    :param subsets: The two subsets to compare with each other.
+    :return: Results of the analysis. See get_deseq2_stats().
+    """
+    from rpy2 import robjects as robj
+    from rpy2.robjects import r, pandas2ri
+    flattened_subsets = [x for subset in subsets for x in subset]
     # pandas df -> R df
     r_count_data = pandas2ri.py2ri(df)
     # py2ri is stupid and makes too many assumptions.
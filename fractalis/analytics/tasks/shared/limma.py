@@ -0,0 +1,352 @@
+"""This module computes the statistics of the R bioconductor package 'limma'
+with NumPy and SciPy. It supports the analysis array_stats.get_limma_stats()
+runs in R: a linear model with one coefficient per group, all pairwise
+contrasts of the groups and empirical Bayes moderated t- and F-statistics.
+Every step is vectorized across all features, so large matrices neither
+need to be converted to R nor be processed by a single R process.
+
+The functions mirror lmFit(), contrasts.fit(), eBayes() and topTable() of
+limma. Like limma, features with missing values are fitted with the values
+they have. The prior of the variances is estimated the way limma always did
+before version 3.58, which is also what it still does if all features have
+the same residual degrees of freedom, i.e. no missing values.
+"""
+
+from typing import List, Tuple, TypeVar
+import logging
+
+import pandas as pd
+import numpy as np
+import scipy.stats
+import scipy.special
+
+
+T = TypeVar('T')
+logger = logging.getLogger(__name__)
+
+# prior probability of a feature to be differentially expressed (B-statistic)
+PROPORTION = 0.01
+# limits of the prior standard deviation of log fold changes (B-statistic)
+STDEV_COEF_LIM = (0.1, 4)
+
+
+def get_limma_stats(df: pd.DataFrame, subsets: List[List[T]]) -> pd.DataFrame:
+    """Perform the differential expression analysis of
+    array_stats.get_limma_stats() without R.
+    :param df: Matrix of measurements where each column represents a sample
+    and each row a gene/probe.
+    :param subsets: Groups to compare with each other.
+    :return: Results of limma analysis. More than 2 subsets will result in
+    a different structured result data frame. See ?topTableF in R.
+    """
+    logger.debug("Computing limma stats with NumPy")
+    if len(subsets) < 2:
+        error = "Limma analysis requires at least " \
+                "two non-empty groups for comparison."
+        logger.error(error)
+        raise ValueError(error)
+    if df.shape[0] < 1 or df.shape[1] < 2:
+        error = "Limma analysis requires a " \
+                "data frame with dimension 1x2 or more."
+        logger.error(error)
+        raise ValueError(error)
+    if not all(subsets):
+        error = "Limma analysis requires all groups to be non-empty."
+        logger.error(error)
+        raise ValueError(error)
+
+    # an id that is part of several subsets is used once for each of them
+    flattened_subsets = [x for subset in subsets for x in subset]
+    values = df[flattened_subsets].values.astype(np.float64)
+    groups = np.repeat(np.arange(len(subsets)),
+                       [len(subset) for subset in subsets])
+    # every pairwise comparison of the groups, named like in R
+    names, contrasts = [], []
+    for i in reversed(range(len(subsets))):
+        for j in range(i):
+            names.append('group{}-group{}'.format(i + 1, j + 1))
+            contrast = np.zeros(len(subsets))
+            contrast[[i, j]] = [1, -1]
+            contrasts.append(contrast)
+    contrasts = np.array(contrasts).T
+
+    coefficients, stdev_unscaled, sigma, df_residual = fit_groups(values,
+                                                                  groups)
+    coefficients, stdev_unscaled, cov_coefficients = fit_contrasts(
+        coefficients, stdev_unscaled,
+        np.bincount(groups).astype(np.float64), contrasts)
+    fit = ebayes(coefficients, stdev_unscaled, sigma, df_residual)
+    with np.errstate(invalid='ignore'):
+        ave_expr = np.nanmean(values, axis=1)
+
+    results = pd.DataFrame({'feature': df.index.values})
+    if len(names) == 1:
+        results['logFC'] = coefficients[:, 0]
+        results['AveExpr'] = ave_expr
+        results['t'] = fit['t'][:, 0]
+        results['P.Value'] = fit['p_value'][:, 0]
+        results['adj.P.Val'] = p_adjust_bh(fit['p_value'][:, 0])
+        results['B'] = fit['lods'][:, 0]
+        return results
+    for i, name in enumerate(names):
+        results[name] = coefficients[:, i]
+    results['AveExpr'] = ave_expr
+    f_stat, f_p_value = f_statistic(fit['t'], cov_coefficients,
+                                    fit['df_prior'] + df_residual)
+    results['F'] = f_stat
+    results['P.Value'] = f_p_value
+    results['adj.P.Val'] = p_adjust_bh(f_p_value)
+    return results
+
+
+def fit_groups(values: np.ndarray, groups: np.ndarray) -> Tuple:
+    """Fit the linear model with one coefficient per group to every feature,
+    like lmFit() does for the design ~0+group. Missing values are ignored.
+    :param values: Matrix of measurements, one row per feature.
+    :param groups: The group of every column.
+    :return: The coefficients and their unscaled standard deviations (NaN
+    for groups without values), the residual standard deviation (NaN without
+    residual degrees of freedom) and the residual degrees of freedom.
+    """
+    observed = ~np.isnan(values)
+    design = np.eye(groups.max() + 1)[groups]
+    counts = observed.dot(design)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coefficients = np.where(observed, values, 0).dot(design) / counts
+        residuals = np.where(observed, values - coefficients[:, groups], 0)
+        df_residual = counts.sum(axis=1) - (counts > 0).sum(axis=1)
+        sigma = np.sqrt((residuals ** 2).sum(axis=1) / df_residual)
+        stdev_unscaled = 1 / np.sqrt(counts)
+    stdev_unscaled[counts == 0] = np.nan
+    sigma[df_residual == 0] = np.nan
+    return coefficients, stdev_unscaled, sigma, df_residual
+
+
+def fit_contrasts(coefficients: np.ndarray, stdev_unscaled: np.ndarray,
+                  group_sizes: np.ndarray, contrasts: np.ndarray) -> Tuple:
+    """Compute the contrasts of the group coefficients like contrasts.fit()
+    does for an orthogonal design.
+    :param coefficients: The coefficients of every feature.
+    :param stdev_unscaled: Their unscaled standard deviations.
+    :param group_sizes: The number of columns of every group.
+    :param contrasts: Matrix with one column per contrast.
+    :return: The contrasts of every feature, their unscaled standard
+    deviations and the covariance of the contrasts.
+    """
+    # contrasts of coefficients that cannot be estimated are missing, but
+    # missing coefficients do not matter if their weight is zero
+    missing = np.isnan(coefficients)
+    coefficients = np.where(missing, 0, coefficients)
+    stdev_unscaled = np.where(missing, 1e30, stdev_unscaled)
+    coefficients = coefficients.dot(contrasts)
+    stdev_unscaled = np.sqrt((stdev_unscaled ** 2).dot(contrasts ** 2))
+    unestimable = stdev_unscaled > 1e20
+    coefficients[unestimable] = np.nan
+    stdev_unscaled[unestimable] = np.nan
+    cov_coefficients = contrasts.T.dot(contrasts / group_sizes[:, np.newaxis])
+    return coefficients, stdev_unscaled, cov_coefficients
+
+
+def ebayes(coefficients: np.ndarray, stdev_unscaled: np.ndarray,
+           sigma: np.ndarray, df_residual: np.ndarray) -> dict:
+    """Compute moderated t-statistics, their p-values and the log-odds of
+    differential expression (B-statistic) like eBayes() does.
+    :param coefficients: The contrasts of every feature.
+    :param stdev_unscaled: Their unscaled standard deviations.
+    :param sigma: The residual standard deviation of every feature.
+    :param df_residual: The residual degrees of freedom of every feature.
+    :return: Dict with the moderated 't', 'p_value', 'lods' and the prior
+    degrees of freedom 'df_prior'.
+    """
+    if np.all(df_residual == 0):
+        error = "No residual degrees of freedom in linear model fits."
+        logger.error(error)
+        raise ValueError(error)
+    if not np.any(np.isfinite(sigma)):
+        error = "No finite residual standard deviations."
+        logger.error(error)
+        raise ValueError(error)
+    s2_post, s2_prior, df_prior = squeeze_var(sigma ** 2, df_residual)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = coefficients / stdev_unscaled / np.sqrt(s2_post)[:, np.newaxis]
+    df_total = np.minimum(df_residual + df_prior, df_residual.sum())
+    df_total = np.broadcast_to(df_total[:, np.newaxis], t.shape)
+    p_value = 2 * scipy.stats.t.sf(np.abs(t), df_total)
+
+    # the B-statistic
+    var_prior_lim = np.square(STDEV_COEF_LIM) / s2_prior
+    var_prior = np.array([
+        tmixture(t[:, i], stdev_unscaled[:, i], df_total[:, i],
+                 var_prior_lim) for i in range(t.shape[1])])
+    var_prior[np.isnan(var_prior)] = 1 / s2_prior
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = (stdev_unscaled ** 2 + var_prior) / stdev_unscaled ** 2
+        t2 = t ** 2
+        if df_prior > 1e6:
+            kernel = t2 * (1 - 1 / r) / 2
+        else:
+            kernel = (1 + df_total) / 2 * np.log((t2 + df_total) /
+                                                 (t2 / r + df_total))
+    lods = np.log(PROPORTION / (1 - PROPORTION)) - np.log(r) / 2 + kernel
+    return {'t': t, 'p_value': p_value, 'lods': lods, 'df_prior': df_prior}
+
+
+def squeeze_var(var: np.ndarray, df: np.ndarray) -> Tuple:
+    """Shrink the variances of all features towards a common prior like
+    squeezeVar() does.
+    :param var: The residual variance of every feature.
+    :param df: Its degrees of freedom.
+    :return: The posterior variances, the prior variance and the prior
+    degrees of freedom.
+    """
+    if var.shape[0] == 1:
+        return var, var[0], 0
+    # features without residual degrees of freedom get the prior variance
+    var = np.where(df == 0, 0, var)
+    var_prior, df_prior = fit_f_dist(var, df)
+    if np.isnan(df_prior):
+        error = "Could not estimate prior df."
+        logger.error(error)
+        raise ValueError(error)
+    if np.isinf(df_prior):
+        return np.full(var.shape, var_prior), var_prior, df_prior
+    var_post = (df * var + df_prior * var_prior) / (df + df_prior)
+    return var_post, var_prior, df_prior
+
+
+def fit_f_dist(x: np.ndarray, df1: np.ndarray) -> Tuple[float, float]:
+    """Fit a scaled F-distribution to the variances of all features with the
+    method of moments, like fitFDist() does.
+    :param x: The variances.
+    :param df1: Their degrees of freedom.
+    :return: The scale and the second degrees of freedom.
+    """
+    with np.errstate(invalid='ignore'):
+        ok = np.isfinite(x) & np.isfinite(df1) & (x > -1e-15) & (df1 > 1e-15)
+    if not ok.any():
+        return np.nan, np.nan
+    x = np.maximum(x[ok], 0)
+    df1 = df1[ok].astype(np.float64)
+    if x.shape[0] == 1:
+        return x[0], 0
+    m = np.median(x)
+    if m == 0:
+        logger.warning("More than half of residual variances are exactly "
+                       "zero: eBayes unreliable")
+        m = 1
+    x = np.maximum(x, 1e-5 * m)
+    e = np.log(x) - scipy.special.digamma(df1 / 2) + np.log(df1 / 2)
+    e_mean = np.mean(e)
+    e_var = np.sum((e - e_mean) ** 2) / (e.shape[0] - 1)
+    e_var -= np.mean(scipy.special.polygamma(1, df1 / 2))
+    if e_var > 0:
+        df2 = 2 * trigamma_inverse(e_var)
+        s20 = np.exp(e_mean + scipy.special.digamma(df2 / 2) -
+                     np.log(df2 / 2))
+    else:
+        # the pooled variance, which is the maximum likelihood estimate
+        df2 = np.inf
+        s20 = np.mean(x)
+    return s20, df2
+
+
+def trigamma_inverse(x: float) -> float:
+    """Solve trigamma(y) = x for y with Newton's method like
+    trigammaInverse() does.
+    :param x: A positive number.
+    :return: The solution y.
+    """
+    if x > 1e7:
+        return 1 / np.sqrt(x)
+    if x < 1e-6:
+        return 1 / x
+    y = 0.5 + 1 / x
+    for _ in range(51):
+        tri = scipy.special.polygamma(1, y)
+        dif = tri * (1 - tri / x) / scipy.special.polygamma(2, y)
+        y += dif
+        if -dif / y < 1e-8:
+            return y
+    logger.warning("Iteration limit exceeded")
+    return y
+
+
+def tmixture(t: np.ndarray, stdev_unscaled: np.ndarray, df: np.ndarray,
+             var_prior_lim: np.ndarray) -> float:
+    """Estimate the prior variance of the coefficients of differentially
+    expressed features from the largest t-statistics like tmixture.vector()
+    does.
+    :param t: The moderated t-statistics of one contrast.
+    :param stdev_unscaled: Their unscaled standard deviations.
+    :param df: Their degrees of freedom.
+    :param var_prior_lim: The limits of the prior variance.
+    :return: The prior variance or NaN if there are too few features.
+    """
+    ok = ~np.isnan(t)
+    t = np.abs(t[ok])
+    stdev_unscaled = stdev_unscaled[ok]
+    df = df[ok]
+    n = t.shape[0]
+    n_target = int(np.ceil(PROPORTION / 2 * n))
+    if n_target < 1:
+        return np.nan
+    p = max(n_target / n, PROPORTION)
+    max_df = np.max(df)
+    lower = df < max_df
+    if lower.any():
+        # same tail probability with the largest degrees of freedom
+        tail_p = scipy.stats.t.logsf(t[lower], df[lower])
+        t[lower] = scipy.stats.t.isf(np.exp(tail_p), max_df)
+    top = np.argsort(-t, kind='mergesort')[:n_target]
+    t = t[top]
+    v1 = stdev_unscaled[top] ** 2
+    r = np.arange(1, n_target + 1)
+    p0 = 2 * scipy.stats.t.sf(t, max_df)
+    p_target = ((r - 0.5) / n - (1 - p) * p0) / p
+    v0 = np.zeros(n_target)
+    pos = p_target > p0
+    if pos.any():
+        q_target = scipy.stats.t.isf(p_target[pos] / 2, max_df)
+        v0[pos] = v1[pos] * ((t[pos] / q_target) ** 2 - 1)
+    v0 = np.clip(v0, var_prior_lim[0], var_prior_lim[1])
+    return np.mean(v0)
+
+
+def f_statistic(t: np.ndarray, cov_coefficients: np.ndarray,
+                df: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Combine the moderated t-statistics of all contrasts into moderated
+    F-statistics like classifyTestsF() does.
+    :param t: The moderated t-statistics, one column per contrast.
+    :param cov_coefficients: The covariance of the contrasts.
+    :param df: The total degrees of freedom of every feature.
+    :return: The F-statistics and their p-values.
+    """
+    stdev = np.sqrt(np.diag(cov_coefficients))
+    cor_matrix = cov_coefficients / np.outer(stdev, stdev)
+    eigenvalues, eigenvectors = np.linalg.eigh(cor_matrix)
+    keep = eigenvalues / eigenvalues.max() > 1e-8
+    rank = np.count_nonzero(keep)
+    q = eigenvectors[:, keep] / np.sqrt(eigenvalues[keep]) / np.sqrt(rank)
+    f_stat = (t.dot(q) ** 2).sum(axis=1)
+    if df[0] > 1e6:
+        p_value = scipy.stats.chi2.sf(rank * f_stat, rank)
+    else:
+        p_value = scipy.stats.f.sf(f_stat, rank, df)
+    return f_stat, p_value
+
+
+def p_adjust_bh(p: np.ndarray) -> np.ndarray:
+    """Adjust p-values for multiple testing with the method of Benjamini &
+    Hochberg like p.adjust(p, 'BH') does. Missing p-values are ignored.
+    :param p: The p-values.
+    :return: The adjusted p-values.
+    """
+    adjusted = np.full(p.shape, np.nan)
+    ok = ~np.isnan(p)
+    n = np.count_nonzero(ok)
+    order = np.argsort(-p[ok], kind='mergesort')
+    values = np.minimum.accumulate(n / np.arange(n, 0, -1) * p[ok][order])
+    result = np.empty(n)
+    result[order] = np.minimum(values, 1)
+    adjusted[ok] = result
+    return adjusted
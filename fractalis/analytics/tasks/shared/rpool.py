@@ -0,0 +1,334 @@
+"""This module provides RPool, a pool of long-lived processes that run the
+statistics implemented in R.
+
+rpy2 embeds a single R interpreter into the process that imports it. Loading
+R together with the Bioconductor packages takes seconds and the interpreter
+must not be used by more than one thread at a time. Therefore R is never
+loaded by the Fractalis processes themselves. Every process that needs R
+forks its own pool of R workers instead. Each worker loads R and R_PACKAGES
+once and then runs one function at a time. Arguments and results are
+pickled through a pipe.
+
+Before a worker is handed out its health is checked. Workers are replaced if
+they died, do not answer within FRACTALIS_R_WORKER_TIMEOUT, were interrupted
+during a call, ran FRACTALIS_R_WORKER_MAX_CALLS functions or use more than
+FRACTALIS_R_WORKER_MAX_MEMORY bytes of resident memory.
+"""
+
+import os
+import signal
+import logging
+import resource
+import threading
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Callable, Tuple
+
+from fractalis import app
+
+
+logger = logging.getLogger(__name__)
+
+# R packages every worker loads when it starts
+R_PACKAGES = ['limma', 'DESeq2']
+
+
+def init_r() -> None:
+    """Start the embedded R interpreter and load R_PACKAGES."""
+    from rpy2.robjects import pandas2ri
+    from rpy2.robjects.packages import importr
+    for package in R_PACKAGES:
+        importr(package)
+    pandas2ri.activate()
+
+
+def resident_memory() -> int:
+    """Return the resident memory of this process in bytes. Falls back to
+    the peak resident memory on systems without /proc.
+    :return: The memory in bytes.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def serve(conn: Connection, initializer: Callable[[], None]) -> None:
+    """Main loop of a worker process. Answers every message with a tuple
+    (status, payload, resident memory).
+    :param conn: The connection to the process owning the worker.
+    :param initializer: Function that is called once before serving.
+    """
+    # interrupts are handled by the owner, which stops its workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        initializer()
+        conn.send(('ready', None, resident_memory()))
+    except Exception as e:
+        conn.send(('error', e, resident_memory()))
+        return
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            # the owner is gone
+            return
+        if message is None:
+            return
+        if message == 'ping':
+            conn.send(('pong', None, resident_memory()))
+            continue
+        func, args, kwargs = message
+        try:
+            reply = ('result', func(*args, **kwargs))
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply + (resident_memory(),))
+        except Exception as e:
+            # the result or the exception cannot be pickled
+            conn.send(('error', RuntimeError(str(e)), resident_memory()))
+
+
+class RWorker:
+    """A single worker process of an RPool."""
+
+    def __init__(self, initializer: Callable[[], None]) -> None:
+        """Start the worker. Does not wait for the initializer to finish.
+        :param initializer: Function that is called once in the worker.
+        """
+        context = multiprocessing.get_context('fork')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=serve,
+                                       args=(child_conn, initializer),
+                                       name='fractalis-r-worker',
+                                       daemon=True)
+        self.process.start()
+        # only the worker may hold this end, so we notice when it dies
+        child_conn.close()
+        self.ready = False
+        self.busy = False
+        self.calls = 0
+        self.memory = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def receive(self, timeout: float = None) -> Tuple[str, object]:
+        """Wait for the next reply of the worker.
+        :param timeout: Seconds to wait at most. None waits forever.
+        :return: Status and payload of the reply.
+        """
+        if timeout is not None and not self.conn.poll(timeout):
+            error = "R worker {} did not answer within {} seconds.".format(
+                self.pid, timeout)
+            logger.error(error)
+            raise TimeoutError(error)
+        try:
+            status, payload, self.memory = self.conn.recv()
+        except (EOFError, OSError):
+            error = "R worker {} died unexpectedly.".format(self.pid)
+            logger.error(error)
+            raise RuntimeError(error)
+        return status, payload
+
+    def wait_ready(self, timeout: float = None) -> None:
+        """Wait until the worker has run its initializer.
+        :param timeout: Seconds to wait at most. None waits forever.
+        """
+        if self.ready:
+            return
+        status, payload = self.receive(timeout)
+        if status == 'error':
+            self.busy = True  # prevents reuse of the worker
+            raise payload
+        self.ready = True
+
+    def ping(self, timeout: float = None) -> bool:
+        """Check whether the worker is alive, initialized and responsive.
+        :param timeout: Seconds to wait for the worker at most.
+        :return: True if the worker is healthy.
+        """
+        if self.busy or not self.process.is_alive():
+            return False
+        try:
+            self.wait_ready(timeout)
+            self.conn.send('ping')
+            return self.receive(timeout)[0] == 'pong'
+        except Exception as e:
+            logger.warning("Health check of R worker {} failed: {}".format(
+                self.pid, e))
+            return False
+
+    def run(self, func: Callable, *args, **kwargs) -> object:
+        """Run the given function in the worker and wait for the result.
+        Exceptions raised by the function are raised again here.
+        :param func: A function that can be pickled, i.e. a module level one.
+        :return: The return value of the function.
+        """
+        self.wait_ready()
+        # stays set if we get interrupted, e.g. by a celery time limit
+        self.busy = True
+        self.calls += 1
+        self.conn.send((func, args, kwargs))
+        status, payload = self.receive()
+        self.busy = False
+        if status == 'error':
+            raise payload
+        return payload
+
+    def stop(self) -> None:
+        """Stop the worker and wait for it to terminate."""
+        try:
+            if not self.busy:
+                self.conn.send(None)
+                self.process.join(1)
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class RPool:
+    """Pool of RWorker processes. Safe to use from several threads. A call
+    waits until one of the workers is free.
+    """
+
+    def __init__(self, size: int, max_calls: int = 0, max_memory: int = 0,
+                 timeout: float = None,
+                 initializer: Callable[[], None] = init_r) -> None:
+        """
+        :param size: Maximum number of workers.
+        :param max_calls: Number of calls after which a worker is replaced.
+        0 disables this limit.
+        :param max_memory: Resident memory in bytes above which a worker is
+        replaced. 0 disables this limit.
+        :param timeout: Seconds a worker may take to start or to answer a
+        health check. None waits forever.
+        :param initializer: Function that is called once in every worker.
+        """
+        self.size = size
+        self.max_calls = max_calls
+        self.max_memory = max_memory
+        self.timeout = timeout
+        self.initializer = initializer
+        self.stats = {'calls': 0, 'started': 0, 'recycled': 0, 'failed': 0}
+        self._idle = []
+        self._count = 0
+        self._condition = threading.Condition()
+
+    def _start_worker(self) -> RWorker:
+        worker = RWorker(self.initializer)
+        self.stats['started'] += 1
+        logger.info("Started R worker {}.".format(worker.pid))
+        return worker
+
+    def warm_up(self) -> None:
+        """Start all workers of the pool without waiting for them to load R.
+        """
+        with self._condition:
+            while self._count < self.size:
+                self._idle.append(self._start_worker())
+                self._count += 1
+
+    def acquire(self) -> RWorker:
+        """Take a healthy worker out of the pool. Starts a new worker if none
+        is idle and the pool is not full yet, otherwise waits for one.
+        :return: The worker. Must be given back with release().
+        """
+        with self._condition:
+            while not self._idle and self._count >= self.size:
+                self._condition.wait()
+            if self._idle:
+                worker = self._idle.pop()
+            else:
+                worker = self._start_worker()
+                self._count += 1
+        if not worker.ping(self.timeout):
+            logger.warning("Replacing unhealthy R worker {}.".format(
+                worker.pid))
+            worker.stop()
+            with self._condition:
+                self.stats['failed'] += 1
+                worker = self._start_worker()
+        return worker
+
+    def release(self, worker: RWorker) -> None:
+        """Give a worker back to the pool. Workers that are unhealthy or
+        exceed one of the limits are stopped.
+        :param worker: A worker obtained with acquire().
+        """
+        recycle = (self.max_calls and worker.calls >= self.max_calls) or \
+            (self.max_memory and worker.memory > self.max_memory)
+        if worker.busy or recycle or not worker.process.is_alive():
+            worker.stop()
+            with self._condition:
+                self.stats['recycled' if recycle else 'failed'] += 1
+                self._count -= 1
+                self._condition.notify()
+            logger.info("Stopped R worker {} after {} calls using {} "
+                        "bytes.".format(worker.pid, worker.calls,
+                                        worker.memory))
+            return
+        with self._condition:
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def run(self, func: Callable, *args, **kwargs) -> object:
+        """Run the given function in one of the workers.
+        :param func: A function that can be pickled, i.e. a module level one.
+        :return: The return value of the function.
+        """
+        worker = self.acquire()
+        try:
+            with self._condition:
+                self.stats['calls'] += 1
+            return worker.run(func, *args, **kwargs)
+        finally:
+            self.release(worker)
+
+    def shutdown(self) -> None:
+        """Stop all idle workers."""
+        with self._condition:
+            workers = self._idle
+            self._idle = []
+            self._count -= len(workers)
+            self._condition.notify_all()
+        for worker in workers:
+            worker.stop()
+
+
+# pool of this process
+_pool = None
+_pid = None
+_lock = threading.Lock()
+
+
+def get_pool() -> RPool:
+    """Return the pool of this process. Pools are never shared between
+    processes, because a worker must only be used by the process that
+    started it.
+    :return: The pool.
+    """
+    global _pool, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _pool = RPool(size=app.config['FRACTALIS_R_POOL_SIZE'],
+                          max_calls=app.config['FRACTALIS_R_WORKER_MAX_CALLS'],
+                          max_memory=app.config[
+                              'FRACTALIS_R_WORKER_MAX_MEMORY'],
+                          timeout=app.config['FRACTALIS_R_WORKER_TIMEOUT'])
+            _pid = os.getpid()
+        return _pool
+
+
+def run(func: Callable, *args, **kwargs) -> object:
+    """Run the given function in the R pool of this process.
+    :param func: A function that can be pickled, i.e. a module level one.
+    :return: The return value of the function.
+    """
+    return get_pool().run(func, *args, **kwargs)
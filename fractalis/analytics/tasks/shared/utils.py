@@ -1,13 +1,16 @@
 """This module contains common functions used in analytic tasks."""
 
 import logging
-from typing import List, TypeVar
+from typing import List, Tuple, TypeVar
 from functools import reduce
+from itertools import chain
 from copy import deepcopy
 
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_categorical_dtype, union_categoricals
 
+from fractalis.data import matrix
 
 logger = logging.getLogger(__name__)
 
@@ -16,82 +19,228 @@ def apply_subsets(df: pd.DataFrame,
                   subsets: List[List[str]]) -> pd.DataFrame:
     """Build a new DataFrame that contains a new column 'subset' defining
     the subset the data point belongs to. If a data point belongs to
-    multiple subsets then the row is duplicated.
+    multiple subsets then the row is duplicated. The rows are ordered by
+    subset and keep their original order and index within every subset.
     :param df: The DataFrame used as a base.
     :param subsets: The subsets defined by the user.
     :return: The new DataFrame with an additional 'subset' column.
     """
     if not subsets:
-        subsets = [df['id']]
-    _df = pd.DataFrame()
-    for i, subset in enumerate(subsets):
-        df_subset = df[df['id'].isin(subset)]
-        if not df_subset.shape[0]:
-            continue
-        subset_col = [i] * df_subset.shape[0]
-        df_subset = df_subset.assign(subset=subset_col)
-        _df = _df.append(df_subset)
-    if _df.shape[0] == 0:
+        df = df.assign(subset=0)
+    else:
+        rows, labels = subset_membership(df['id'], subsets)
+        df = df.iloc[rows].assign(subset=labels)
+    if df.shape[0] == 0:
         raise ValueError("No data match given subsets.")
-    return _df
+    return df
+
+
+def subset_membership(ids: pd.Series,
+                      subsets: List[List[str]]) -> Tuple[np.ndarray,
+                                                         np.ndarray]:
+    """Find every (row, subset) pair for which the id of the row is part of
+    the subset. An index of all subset ids is built once and every row is
+    looked up in it a single time, no matter how many subsets there are.
+    :param ids: The id column of the data.
+    :param subsets: The subsets defined by the user.
+    :return: The rows and the subsets of all pairs, ordered by subset and
+    row.
+    """
+    n_subsets = len(subsets)
+    if not any(subsets):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    codes, unique_ids = pd.factorize(
+        np.array(list(chain.from_iterable(subsets)), dtype=object))
+    id_index = pd.Index(unique_ids, dtype=object)
+    # exploded mapping table from id to subset, sorted by id. An id listed
+    # twice in the same subset is only used once.
+    keys = np.sort(
+        codes.astype(np.int64) * n_subsets +
+        np.repeat(np.arange(n_subsets), [len(subset) for subset in subsets]))
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    counts = np.bincount(keys // n_subsets, minlength=len(id_index))
+    starts = np.cumsum(counts) - counts
+    mapped_subsets = keys % n_subsets
+    # position of the id of every row in the index, -1 if in no subset
+    positions = index_positions(id_index, ids)
+    matched = np.flatnonzero(positions >= 0)
+    positions = positions[matched]
+    repeats = counts[positions]
+    rows = np.repeat(matched, repeats)
+    # offset of every repeated row within the block of subsets of its id
+    offsets = np.arange(rows.size) - np.repeat(np.cumsum(repeats) - repeats,
+                                               repeats)
+    labels = mapped_subsets[np.repeat(starts[positions], repeats) + offsets]
+    order = np.lexsort((rows, labels))
+    return rows[order], labels[order]
 
 
 def apply_categories(df: pd.DataFrame,
                      categories: List[pd.DataFrame]) -> pd.DataFrame:
     """Collapse all category DataFrames into a single column and add it as a new
-     column to the given DataFrame. This is done by joining all columns values
-    via the string `&&`
+    column to the given DataFrame. The categories of an id are joined with
+    ' AND '. Ids only get an empty category if none of their values is a
+    non-empty string, and a missing category if they are in none of the
+    category DataFrames.
+    Every id is assigned to a group, its combination of categories, using
+    integer codes only. The label of a group is built once.
     :param df: The DataFrame to be extended
     :param categories: List of category DataFrames
     :return: The base DataFrame with an additional 'category' column
     """
-    if len(categories):
-        # drop 'feature' column from dfs
-        categories = [df.drop('feature', axis=1) for df in categories]
-        # merge all dfs into one
-        data = reduce(lambda l, r: l.merge(r, on='id', how='outer'),
-                      categories)
-        # remember ids
-        ids = data['id']
-        # drop id column
-        data = data.drop('id', axis=1)
-        # replace everything that is not an category with ''
-        data = data.applymap(
-            lambda el: el if isinstance(el, str) and el else '')
-        # join all columns with && into a single one. Ignore '' entries.
-        data = data.apply(
-            lambda row: ' AND '.join(
-                list(map(str, [el for el in row.tolist() if el]))), axis=1)
-        # cast Series to DataFrame
-        data = pd.DataFrame(data, columns=['category'])
-        # reassign ids to collapsed df
-        data = data.assign(id=ids)
-        # merge category data into main df
-        df = df.merge(data, on='id', how='left')
-        # get unique categories
-    else:
-        df = df.assign(category='')
+    if not len(categories):
+        return df.assign(category='')
+    lengths = [category.shape[0] for category in categories]
+    id_codes, ids = pd.factorize(np.concatenate(
+        [np.asarray(category['id'], dtype=object) for category in categories]))
+    # the group of every id, i.e. its combination of categories so far
+    groups = np.zeros(len(ids), dtype=np.int64)
+    steps = []
+    for category, positions in zip(
+            categories, np.split(id_codes, np.cumsum(lengths)[:-1])):
+        codes, values = factorize(category['value'])
+        # code -1 (missing) selects the appended None
+        values = np.append(np.asarray(values, dtype=object), None)
+        is_category = np.array([isinstance(value, str) and bool(value)
+                                for value in values], dtype=bool)
+        column = np.full(len(ids), -1, dtype=np.int64)
+        column[positions] = np.where(is_category[codes], codes, -1)
+        groups, combinations = pd.factorize(
+            groups * len(values) + column + 1)
+        combinations = np.asarray(combinations, dtype=np.int64)
+        steps.append((combinations // len(values),
+                      combinations % len(values) - 1, values))
+    # walk back from every final group to collect its categories
+    group = np.arange(len(steps[-1][0]))
+    parts = []
+    for parents, codes, values in reversed(steps):
+        parts.append(np.where(codes[group] >= 0, values[codes[group]], ''))
+        group = parents[group]
+    labels = np.array([' AND '.join(part for part in row if part)
+                       for row in zip(*reversed(parts))], dtype=object)
+    positions = index_positions(pd.Index(ids, dtype=object), df['id'])
+    category = np.full(df.shape[0], np.nan, dtype=object)
+    found = positions >= 0
+    category[found] = labels[groups[positions[found]]]
+    return df.reset_index(drop=True).assign(category=category)
+
+
+def factorize(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode the given values as integer codes. Categorical values already
+    are, so their codes and categories are used as they are.
+    :param values: The values to encode.
+    :return: The codes, -1 for missing values, and the unique values.
+    """
+    if is_categorical_dtype(values):
+        return (values.cat.codes.values.astype(np.int64),
+                np.asarray(values.cat.categories, dtype=object))
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def concat(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """Append the given DataFrames. Columns that are categorical in all of
+    them stay categorical with the union of their categories, instead of
+    being turned into plain object columns.
+    :param dfs: DataFrames with the same columns.
+    :return: The DataFrames one after another.
+    """
+    categorical = [column for column in dfs[0].columns
+                   if all(column in df and is_categorical_dtype(df[column])
+                          for df in dfs)]
+    if len(dfs) == 1:
+        return dfs[0]
+    if not categorical:
+        return pd.concat(dfs)
+    df = pd.concat([df.drop(categorical, axis=1) for df in dfs])
+    encoded = {column: union_categoricals([df[column].values for df in dfs],
+                                          sort_categories=True)
+               for column in categorical}
+    return df.assign(**encoded)[dfs[0].columns]
+
+
+def index_positions(index: pd.Index, ids: pd.Series) -> np.ndarray:
+    """Look up the position of every id in the given index. Categorical ids
+    are looked up once per category.
+    :param index: Index of unique ids.
+    :param ids: The ids to look up.
+    :return: The positions, -1 for ids that are not in the index.
+    """
+    if is_categorical_dtype(ids):
+        return np.append(index.get_indexer(ids.cat.categories),
+                         -1)[ids.cat.codes.values]
+    return index.get_indexer(ids.values)
+
+
+def is_matrix(df: pd.DataFrame) -> bool:
+    """Check whether the given DataFrame is a feature x id matrix as created
+    by to_matrix() rather than a DataFrame in the id/feature/value format.
+    :param df: The DataFrame to test.
+    :return: True if df is a matrix.
+    """
+    return df.index.name == 'feature' and df.columns.name == 'id'
+
+
+def to_matrix(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """Combine the given array data into a single feature x id matrix.
+    :param dfs: Matrices or DataFrames in the id/feature/value format.
+    :return: Matrix with 'feature' as index and 'id' as columns.
+    """
+    matrices = [df for df in dfs if is_matrix(df)]
+    long_dfs = [df for df in dfs if not is_matrix(df)]
+    if long_dfs:
+        matrices.append(matrix.pivot(concat(long_dfs)))
+    return reduce(lambda l, r: l.combine_first(r), matrices)
+
+
+def drop_empty_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the rows of the matrix that do not contain a single value. The
+    matrix is only copied if there is something to drop.
+    :param df: Matrix with 'feature' as index and 'id' as columns.
+    :return: Matrix without empty rows.
+    """
+    keep = df.notnull().values.any(axis=1)
+    if not keep.all():
+        df = df[keep]
     return df
 
 
+def get_ids(df: pd.DataFrame) -> List[str]:
+    """Return the unique ids of the given matrix or DataFrame.
+    :param df: Matrix or DataFrame in the id/feature/value format.
+    :return: List of unique ids.
+    """
+    if is_matrix(df):
+        return df.columns.tolist()
+    return list(df['id'].unique())
+
+
 def apply_id_filter(df: pd.DataFrame, id_filter: List[str]) -> pd.DataFrame:
     """Keep only rows where id is in id_filter. If id_filter is empty keep all.
+    For matrices the columns are filtered instead.
     :param df: Dataframe containing array data in the Fractalis format.
     :param id_filter: List of ids to keep.
     """
     if id_filter:
-        df = df[df['id'].isin(id_filter)]
+        if is_matrix(df):
+            # the matrix is only copied if there is something to drop
+            keep = df.columns.isin(id_filter)
+            if not keep.all():
+                df = df.loc[:, keep]
+        else:
+            df = df[df['id'].isin(id_filter)]
     return df
 
 
 def drop_unused_subset_ids(df: pd.DataFrame,
                            subsets: List[List[str]]) -> List[List[str]]:
     """Drop subset ids that are not present in the given data
-    :param df: Dataframe containing array data in the Fractalis format.
+    :param df: Matrix or DataFrame containing array data in the Fractalis
+    format.
     :param subsets: Subset groups specified by the user.
     :return: Modified subsets list.
     """
-    ids = df['id'].unique()
+    ids = set(get_ids(df))
     _subsets = deepcopy(subsets)
     for subset in _subsets:
         _subset = list(subset)
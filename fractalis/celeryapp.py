@@ -3,8 +3,8 @@ Celery instance."""
 
 import logging
 
-from celery import Celery, current_app
-from celery.signals import after_task_publish
+from celery import Celery, Task, current_app
+from celery.signals import after_task_publish, worker_process_init
 from flask import Flask
 
 from fractalis.utils import list_classes_with_base_class
@@ -27,6 +27,43 @@ def update_submitted_state(sender, headers, **kwargs):
                          state='SUBMITTED')
 
 
+@worker_process_init.connect
+def warm_up_r_pool(**kwargs):
+    """Start the R processes of every new worker process, so the first task
+    using R does not have to wait for R to load. Only workers consuming the
+    'heavy' queue run R, the others start it on first use if at all. See
+    FRACTALIS_R_POOL_WARM_UP.
+    """
+    from fractalis import app
+    from fractalis.analytics.tasks.shared import rpool
+    if app.config['FRACTALIS_R_POOL_WARM_UP'] and consumes_queue('heavy'):
+        rpool.get_pool().warm_up()
+
+
+def consumes_queue(priority_class: str) -> bool:
+    """Check whether this worker consumes the queue of the given priority
+    class, i.e. whether it was started with the queue in its -Q option.
+    :param priority_class: A key of FRACTALIS_TASK_QUEUES.
+    :return: True if the worker consumes the queue.
+    """
+    queue = current_app.conf['FRACTALIS_TASK_QUEUES'][priority_class]
+    return queue in current_app.amqp.queues.consume_from
+
+
+def route_task(name: str, args: tuple, kwargs: dict, options: dict,
+               task: Task = None, **kw) -> dict:
+    """Celery router sending every task to the queue of its priority class.
+    See FRACTALIS_TASK_QUEUES.
+    :param name: The name of the task.
+    :return: The routing options of the task.
+    """
+    config = current_app.conf
+    task = task or current_app.tasks.get(name)
+    priority_class = getattr(task, 'priority_class', None) or \
+        config['FRACTALIS_DEFAULT_PRIORITY_CLASS']
+    return {'queue': config['FRACTALIS_TASK_QUEUES'][priority_class]}
+
+
 def make_celery(app: Flask) -> Celery:
     """Create a celery instance which executes its tasks in the application
     context of our service.
@@ -37,6 +74,7 @@ def make_celery(app: Flask) -> Celery:
                     backend=app.config['CELERY_RESULT_BACKEND'],
                     broker=app.config['BROKER_URL'])
     celery.conf.update(app.config)
+    celery.conf.update(CELERY_ROUTES=(route_task,))
 
     TaskBase = celery.Task
 
@@ -51,6 +89,19 @@ def make_celery(app: Flask) -> Celery:
     return celery
 
 
+def check_priority_class(task_class: type) -> None:
+    """Raise if the given task declares an unknown priority class.
+    :param task_class: The task to check.
+    """
+    from fractalis import app
+    if task_class.priority_class not in app.config['FRACTALIS_TASK_QUEUES']:
+        error = "Task '{}' declares the priority class '{}', which has no " \
+                "queue in FRACTALIS_TASK_QUEUES.".format(
+                    task_class.name, task_class.priority_class)
+        logger.error(error)
+        raise ValueError(error)
+
+
 def register_tasks() -> None:
     """Register all of our Task classes with celery."""
     from fractalis import celery
@@ -61,6 +112,7 @@ def register_tasks() -> None:
     etl_classes = list_classes_with_base_class('fractalis.data.etls', ETL)
     for etl_class in etl_classes:
         logger.info("Registering task: {}".format(etl_class.name))
+        check_priority_class(etl_class)
         celery.tasks.register(etl_class)
 
     logger.info("Registering analysis tasks ...")
@@ -68,4 +120,5 @@ def register_tasks() -> None:
         'fractalis.analytics.task', AnalyticTask)
     for analytics_task_class in analytics_task_classes:
         logger.info("Registering task: {}".format(analytics_task_class.name))
+        check_priority_class(analytics_task_class)
         celery.tasks.register(analytics_task_class)
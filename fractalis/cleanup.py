@@ -10,6 +10,13 @@ def janitor():
     """
     data_dir = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'data')
     tracked_ids = [key.split(':')[1] for key in redis.scan_iter('data:*')]
+
+    # remove shared data as soon as the last session using them expired
+    for task_id in list(tracked_ids):
+        if (redis.exists('refs:{}'.format(task_id)) and
+                not sync.has_live_references(task_id)):
+            sync.remove_data(task_id)
+            tracked_ids.remove(task_id)
     if not os.path.exists(data_dir):
         for task_id in tracked_ids:
             async_result = celery.AsyncResult(task_id)
@@ -20,9 +27,9 @@ def janitor():
     cached_files = [f for f in os.listdir(data_dir)
                     if os.path.isfile(os.path.join(data_dir, f))]
 
-    # clean cached files
+    # clean cached files (including files stored next to them: <id>.<suffix>)
     for cached_file in cached_files:
-        if cached_file not in tracked_ids:
+        if cached_file.split('.')[0] not in tracked_ids:
             sync.remove_file(os.path.join(data_dir, cached_file))
 
     # clean tracked files
@@ -20,6 +20,18 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379'
 CELERYD_TASK_SOFT_TIME_LIMIT = 60 * 20
 CELERYD_TASK_TIME_LIMIT = 60 * 30
 CELERYD_HIJACK_ROOT_LOGGER = False
+# Queue of every task priority class. Tasks declare their class (see
+# ETL.priority_class and AnalyticTask.priority_class) and are sent to its
+# queue, so long running R analyses or huge ETLs never block the short
+# interactive analyses. Run workers for every queue, e.g.
+# `celery worker -A fractalis:celery -Q fractalis.heavy`. Tasks that do not
+# declare a class, like the janitor, use FRACTALIS_DEFAULT_PRIORITY_CLASS.
+FRACTALIS_TASK_QUEUES = {
+    'etl': 'fractalis.etl',
+    'interactive': 'fractalis.interactive',
+    'heavy': 'fractalis.heavy'
+}
+FRACTALIS_DEFAULT_PRIORITY_CLASS = 'interactive'
 
 # Fractalis
 # Location of cache and temporary files
@@ -28,11 +40,78 @@ FRACTALIS_TMP_DIR = os.path.abspath(os.path.join(os.sep, 'tmp', 'fractalis'))
 FRACTALIS_DATA_LIFETIME = timedelta(days=6)
 # How long to keep analysis results (beware of high RAM usage)
 FRACTALIS_RESULT_LIFETIME = timedelta(seconds=30)
+# Share loaded data between sessions. Data are only shared if the data source
+# handler can validate that the new session has access to them.
+FRACTALIS_SHARE_CACHE = True
+# Format of the data cache. One of: 'pickle', 'parquet', 'feather'
+# Data states that do not specify a format are read as 'pickle'.
+FRACTALIS_CACHE_FORMAT = 'pickle'
+# Compression codec of the data cache per data type. One of: 'none', 'gzip',
+# 'lz4', 'zstd', optionally followed by the compression level, e.g. 'zstd:3'.
+# Data types that are not listed use the 'default' codec.
+# Run benchmarks/cache_codecs.py to compare them on your data.
+FRACTALIS_CACHE_CODEC = {'default': 'gzip'}
+# Store 'id', 'feature' and categorical values dictionary encoded (as pandas
+# categoricals) in the cache. Saves memory and disk space for large data.
+FRACTALIS_ENCODE_CACHE = True
+# Data from these servers (e.g. 'https://transmart.example.org') are trusted
+# to be well-formed. Their columns and types are still checked completely,
+# but whether ids and features are unique is only checked for a sample of
+# about FRACTALIS_INTEGRITY_SAMPLE_SIZE rows. Rows are sampled by the hash of
+# their id and feature, so duplicated rows are always sampled together. This
+# catches systematic errors but only some single duplicated rows.
+FRACTALIS_TRUSTED_SERVERS = []
+FRACTALIS_INTEGRITY_SAMPLE_SIZE = 100000
 # Should the Cache be encrypted? This might impact performance for little gain!
 FRACTALIS_ENCRYPT_CACHE = False
+# Number of rows that are encrypted together if the cache is encrypted
+FRACTALIS_ENCRYPT_CHUNK_SIZE = 100000
+# Number of rows per row group (or encrypted chunk) of 'numerical_array'
+# caches. These are stored sorted by feature, so tasks that use only some of
+# the features can skip all row groups not containing them. Only effective
+# for the 'parquet' format and for encrypted caches.
+FRACTALIS_FEATURE_ROW_GROUP_SIZE = 10000
+# Memory budget in bytes for the data frames each analytics worker process
+# keeps in memory between tasks. Set to 0 to disable this cache.
+FRACTALIS_FRAME_CACHE_SIZE = 512 * 1024 ** 2
+# Method used to compute the limma statistics of heatmaps. 'limma' runs the
+# R bioconductor package, 'limma_numpy' computes the same statistics with
+# NumPy, which is much faster for large matrices. Volcano plots select the
+# method with their ranking method.
+FRACTALIS_LIMMA_METHOD = 'limma'
+# Statistics implemented in R (limma, DESeq2) run in a pool of long-lived R
+# processes that every worker process forks. Number of R processes per
+# worker process.
+FRACTALIS_R_POOL_SIZE = 1
+# Start the R processes when a worker process starts instead of on first use.
+# Only applies to workers consuming the 'heavy' queue of FRACTALIS_TASK_QUEUES.
+FRACTALIS_R_POOL_WARM_UP = True
+# An R process is replaced after this many calls or once its resident memory
+# exceeds this many bytes. 0 disables the respective limit.
+FRACTALIS_R_WORKER_MAX_CALLS = 100
+FRACTALIS_R_WORKER_MAX_MEMORY = 2 * 1024 ** 3
+# Seconds an R process may take to load R or to answer a health check
+FRACTALIS_R_WORKER_TIMEOUT = 120
 # Location of your the log configuration file.
 FRACTALIS_LOG_CONFIG = os.path.join(os.path.dirname(__file__), 'logging.yaml')
 # Whether to verify the certs of https data sources
 ETL_VERIFY_SSL_CERT = False
+# Number of connections each worker process keeps alive per data source
+FRACTALIS_HTTP_POOL_SIZE = 10
+# How often idempotent requests to data sources are retried if they fail with
+# a connection error or a 502, 503 or 504 status code
+FRACTALIS_HTTP_RETRIES = 3
+# Base of the exponential backoff between two attempts in seconds. The actual
+# wait time is chosen randomly between 0 and the backoff.
+FRACTALIS_HTTP_BACKOFF = 0.5
+# Seconds until PIC-SURE ETLs check the status of their query again. Doubles
+# with every check up to FRACTALIS_PICSURE_MAX_POLL_INTERVAL. The worker is
+# free for other tasks in between.
+FRACTALIS_PICSURE_POLL_INTERVAL = 1
+FRACTALIS_PICSURE_MAX_POLL_INTERVAL = 60
+# Seconds after which PIC-SURE ETLs stop waiting for their query to complete
+FRACTALIS_PICSURE_DEADLINE = 60 * 60
+# Number of CSV rows PIC-SURE ETLs parse at once while downloading a result
+FRACTALIS_PICSURE_CSV_CHUNK_SIZE = 100000
 
 # DO NOT MODIFY THIS FILE DIRECTLY
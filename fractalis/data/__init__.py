@@ -2,6 +2,7 @@ from fractalis.utils import list_classes_with_base_class
 from .etlhandler import ETLHandler
 from .etl import ETL
 from .check import IntegrityCheck
+from .cache import CacheFormat
 
 HANDLER_REGISTRY = list_classes_with_base_class('fractalis.data.etls',
                                                 ETLHandler)
@@ -9,3 +10,5 @@ ETL_REGISTRY = list_classes_with_base_class('fractalis.data.etls',
                                             ETL)
 CHECK_REGISTRY = list_classes_with_base_class('fractalis.data',
                                               IntegrityCheck)
+FORMAT_REGISTRY = list_classes_with_base_class('fractalis.data',
+                                               CacheFormat)
@@ -0,0 +1,140 @@
+"""This module provides an abstract class for the on-disk formats of the
+data cache. ETLs write their transformed data with an implementation of this
+class and analytic tasks read them back with the same implementation."""
+
+import abc
+import os
+import logging
+from typing import List
+
+import numpy as np
+from pandas import DataFrame, concat
+
+logger = logging.getLogger(__name__)
+
+
+class CacheFormat(metaclass=abc.ABCMeta):
+    """This is an abstract class that provides a factory method to create
+    instances of implementations of itself. Each implementation knows how to
+    write a DataFrame to the cache and how to read it back, ideally reading
+    only the columns and row groups that are actually requested.
+    """
+
+    # number of rows that are read or written as one block
+    row_group_size = 100000
+    # compression codec used to write the file, see fractalis.data.compression
+    codec = 'none'
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str:
+        """Identifies the format in the configuration and the data state."""
+        pass
+
+    @classmethod
+    def can_handle(cls, name: str) -> bool:
+        """Test if this implementation is responsible for the given format.
+        :param name: The name of the format.
+        :return: True if this implementation can handle the format.
+        """
+        return cls.name == name
+
+    @staticmethod
+    def factory(name: str) -> 'CacheFormat':
+        """A factory that returns a format object for the given name.
+        :param name: The name of the format. E.g.: pickle, parquet
+        :return: An instance of CacheFormat
+        """
+        from . import FORMAT_REGISTRY
+        for Format in FORMAT_REGISTRY:
+            if Format.can_handle(name):
+                return Format()
+        error = "No CacheFormat implementation found " \
+                "for format '{}'".format(name)
+        logger.error(error)
+        raise NotImplementedError(error)
+
+    @abc.abstractmethod
+    def write(self, data_frame: DataFrame, file_path: str) -> None:
+        """Write the data frame to the given location.
+        :param data_frame: DataFrame to write.
+        :param file_path: File to write to.
+        """
+        pass
+
+    @abc.abstractmethod
+    def read(self, file_path: str, columns: List[str] = None,
+             row_groups: List[int] = None) -> DataFrame:
+        """Read the data frame from the given location.
+        :param file_path: File to read from.
+        :param columns: Read only these columns. All if None.
+        :param row_groups: Read only these blocks of `row_group_size` rows.
+        All if None.
+        :return: The DataFrame stored at the given location.
+        """
+        pass
+
+    def open_writer(self, file_path: str) -> 'CacheWriter':
+        """Open a writer that appends data frames to the given location one
+        after another. Used by streaming ETLs, see ETL.streaming. By default
+        the frames are collected and written as a whole when the writer is
+        closed. Formats that can append override this.
+        :param file_path: File to write to.
+        :return: The writer.
+        """
+        return CacheWriter(self, file_path)
+
+    def select(self, data_frame: DataFrame, columns: List[str] = None,
+               row_groups: List[int] = None) -> DataFrame:
+        """Apply column and row group selection to an already loaded data
+        frame. Used by formats that can not read partially.
+        :param data_frame: The loaded DataFrame.
+        :param columns: Keep only these columns. All if None.
+        :param row_groups: Keep only these row groups. All if None.
+        :return: The selected part of the DataFrame.
+        """
+        if row_groups is not None:
+            positions = [np.arange(i * self.row_group_size,
+                                   min((i + 1) * self.row_group_size,
+                                       data_frame.shape[0]))
+                         for i in row_groups]
+            positions = np.concatenate(positions) if positions else []
+            data_frame = data_frame.iloc[positions]
+        if columns is not None:
+            data_frame = data_frame[columns]
+        return data_frame
+
+
+class CacheWriter:
+    """Writes the data frames appended to it as a single data frame with the
+    given CacheFormat. Can be used as a context manager."""
+
+    def __init__(self, cache_format: CacheFormat, file_path: str) -> None:
+        self.cache_format = cache_format
+        self.file_path = file_path
+        self.frames = []
+
+    def append(self, data_frame: DataFrame) -> None:
+        """Append the data frame to the file.
+        :param data_frame: DataFrame to write. All frames must have the same
+        columns.
+        """
+        self.frames.append(data_frame)
+
+    def close(self) -> None:
+        """Finish writing the file."""
+        if self.frames:
+            self.cache_format.write(concat(self.frames, ignore_index=True),
+                                    self.file_path)
+        self.frames = []
+
+    def __enter__(self) -> 'CacheWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.frames = []
+        self.close()
+        # never leave an incomplete file behind
+        if exc_type is not None and os.path.exists(self.file_path):
+            os.remove(self.file_path)
@@ -3,6 +3,11 @@ ETLs produce valid fractalis standard data."""
 
 import abc
 import logging
+from typing import List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +15,21 @@ logger = logging.getLogger(__name__)
 class IntegrityCheck(metaclass=abc.ABCMeta):
     """This is an abstract class that provides can be called directly"""
 
+    # Columns whose combination must be unique and columns that must contain
+    # a single value. check() verifies this for a single data frame,
+    # check_chunk() and finish() for all chunks of a streaming ETL together.
+    unique_columns = []
+    constant_columns = []
+
+    def __init__(self, sample_size: int = None) -> None:
+        """
+        :param sample_size: Check the uniqueness of about this many rows,
+        sampled by the hash of their unique_columns. Columns and types are
+        always checked completely. Used for trusted sources, see
+        FRACTALIS_TRUSTED_SERVERS.
+        """
+        self.sample_size = sample_size
+
     @property
     @abc.abstractmethod
     def data_type(self) -> str:
@@ -25,20 +45,113 @@ class IntegrityCheck(metaclass=abc.ABCMeta):
         return cls.data_type == data_type
 
     @staticmethod
-    def factory(data_type: str) -> 'IntegrityCheck':
+    def factory(data_type: str, sample_size: int = None) -> 'IntegrityCheck':
         """A factory that returns a checker object for a given data_type.
         :param data_type: Data type that one wants to test against.
+        :param sample_size: See __init__().
         :return: An instance of IntegrityCheck
         """
         from . import CHECK_REGISTRY
         for Check in CHECK_REGISTRY:
             if Check.can_handle(data_type):
-                return Check()
+                return Check(sample_size)
         error = "No IntegrityCheck implementation found " \
                 "for data type '{}'".format(data_type)
         logger.error(error)
         raise NotImplementedError(error)
 
+    @staticmethod
+    def is_string_column(series: pd.Series) -> bool:
+        """Test if the given column contains strings. Dictionary encoded
+        (categorical) columns are accepted if their categories are strings.
+        :param series: The column to test.
+        :return: True if the column is of type 'object' or categorical with
+        categories of type 'object'.
+        """
+        if is_categorical_dtype(series):
+            return series.cat.categories.dtype == np.object
+        return series.dtype == np.object
+
+    def sample_step(self, rows: int) -> int:
+        """Return k, so that about sample_size of the given number of rows
+        have a key hash that is divisible by k. k is a power of two, so the
+        rows sampled from chunks of different size are nested.
+        :param rows: The number of rows of the data.
+        :return: k, 1 if all rows are checked.
+        """
+        if self.sample_size is None or rows <= self.sample_size:
+            return 1
+        return 1 << int(np.ceil(np.log2(rows / self.sample_size)))
+
+    def key_hashes(self, data: pd.DataFrame) -> np.ndarray:
+        """Return a 64 bit hash of the unique_columns of every row. Equal
+        values have equal hashes, no matter if they are dictionary encoded.
+        :param data: The data to hash.
+        :return: The hashes.
+        """
+        # factorizing the values first only pays off for repeated values
+        return pd.util.hash_pandas_object(data[self.unique_columns],
+                                          index=False,
+                                          categorize=False).values
+
+    def sample(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Return the rows whose uniqueness is checked. Rows are sampled by
+        the hash of their unique_columns instead of randomly, so duplicates
+        are either all part of the sample or none of them is.
+        :param data: The data to check.
+        :return: All rows or the rows whose key hash is divisible by the
+        sample_step().
+        """
+        step = self.sample_step(data.shape[0])
+        if step == 1:
+            return data
+        return data[(self.key_hashes(data) & np.uint64(step - 1)) == 0]
+
+    @staticmethod
+    def codes(series: pd.Series) -> np.ndarray:
+        """Return integer codes for the values of the column. Equal values
+        have equal codes and missing values have the code -1.
+        :param series: The column to encode.
+        :return: The codes.
+        """
+        if is_categorical_dtype(series):
+            return series.cat.codes.values
+        return pd.factorize(series)[0]
+
+    @classmethod
+    def has_duplicates(cls, data: pd.DataFrame, columns: List[str]) -> bool:
+        """Test if a combination of values of the given columns occurs more
+        than once. Missing values are compared like any other value. The
+        columns are combined into a single integer key, so no rows or tuples
+        are ever built.
+        :param data: The data to test.
+        :param columns: The columns whose combinations must be unique.
+        :return: True if there are duplicates.
+        """
+        if len(columns) == 1:
+            return bool(data[columns[0]].duplicated().any())
+        key = np.zeros(data.shape[0], dtype=np.int64)
+        for column in columns:
+            # shift missing values to 0
+            codes = cls.codes(data[column]).astype(np.int64) + 1
+            size = int(codes.max()) + 1 if codes.size else 1
+            if key.size and int(key.max()) >= np.iinfo(np.int64).max // size:
+                key = pd.factorize(key)[0].astype(np.int64)
+            key = key * size + codes
+        return bool(pd.Series(key).duplicated().any())
+
+    @staticmethod
+    def is_constant(series: pd.Series) -> bool:
+        """Test if the column contains a single value in every row.
+        :param series: The column to test.
+        :return: True if the column is not empty and all values are equal.
+        """
+        if is_categorical_dtype(series):
+            values = series.cat.codes.values
+        else:
+            values = series.values
+        return values.size > 0 and bool((values == values[0]).all())
+
     @abc.abstractmethod
     def check(self, data: object) -> None:
         """Raise if the data have an invalid format. This is okay because
@@ -46,3 +159,41 @@ class IntegrityCheck(metaclass=abc.ABCMeta):
         :param data: The data to check.
         """
         pass
+
+    def start(self) -> None:
+        """Prepare to check data chunk by chunk with check_chunk()."""
+        self._hashes = []
+        self._constants = {column: set() for column in self.constant_columns}
+
+    def check_chunk(self, data: object) -> None:
+        """Check a single chunk of the data. Constraints that concern all
+        chunks together are checked incrementally: only a 64 bit hash of
+        the unique columns of every row is kept until finish() is called.
+        :param data: The chunk to check.
+        """
+        self.check(data)
+        if self.unique_columns:
+            hashes = self.key_hashes(data)
+            step = self.sample_step(data.shape[0])
+            if step > 1:
+                hashes = hashes[(hashes & np.uint64(step - 1)) == 0]
+            self._hashes.append(hashes)
+        for column, values in self._constants.items():
+            values.update(data[column].unique())
+            if len(values) > 1:
+                error = "'{}' column must contain exactly one unique value " \
+                        "for this data type.".format(column)
+                logger.error(error)
+                raise ValueError(error)
+
+    def finish(self) -> None:
+        """Raise if the chunks passed to check_chunk() are not valid as a
+        whole."""
+        if self._hashes:
+            hashes = np.sort(np.concatenate(self._hashes))
+            if (hashes[1:] == hashes[:-1]).any():
+                error = "Combinations of {} must be unique across all " \
+                        "chunks.".format(self.unique_columns)
+                logger.error(error)
+                raise ValueError(error)
+        self._hashes = []
@@ -0,0 +1,99 @@
+"""This module provides the compression codecs of the data cache.
+
+A codec is given as its name, optionally followed by a compression level,
+e.g. 'gzip', 'lz4' or 'zstd:3'. The available codecs are:
+
+    none  No compression. Fastest to read and write, but largest on disk.
+    gzip  Good compression, but slow to decompress. Levels 1 to 9.
+    lz4   Moderate compression, very fast to decompress. Levels 0 to 16.
+    zstd  Good compression, fast to decompress. Levels 1 to 22.
+"""
+
+import gzip
+import logging
+from typing import BinaryIO, Tuple, Union
+
+import lz4.frame
+import zstandard
+
+from fractalis import app
+
+logger = logging.getLogger(__name__)
+
+CODECS = ['none', 'gzip', 'lz4', 'zstd']
+
+
+def parse(codec: str) -> Tuple[str, Union[int, None]]:
+    """Split the given codec into its name and compression level.
+    :param codec: The codec, e.g. 'zstd:3'.
+    :return: Tuple of name and level. The level is None if not given.
+    """
+    name, _, level = codec.partition(':')
+    if name not in CODECS:
+        error = "Unknown cache codec '{}'. Must be one of: {}".format(
+            codec, CODECS)
+        logger.error(error)
+        raise ValueError(error)
+    return name, int(level) if level else None
+
+
+def for_data_type(data_type: str) -> str:
+    """Return the codec configured for the given data type.
+    :param data_type: The fractalis internal data type.
+    :return: The codec from FRACTALIS_CACHE_CODEC.
+    """
+    codecs = app.config['FRACTALIS_CACHE_CODEC']
+    codec = codecs.get(data_type, codecs['default'])
+    parse(codec)
+    return codec
+
+
+def open_file(file_path: str, mode: str, codec: str) -> BinaryIO:
+    """Open a file that is transparently (de)compressed with the given codec.
+    :param file_path: The file to open.
+    :param mode: Either 'rb' or 'wb'.
+    :param codec: The codec, e.g. 'zstd:3'.
+    :return: A binary file object.
+    """
+    name, level = parse(codec)
+    if name == 'gzip':
+        return gzip.open(file_path, mode,
+                         compresslevel=9 if level is None else level)
+    if name == 'lz4':
+        return lz4.frame.open(file_path, mode, compression_level=level or 0)
+    if name == 'zstd':
+        cctx = zstandard.ZstdCompressor(level=level or 3)
+        return zstandard.open(file_path, mode, cctx=cctx)
+    return open(file_path, mode)
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Compress the given data with the given codec.
+    :param data: The data to compress.
+    :param codec: The codec, e.g. 'zstd:3'.
+    :return: The compressed data.
+    """
+    name, level = parse(codec)
+    if name == 'gzip':
+        return gzip.compress(data, compresslevel=9 if level is None else level)
+    if name == 'lz4':
+        return lz4.frame.compress(data, compression_level=level or 0)
+    if name == 'zstd':
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    return data
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress data compressed with compress().
+    :param data: The compressed data.
+    :param codec: The codec the data have been compressed with.
+    :return: The original data.
+    """
+    name, _ = parse(codec)
+    if name == 'gzip':
+        return gzip.decompress(data)
+    if name == 'lz4':
+        return lz4.frame.decompress(data)
+    if name == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
@@ -39,7 +39,8 @@ def create_data_task() -> Tuple[Response, int]:
     task_ids = etl_handler.handle(descriptors=payload['descriptors'],
                                   data_tasks=session['data_tasks'],
                                   use_existing=False,
-                                  wait=wait)
+                                  wait=wait,
+                                  sid=session.sid)
     session['data_tasks'] += task_ids
     session['data_tasks'] = list(set(session['data_tasks']))
     logger.debug("Tasks successfully submitted. Sending response.")
@@ -115,8 +116,7 @@ def delete_data(task_id: UUID) -> Tuple[Response, int]:
         return jsonify({'error': error}), 403
     session['data_tasks'].remove(task_id)
     # possibly dangerous: http://stackoverflow.com/a/29627549
-    celery.control.revoke(task_id, terminate=True, signal='SIGUSR1', wait=wait)
-    remove_data(task_id=task_id)
+    remove_data(task_id=task_id, sid=session.sid, wait=wait)
     logger.debug("Successfully removed data from session. Sending response.")
     return jsonify(''), 200
 
@@ -130,10 +130,8 @@ def delete_all_data() -> Tuple[Response, int]:
     logger.debug("Received DELETE request on /data.")
     wait = request.args.get('wait') == '1'
     for task_id in session['data_tasks']:
-        remove_data(task_id=task_id)
         # possibly dangerous: http://stackoverflow.com/a/29627549
-        celery.control.revoke(task_id, terminate=True,
-                              signal='SIGUSR1', wait=wait)
+        remove_data(task_id=task_id, sid=session.sid, wait=wait)
     session['data_tasks'] = []
     logger.debug("Successfully removed all data from session. "
                  "Sending response.")
@@ -0,0 +1,42 @@
+"""This module provides the dictionary encoding of the data cache.
+
+In the Fractalis format 'id' and 'feature' (and the 'value' of categorical
+data) are strings. In long 'numerical_array' data every id and feature is
+repeated many times. Stored as pandas categoricals each of these columns
+becomes an array of small integer codes plus a single dictionary of the
+distinct strings, which is a lot smaller in memory and on disk and allows
+operations like isin() or pivoting to work on the codes.
+"""
+
+import logging
+
+from pandas import DataFrame
+from pandas.api.types import is_categorical_dtype, is_object_dtype
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['id', 'feature', 'value']
+
+
+def encode(data_frame: DataFrame) -> DataFrame:
+    """Dictionary encode the string columns of the given data.
+    :param data_frame: Data in the Fractalis format.
+    :return: The encoded data frame.
+    """
+    encoded = {column: data_frame[column].astype('category')
+               for column in COLUMNS
+               if column in data_frame and
+               is_object_dtype(data_frame[column])}
+    return data_frame.assign(**encoded) if encoded else data_frame
+
+
+def decode(data_frame: DataFrame) -> DataFrame:
+    """Turn dictionary encoded columns back into plain string columns.
+    :param data_frame: Data in the Fractalis format.
+    :return: The decoded data frame.
+    """
+    decoded = {column: data_frame[column].astype(object)
+               for column in COLUMNS
+               if column in data_frame and
+               is_categorical_dtype(data_frame[column])}
+    return data_frame.assign(**decoded) if decoded else data_frame
@@ -0,0 +1,126 @@
+"""This module provides the chunked encryption used for the data cache.
+
+An encrypted cache file consists of a header and a sequence of chunks:
+
+    MAGIC (8 bytes) | nonce prefix (7 bytes)
+    length (4 bytes) | tag (16 bytes) | ciphertext (length bytes)
+    ...
+
+Every chunk is encrypted independently with AES-GCM. Its nonce is the nonce
+prefix followed by the chunk index and a flag marking the last chunk, so
+chunks can neither be reordered nor silently dropped from the end of the file.
+Because every chunk carries its own length and tag, readers can decrypt the
+file one chunk at a time or seek over chunks they do not need.
+"""
+
+import os
+import struct
+import logging
+from functools import lru_cache
+from typing import Iterable, Iterator, List
+
+from Cryptodome.Cipher import AES
+from Cryptodome.Hash import HMAC, SHA256
+from Cryptodome.Protocol.KDF import PBKDF2
+from Cryptodome.Random import get_random_bytes
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FRCTLS\x00\x01'
+PREFIX_SIZE = 7
+TAG_SIZE = 16
+LENGTH = struct.Struct('>I')
+
+
+@lru_cache(maxsize=None)
+def derive_key(secret: str) -> bytes:
+    """Derive a 256 bit AES key from the given secret. The derivation is
+    deliberately slow, so its result is cached for the lifetime of the process.
+    :param secret: Passphrase used for encryption.
+    :return: The derived key.
+    """
+    return PBKDF2(secret, b'fractalis-data-cache', dkLen=32, count=100000,
+                  prf=lambda p, s: HMAC.new(p, s, SHA256).digest())
+
+
+def _make_cipher(key: bytes, prefix: bytes, index: int, last: bool):
+    nonce = prefix + struct.pack('>I?', index, last)
+    return AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+
+
+def is_chunked(file_path: str) -> bool:
+    """Check whether the given file has been written by write_chunks().
+    :param file_path: The location of the encrypted file.
+    :return: True if the file starts with the chunked format header.
+    """
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_chunks(chunks: Iterable[bytes], file_path: str, key: bytes) -> None:
+    """Encrypt the given chunks one by one and write them to the given file.
+    :param chunks: The plain text chunks. Can be a generator.
+    :param file_path: File to write to.
+    :param key: The AES key.
+    """
+    prefix = get_random_bytes(PREFIX_SIZE)
+    chunks = iter(chunks)
+    with open(file_path, 'wb') as f:
+        f.write(MAGIC + prefix)
+        index = 0
+        chunk = next(chunks, b'')
+        while True:
+            next_chunk = next(chunks, None)
+            cipher = _make_cipher(key, prefix, index, next_chunk is None)
+            ciphertext, tag = cipher.encrypt_and_digest(chunk)
+            f.write(LENGTH.pack(len(ciphertext)))
+            f.write(tag)
+            f.write(ciphertext)
+            if next_chunk is None:
+                break
+            chunk = next_chunk
+            index += 1
+
+
+def read_chunks(file_path: str, key: bytes,
+                chunk_ids: List[int] = None) -> Iterator[bytes]:
+    """Decrypt the given file chunk by chunk.
+    :param file_path: The location of the encrypted file.
+    :param key: The AES key.
+    :param chunk_ids: Decrypt only these chunks. All if None. Chunks that
+    are not requested are skipped without being read.
+    :return: A generator yielding the decrypted chunks in file order.
+    """
+    wanted = None if chunk_ids is None else set(chunk_ids)
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if f.read(len(MAGIC)) != MAGIC:
+            error = "'{}' is not a chunked cache file.".format(file_path)
+            logger.error(error)
+            raise ValueError(error)
+        prefix = f.read(PREFIX_SIZE)
+        index = 0
+        while f.tell() < size:
+            if wanted is not None and not wanted:
+                break
+            header = f.read(LENGTH.size + TAG_SIZE)
+            length = LENGTH.unpack(header[:LENGTH.size])[0]
+            tag = header[LENGTH.size:]
+            if wanted is not None and index not in wanted:
+                f.seek(length, os.SEEK_CUR)
+                index += 1
+                continue
+            ciphertext = f.read(length)
+            # a truncated or extended file fails the verification because
+            # the chunk at the end of the file must have been the last one
+            last = f.tell() >= size
+            cipher = _make_cipher(key, prefix, index, last)
+            yield cipher.decrypt_and_verify(ciphertext, tag)
+            if wanted is not None:
+                wanted.discard(index)
+            index += 1
+        if index == 0:
+            error = "Encrypted cache file '{}' contains no data."\
+                .format(file_path)
+            logger.error(error)
+            raise ValueError(error)
@@ -4,15 +4,21 @@ import abc
 import json
 import logging
 import os
+import pickle
+from collections import OrderedDict
+from typing import Iterable, Iterator, Union
 
-from Cryptodome.Cipher import AES
 # noinspection PyProtectedMember
 from celery import Task
+from celery.exceptions import Retry
 from pandas import DataFrame
 
 from fractalis import app, redis
+from fractalis.data import compression, etlstats, httpclient
+from fractalis.data import encoding, encryption, feature_index, matrix, \
+    summary
+from fractalis.data.cache import CacheFormat
 from fractalis.data.check import IntegrityCheck
-from fractalis.utils import get_cache_encrypt_key
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,19 @@ class ETL(Task, metaclass=abc.ABCMeta):
     named methods can be found in this class.
     """
 
+    # The priority class decides the queue of the task, see
+    # FRACTALIS_TASK_QUEUES.
+    priority_class = 'etl'
+
+    # Describes the ETLs that extract their data together with this one in
+    # the current run, see ETLHandler.make_batches(). None if not batched.
+    batch = None
+
+    # Streaming ETLs return an iterable of raw chunks from extract() and
+    # transform() is called for every chunk, so the data never have to be in
+    # memory as a whole. See stream().
+    streaming = False
+
     @property
     @abc.abstractmethod
     def name(self) -> str:
@@ -101,6 +120,19 @@ class ETL(Task, metaclass=abc.ABCMeta):
         """
         pass
 
+    def make_checker(self, server: str) -> IntegrityCheck:
+        """Return the IntegrityCheck for the data of this ETL. Data from
+        trusted servers are only checked for duplicates on a sample.
+        :param server: The server on which the data are located.
+        :return: The checker.
+        """
+        sample_size = None
+        trusted = [trusted_server.rstrip('/') for trusted_server
+                   in app.config['FRACTALIS_TRUSTED_SERVERS']]
+        if server.rstrip('/') in trusted:
+            sample_size = app.config['FRACTALIS_INTEGRITY_SAMPLE_SIZE']
+        return IntegrityCheck.factory(self.produces, sample_size)
+
     def sanity_check(self):
         """Check whether ETL is still sane and should be continued. E.g. if
         redis has been cleared it does not make sense to proceed. Raise an
@@ -112,52 +144,187 @@ class ETL(Task, metaclass=abc.ABCMeta):
             logger.error(error)
             raise RuntimeError(error)
 
-    def update_redis(self, data_frame: DataFrame) -> None:
+    def on_retry(self, exc, task_id, args, kwargs, einfo) -> None:
+        """ETLs that wait for their next attempt (see Task.retry()) are still
+        running as far as Fractalis is concerned, so report them as submitted
+        instead of 'RETRY'."""
+        self.backend.store_result(task_id=task_id, result=None,
+                                  state='SUBMITTED')
+
+    def record_stats(self, etl_stats: dict) -> None:
+        """Log the statistics of this run and add them to the metrics of all
+        runs. Metrics are nice to have, so failing to record them does not
+        fail the ETL.
+        :param etl_stats: The statistics of this run, see ETLStats.finish().
+        """
+        logger.info("ETL statistics: {}".format(etl_stats['total']))
+        httpclient.log_stats()
+        try:
+            etlstats.record(self.name, etl_stats)
+        except Exception as e:
+            logger.warning("Could not record ETL statistics. {}".format(e))
+
+    def update_redis(self, data_frame: DataFrame,
+                     etl_stats: dict = None) -> None:
         """Set several meta information that can be used to filter the data
         before the analysis.
         :param data_frame: The extracted and transformed data.
+        :param etl_stats: The statistics of the ETL run, see ETLStats.
         """
         value = redis.get(name='data:{}'.format(self.request.id))
         assert value is not None
         data_state = json.loads(value)
         if 'feature' in data_frame.columns:
-            features = data_frame['feature'].unique().tolist()
+            features = data_frame['feature'].drop_duplicates().tolist()
         else:
             features = []
         data_state['meta']['features'] = features
+        if etl_stats is not None:
+            data_state['meta']['etl_stats'] = etl_stats
         redis.setex(name='data:{}'.format(self.request.id),
                     value=json.dumps(data_state),
                     time=app.config['FRACTALIS_DATA_LIFETIME'])
 
     @staticmethod
-    def secure_load(data_frame: DataFrame, file_path: str) -> None:
+    def secure_load(data_frame: Union[DataFrame, Iterable[DataFrame]],
+                    file_path: str, chunk_size: int = None,
+                    codec: str = 'none') -> None:
         """Save data to the file system in encrypted form using AES and the
         web service secret key. This can be useful to comply with certain
-        security standards.
-        :param data_frame: DataFrame to write.
+        security standards. The data frame is pickled and encrypted in blocks
+        of FRACTALIS_ENCRYPT_CHUNK_SIZE rows, so it never has to exist as a
+        single serialized copy in memory.
+        :param data_frame: DataFrame to write or an iterable of data frames
+        with the same columns, which are written one after another.
         :param file_path: File to write to.
+        :param chunk_size: Number of rows per block. Defaults to
+        FRACTALIS_ENCRYPT_CHUNK_SIZE.
+        :param codec: The codec every block is compressed with before it is
+        encrypted.
         """
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        data = data_frame.to_json()
-        data = data.encode('utf-8')
-        key = get_cache_encrypt_key(app.config['SECRET_KEY'])
-        cipher = AES.new(key, AES.MODE_EAX)
-        ciphertext, tag = cipher.encrypt_and_digest(data)
-        with open(file_path, 'wb') as f:
-            [f.write(x) for x in (cipher.nonce, tag, ciphertext)]
+        key = encryption.derive_key(app.config['SECRET_KEY'])
+        chunk_size = chunk_size or app.config['FRACTALIS_ENCRYPT_CHUNK_SIZE']
+        if isinstance(data_frame, DataFrame):
+            data_frame = [data_frame]
+
+        def blocks() -> Iterator[DataFrame]:
+            for df in data_frame:
+                for i in range(0, max(df.shape[0], 1), chunk_size):
+                    yield df.iloc[i:i + chunk_size]
+
+        chunks = (compression.compress(
+            pickle.dumps(block, protocol=pickle.HIGHEST_PROTOCOL), codec)
+                  for block in blocks())
+        encryption.write_chunks(chunks, file_path, key)
 
     @staticmethod
-    def load(data_frame: DataFrame, file_path: str) -> None:
+    def load(data_frame: Union[DataFrame, Iterable[DataFrame]],
+             file_path: str, cache_format: str = 'pickle',
+             row_group_size: int = None, codec: str = 'gzip') -> None:
         """Load (save) the data to the file system.
-        :param data_frame: DataFrame to write.
+        :param data_frame: DataFrame to write or an iterable of data frames
+        with the same columns, which are appended to the file one after
+        another.
         :param file_path: File to write to.
+        :param cache_format: The CacheFormat used to write the file.
+        :param row_group_size: Number of rows per row group. Defaults to the
+        one of the CacheFormat.
+        :param codec: The compression codec used to write the file.
         """
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        data_frame.to_pickle(file_path, compression='gzip')
+        writer = CacheFormat.factory(cache_format)
+        writer.codec = codec
+        if row_group_size:
+            writer.row_group_size = row_group_size
+        if isinstance(data_frame, DataFrame):
+            writer.write(data_frame, file_path)
+            return
+        with writer.open_writer(file_path) as cache_writer:
+            for df in data_frame:
+                cache_writer.append(df)
+
+    def stream(self, server: str, token: str, descriptor: dict,
+               file_path: str, encrypt: bool, cache_format: str,
+               codec: str, etl_stats: etlstats.ETLStats) -> list:
+        """Extract, transform and load the data chunk by chunk. Only the
+        current chunk and a hash of every row is kept in memory. This is
+        called by run() for streaming ETLs.
+        :param server: The server on which the data are located.
+        :param token: The token used for authentication.
+        :param descriptor: Contains all necessary information to download data
+        :param file_path: The location where the data will be stored
+        :param encrypt: Whether or not the data should be encrypted.
+        :param cache_format: The CacheFormat used to write the data.
+        :param codec: The compression codec used to write the data.
+        :param etl_stats: Measures the time spent in every phase.
+        :return: The features of the data in order of appearance.
+        """
+        checker = self.make_checker(server)
+        checker.start()
+        features = OrderedDict()
+        stage = 'extraction'
+
+        def data_frames(raw_chunks: Iterator) -> Iterator[DataFrame]:
+            nonlocal stage
+            chunks = 0
+            while True:
+                stage = 'extraction'
+                etl_stats.enter('extract')
+                self.sanity_check()
+                raw_chunk = next(raw_chunks, None)
+                if raw_chunk is None:
+                    break
+                stage = 'transformation'
+                etl_stats.enter('transform')
+                data_frame = self.transform(raw_chunk, descriptor)
+                if not isinstance(data_frame, DataFrame):
+                    raise TypeError(
+                        "transform() must return 'pandas.DataFrame', but "
+                        "returned '{}' instead.".format(type(data_frame)))
+                checker.check_chunk(data_frame)
+                if 'feature' in data_frame.columns:
+                    features.update(OrderedDict.fromkeys(
+                        data_frame['feature'].drop_duplicates().tolist()))
+                etl_stats.add('transform', rows=data_frame.shape[0],
+                              cells=int(data_frame.size))
+                if app.config['FRACTALIS_ENCODE_CACHE']:
+                    data_frame = encoding.encode(data_frame)
+                chunks += 1
+                stage = 'loading'
+                etl_stats.enter('load')
+                yield data_frame
+            stage = 'transformation'
+            etl_stats.enter('transform')
+            if not chunks:
+                raise ValueError("extract() did not return any data.")
+            checker.finish()
+            stage = 'loading'
+            etl_stats.enter('load')
+
+        try:
+            etl_stats.enter('extract')
+            self.sanity_check()
+            # extract() can wait for the server before the file is opened
+            raw_chunks = iter(self.extract(server, token, descriptor))
+            if encrypt:
+                self.secure_load(data_frames(raw_chunks), file_path,
+                                 codec=codec)
+            else:
+                self.load(data_frames(raw_chunks), file_path,
+                          cache_format, codec=codec)
+            etl_stats.add('load', bytes_written=etlstats.file_size(file_path))
+        except Retry:
+            raise
+        except Exception as e:
+            logger.exception(e)
+            raise RuntimeError("Data {} failed. {}".format(stage, e))
+        return list(features)
 
     def run(self, server: str, token: str,
             descriptor: dict, file_path: str,
-            encrypt: bool) -> None:
+            encrypt: bool, cache_format: str = 'pickle',
+            codec: str = 'gzip', batch: dict = None) -> None:
         """Run extract, transform and load. This is called by the celery worker.
         This is called by the celery worker.
         :param
@@ -166,21 +333,45 @@ class ETL(Task, metaclass=abc.ABCMeta):
         :param descriptor: Contains all necessary information to download data
         :param file_path: The location where the data will be stored
         :param encrypt: Whether or not the data should be encrypted.
+        :param cache_format: The CacheFormat used to write the data.
+        :param codec: The compression codec used to write the data.
+        :param batch: The batch this ETL is part of. Used by extract() of
+        ETLs that support batched extraction.
         :return: The data id. Used to access the associated redis entry later
         """
         logger.info("Starting ETL process ...")
+        self.batch = batch
+        etl_stats = etlstats.ETLStats()
+        if self.streaming:
+            # the feature index, the matrix and the summaries need the
+            # complete data, so streamed data are stored without them
+            logger.info("Streaming data from server '{}'.".format(server))
+            features = self.stream(server, token, descriptor, file_path,
+                                   encrypt, cache_format, codec, etl_stats)
+            stats = etl_stats.finish()
+            try:
+                self.update_redis(DataFrame({'feature': features}), stats)
+            except Exception as e:
+                logger.exception(e)
+                raise RuntimeError("Data loading failed. {}".format(e))
+            self.record_stats(stats)
+            return
         logger.info("(E)xtracting data from server '{}'.".format(server))
         try:
+            etl_stats.enter('extract')
             self.sanity_check()
             raw_data = self.extract(server, token, descriptor)
+        except Retry:
+            raise
         except Exception as e:
             logger.exception(e)
             raise RuntimeError("Data extraction failed. {}".format(e))
         logger.info("(T)ransforming data to Fractalis format.")
         try:
+            etl_stats.enter('transform')
             self.sanity_check()
             data_frame = self.transform(raw_data, descriptor)
-            checker = IntegrityCheck.factory(self.produces)
+            checker = self.make_checker(server)
             checker.check(data_frame)
         except Exception as e:
             logger.exception(e)
@@ -190,13 +381,38 @@ class ETL(Task, metaclass=abc.ABCMeta):
                     "but returned '{}' instead.".format(type(data_frame))
             logging.error(error, exc_info=1)
             raise TypeError(error)
+        etl_stats.add('transform', rows=data_frame.shape[0],
+                      cells=int(data_frame.size))
+        logger.info("(L)oading data into the cache.")
         try:
+            etl_stats.enter('load')
             self.sanity_check()
+            row_group_size = None
+            if self.produces == 'numerical_array':
+                # enables tasks to read only the features they need
+                data_frame = feature_index.sort(data_frame)
+                row_group_size = \
+                    app.config['FRACTALIS_FEATURE_ROW_GROUP_SIZE']
+            if app.config['FRACTALIS_ENCODE_CACHE']:
+                data_frame = encoding.encode(data_frame)
             if encrypt:
-                self.secure_load(data_frame, file_path)
+                self.secure_load(data_frame, file_path, row_group_size, codec)
             else:
-                self.load(data_frame, file_path)
-            self.update_redis(data_frame)
+                self.load(data_frame, file_path,
+                          cache_format, row_group_size, codec)
+                if self.produces == 'numerical_array':
+                    matrix.write(data_frame, file_path)
+                    summary.write(matrix.read(file_path), file_path)
+            if self.produces == 'numerical_array':
+                # the feature labels must not be stored in plain text
+                key = encryption.derive_key(app.config['SECRET_KEY']) \
+                    if encrypt else None
+                feature_index.write(data_frame, file_path, row_group_size,
+                                    key)
+            etl_stats.add('load', bytes_written=etlstats.file_size(file_path))
+            stats = etl_stats.finish()
+            self.update_redis(data_frame, stats)
         except Exception as e:
             logger.exception(e)
             raise RuntimeError("Data loading failed. {}".format(e))
+        self.record_stats(stats)
@@ -3,6 +3,7 @@
 import os
 import abc
 import json
+import hashlib
 import logging
 from uuid import uuid4
 from typing import List, Union
@@ -10,7 +11,8 @@ from typing import List, Union
 from werkzeug.exceptions import Unauthorized
 
 from fractalis.cleanup import janitor
-from fractalis import app, redis, celery
+from fractalis import app, redis, celery, sync
+from fractalis.data import compression
 from fractalis.data.etl import ETL
 
 
@@ -24,6 +26,10 @@ class ETLHandler(metaclass=abc.ABCMeta):
     that it takes care of authentication business.
     """
 
+    # Whether data loaded via this handler may be shared between sessions.
+    # Handlers that set this must implement validate_access().
+    shareable = False
+
     @property
     @abc.abstractmethod
     def _handler(self) -> str:
@@ -66,6 +72,17 @@ class ETLHandler(metaclass=abc.ABCMeta):
                 logger.exception(e)
                 raise ValueError(f"Could not authenticate with API. {e}")
 
+    def validate_access(self, descriptor: dict) -> bool:
+        """Check with the server whether the credentials of this handler grant
+        access to the given data. This is used to decide whether data loaded
+        by another session can be shared with the current one, so this must
+        only return True if the credentials have been verified and the data
+        do not depend on who loads them.
+        :param descriptor: Describes the data and is used to download them.
+        :return: True if access is granted.
+        """
+        return False
+
     @staticmethod
     @abc.abstractmethod
     def make_label(descriptor: dict) -> str:
@@ -76,20 +93,27 @@ class ETLHandler(metaclass=abc.ABCMeta):
         pass
 
     def create_redis_entry(self, task_id: str, file_path: str,
-                           descriptor: dict, data_type: str) -> None:
+                           descriptor: dict, data_type: str,
+                           cache_format: str = 'pickle',
+                           codec: str = 'gzip') -> None:
         """Creates an entry in Redis that contains meta information for the
         data that are to be downloaded.
         :param task_id: Id associated with the loaded data.
         :param file_path: Location of the data on the file system.
         :param descriptor: Describes the data and is used to download them.
         :param data_type: The fractalis internal data type of the loaded data.
+        :param cache_format: The CacheFormat the data will be written with.
+        :param codec: The compression codec the data will be written with.
         """
         data_state = {
             'task_id': task_id,
             'file_path': file_path,
+            'format': cache_format,
+            'codec': codec,
             'label': self.make_label(descriptor),
             'data_type': data_type,
             'hash': self.descriptor_to_hash(descriptor),
+            'digest': self.descriptor_to_digest(descriptor),
             'meta': {
                 'descriptor': descriptor,
             }
@@ -109,6 +133,40 @@ class ETLHandler(metaclass=abc.ABCMeta):
         hash_value = int.from_bytes(string.encode('utf-8'), 'little')
         return hash_value
 
+    def descriptor_to_digest(self, descriptor: dict) -> str:
+        """Compute a stable digest of the server, handler and descriptor.
+        Unlike descriptor_to_hash() it does not depend on the order of the
+        keys in the descriptor. Used to share data between sessions.
+        :param descriptor: ETL descriptor.
+        :return: Hex encoded SHA-256 digest.
+        """
+        string = json.dumps([self._server, self._handler, descriptor],
+                            sort_keys=True)
+        return hashlib.sha256(string.encode('utf-8')).hexdigest()
+
+    def find_shared_task_id(self, descriptor: dict) -> Union[str, None]:
+        """Search the data loaded by all sessions for the given descriptor
+        and return its task id if the state is SUBMITTED or SUCCESS and this
+        handler has been granted access to the data.
+        :param descriptor: ETL descriptor.
+        :return: TaskID if shareable data have been found, None otherwise.
+        """
+        digest = self.descriptor_to_digest(descriptor)
+        task_id = redis.get('shared:{}'.format(digest))
+        if task_id is None or not redis.exists('data:{}'.format(task_id)):
+            return None
+        async_result = celery.AsyncResult(task_id)
+        if async_result.state not in ('SUBMITTED', 'SUCCESS'):
+            return None
+        try:
+            access = self.validate_access(descriptor)
+        except Exception as e:
+            logger.warning("Could not validate access for descriptor '{}'. "
+                           "Not sharing data. Reason: {}".format(
+                               descriptor, e))
+            return None
+        return task_id if access else None
+
     def find_duplicates(self, data_tasks: List[str],
                         descriptor: dict) -> List[str]:
         """Search for duplicates of the given descriptor and return a list
@@ -129,14 +187,18 @@ class ETLHandler(metaclass=abc.ABCMeta):
         return task_ids
 
     def remove_duplicates(self, data_tasks: List[str],
-                          descriptor: dict) -> None:
+                          descriptor: dict, sid: str = None) -> None:
         """Delete the duplicates of the given descriptor from redis and call
-        the janitor afterwards to cleanup orphaned files.
+        the janitor afterwards to cleanup orphaned files. Duplicates that are
+        still used by other sessions are kept.
         :param data_tasks: Limit duplicate search to.
         :param descriptor: ETL descriptor. Used to identify duplicates.
+        :param sid: The id of the session the duplicates are removed for.
         """
         task_ids = self.find_duplicates(data_tasks, descriptor)
         for task_id in task_ids:
+            if sid is not None and not sync.release_data(task_id, sid):
+                continue
             redis.delete('data:{}'.format(task_id))
         if task_ids:
             janitor.delay()
@@ -159,7 +221,8 @@ class ETLHandler(metaclass=abc.ABCMeta):
         return None
 
     def handle(self, descriptors: List[dict], data_tasks: List[str],
-               use_existing: bool, wait: bool = False) -> List[str]:
+               use_existing: bool, wait: bool = False,
+               sid: str = None) -> List[str]:
         """Create instances of ETL for the given descriptors and submit them
         (ETL implements celery.Task) to the broker. The task ids are returned
         to keep track of them.
@@ -170,10 +233,14 @@ class ETLHandler(metaclass=abc.ABCMeta):
         duplicates are deleted!
         :param wait: Makes this method synchronous by waiting for the tasks to
         return.
+        :param sid: The id of the requesting session. If given and
+        FRACTALIS_SHARE_CACHE is set, data already loaded by other sessions
+        are reused after validate_access() succeeded.
         :return: The list of task ids for the submitted tasks.
         """
         data_dir = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'data')
         task_ids = []
+        submissions = []
         for descriptor in descriptors:
             if use_existing:
                 task_id = self.find_duplicate_task_id(data_tasks, descriptor)
@@ -182,25 +249,81 @@ class ETLHandler(metaclass=abc.ABCMeta):
                     data_tasks.append(task_id)
                     continue
             else:
-                self.remove_duplicates(data_tasks, descriptor)
+                self.remove_duplicates(data_tasks, descriptor, sid)
+            share = (self.shareable and sid is not None and
+                     app.config['FRACTALIS_SHARE_CACHE'])
+            if share:
+                task_id = self.find_shared_task_id(descriptor)
+                if task_id:
+                    sync.add_reference(task_id, sid)
+                    task_ids.append(task_id)
+                    data_tasks.append(task_id)
+                    continue
             task_id = str(uuid4())
             file_path = os.path.join(data_dir, task_id)
             etl = ETL.factory(handler=self._handler, descriptor=descriptor)
-            self.create_redis_entry(task_id, file_path,
-                                    descriptor, etl.produces)
+            cache_format = app.config['FRACTALIS_CACHE_FORMAT']
+            codec = compression.for_data_type(etl.produces)
+            self.create_redis_entry(task_id, file_path, descriptor,
+                                    etl.produces, cache_format, codec)
+            if share:
+                digest = self.descriptor_to_digest(descriptor)
+                redis.setex(name='shared:{}'.format(digest), value=task_id,
+                            time=app.config['FRACTALIS_DATA_LIFETIME'])
+                sync.add_reference(task_id, sid)
             kwargs = dict(server=self._server, token=self._token,
                           descriptor=descriptor, file_path=file_path,
-                          encrypt=app.config['FRACTALIS_ENCRYPT_CACHE'])
-            async_result = etl.apply_async(kwargs=kwargs, task_id=task_id)
-            assert async_result.id == task_id
+                          encrypt=app.config['FRACTALIS_ENCRYPT_CACHE'],
+                          cache_format=cache_format, codec=codec)
+            submissions.append((etl, task_id, kwargs))
             task_ids.append(task_id)
             data_tasks.append(task_id)
+        self.make_batches(submissions)
+        for etl, task_id, kwargs in submissions:
+            async_result = etl.apply_async(kwargs=kwargs, task_id=task_id)
+            assert async_result.id == task_id
             if wait and async_result.state == 'SUBMITTED':
                 logger.debug("'wait' was set. Waiting for tasks to finish ...")
                 async_result.get(propagate=False)
         task_ids = list(set(task_ids))
         return task_ids
 
+    def batch_key(self, descriptor: dict) -> Union[str, None]:
+        """Descriptors with the same batch key are extracted together by a
+        single request to the server, see make_batches(). Only handlers whose
+        ETLs support batched extraction return keys.
+        :param descriptor: Describes the data and is used to download them.
+        :return: The batch key or None if the descriptor is never batched.
+        """
+        return None
+
+    def make_batches(self, submissions: List[tuple]) -> None:
+        """Group the ETLs about to be submitted by the batch key of their
+        descriptor and pass a 'batch' argument to every ETL in a group with
+        more than one member. The batch lists the task id, file path and
+        descriptor of all members, so the first member to run can extract
+        the data of all of them. Every ETL still has its own task id and data
+        state.
+        :param submissions: Tuples of ETL, task id and ETL arguments.
+        """
+        groups = {}
+        for etl, task_id, kwargs in submissions:
+            key = self.batch_key(kwargs['descriptor'])
+            if key is not None:
+                groups.setdefault(key, []).append((task_id, kwargs))
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            batch = {
+                'id': str(uuid4()),
+                'members': [{'task_id': task_id,
+                             'file_path': kwargs['file_path'],
+                             'descriptor': kwargs['descriptor']}
+                            for task_id, kwargs in members]
+            }
+            for task_id, kwargs in members:
+                kwargs['batch'] = batch
+
     @staticmethod
     def factory(handler: str, server: str, auth: dict) -> 'ETLHandler':
         """Return an instance of the implementation of ETLHandler that can
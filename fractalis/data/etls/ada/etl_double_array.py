@@ -26,7 +26,8 @@ class DoubleArrayETL(ETL):
         projection = descriptor['dictionary']['projection']
         cookie = shared.make_cookie(token=token)
         data = shared.get_field(server=server, data_set=data_set,
-                                cookie=cookie, projection=projection)
+                                cookie=cookie, projection=projection,
+                                batch=self.batch, task_id=self.request.id)
         return data
 
     def transform(self, raw_data: List[dict],
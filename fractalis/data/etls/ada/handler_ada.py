@@ -1,9 +1,9 @@
 """This module provides AdaHandler, an implementation of ETLHandler for ADA."""
 
 import logging
+from typing import Union
 
-import requests
-
+from fractalis.data import httpclient
 from fractalis.data.etlhandler import ETLHandler
 
 
@@ -21,12 +21,42 @@ class AdaHandler(ETLHandler):
     """
 
     _handler = 'ada'
+    shareable = True
 
     @staticmethod
     def make_label(descriptor: dict) -> str:
         return '{} ({})'.format(descriptor['dictionary']['label'],
                                 descriptor['data_set'])
 
+    def batch_key(self, descriptor: dict) -> Union[str, None]:
+        """Fields of the same data set are requested together. Nested fields
+        are not, because splitting the records would need to know their
+        structure."""
+        if '.' in descriptor['dictionary']['projection']:
+            return None
+        return descriptor['data_set']
+
+    def validate_access(self, descriptor: dict) -> bool:
+        """Request a single record of the data set. ADA responds with a
+        redirect to its login page if the session is not authorized."""
+        r = httpclient.get_client(self._server).get(
+            url='{}/dataSets/records/findCustom'.format(self._server),
+            headers={'Accept': 'application/json'},
+            params={
+                'dataSet': descriptor['data_set'],
+                'projection': ['_id'],
+                'limit': 1
+            },
+            cookies={'PLAY2AUTH_SESS_ID': self._token},
+            allow_redirects=False,
+            timeout=10)
+        if r.status_code != 200:
+            return False
+        try:
+            return isinstance(r.json(), list)
+        except ValueError:
+            return False
+
     def _get_token_for_credentials(self, server: str, auth: dict) -> str:
         try:
             user = auth['user']
@@ -37,10 +67,11 @@ class AdaHandler(ETLHandler):
             logger.exception(e)
             raise ValueError("The authentication object must contain the "
                              "non-empty fields 'user' and 'passwd'.")
-        r = requests.post(url='{}/login'.format(server),
-                          headers={'Accept': 'application/json'},
-                          data={'id': user, 'password': passwd},
-                          timeout=10)
+        r = httpclient.get_client(server).post(
+            url='{}/login'.format(server),
+            headers={'Accept': 'application/json'},
+            data={'id': user, 'password': passwd},
+            timeout=10)
         if r.status_code != 200:
             error = "Could not authenticate. " \
                     "Reason: [{}]: {}".format(r.status_code, r.text)
@@ -1,30 +1,38 @@
 """This module contains code that is shared between the different ETLs."""
 
+import os
+import json
 import logging
 from typing import List
 
 import pandas as pd
-import requests
+
+from fractalis import app, redis
+from fractalis.data import httpclient, encryption
 
 
 logger = logging.getLogger(__name__)
 
+# suffix of the files, stored next to the cache file, that hold the data
+# extracted for an ETL by another member of its batch
+BATCH_SUFFIX = '.batch.json'
+
 
 def make_cookie(token: str) -> dict:
     return {'PLAY2AUTH_SESS_ID': token}
 
 
-def get_field(server: str, data_set: str,
-              cookie: dict, projection: str) -> List[dict]:
-    r = requests.get(url='{}/dataSets/records/findCustom'.format(server),
-                     headers={'Accept': 'application/json'},
-                     params={
-                         'dataSet': data_set,
-                         'projection': ['_id', projection],
-                         'filterOrId': '[{{"fieldName":"{}","conditionType":"!=","value":""}}]'.format(projection)  # noqa: 501
-                     },
-                     cookies=cookie,
-                     timeout=60)
+def find_custom(server: str, data_set: str, cookie: dict,
+                projection: List[str], filter_or_id: str = None) -> List[dict]:
+    params = {'dataSet': data_set, 'projection': projection}
+    if filter_or_id is not None:
+        params['filterOrId'] = filter_or_id
+    r = httpclient.get_client(server).get(
+        url='{}/dataSets/records/findCustom'.format(server),
+        headers={'Accept': 'application/json'},
+        params=params,
+        cookies=cookie,
+        timeout=60)
     if r.status_code != 200:
         error = "Target server responded with " \
                 "status code {}.".format(r.status_code)
@@ -39,6 +47,97 @@ def get_field(server: str, data_set: str,
     return field_data
 
 
+def get_field(server: str, data_set: str,
+              cookie: dict, projection: str,
+              batch: dict = None, task_id: str = None) -> List[dict]:
+    if batch:
+        return get_batched_field(server, data_set, cookie, batch, task_id)
+    filter_or_id = '[{{"fieldName":"{}","conditionType":"!=","value":""}}]'.format(projection)  # noqa: 501
+    return find_custom(server, data_set, cookie,
+                       ['_id', projection], filter_or_id)
+
+
+def split_field(data: List[dict], projection: str) -> List[dict]:
+    """Extract a single field from records requested with several
+    projections. Like the '!=' filter used by get_field() this only drops
+    records where the field is an empty string.
+    :param data: The records.
+    :param projection: The field to extract.
+    :return: The records as if requested by get_field().
+    """
+    return [dict({'_id': row['_id']},
+                 **({projection: row[projection]} if projection in row
+                    else {}))
+            for row in data if row.get(projection) != '']
+
+
+def get_batched_field(server: str, data_set: str, cookie: dict,
+                      batch: dict, task_id: str) -> List[dict]:
+    """Return the field of the given batch member. The first member of a
+    batch to run requests the fields of all members that have not been
+    loaded, yet, with a single request and stores them next to their cache
+    files. The other members wait for it and only read their file.
+    :param server: The ADA server.
+    :param data_set: The data set all members belong to.
+    :param cookie: The authentication cookie.
+    :param batch: The batch created by ETLHandler.make_batches().
+    :param task_id: The task id of the member.
+    :return: The records as if requested by get_field().
+    """
+    members = {member['task_id']: member for member in batch['members']}
+    file_path = members[task_id]['file_path'] + BATCH_SUFFIX
+    with redis.lock('lock:batch:{}'.format(batch['id']),
+                    timeout=app.config['CELERYD_TASK_SOFT_TIME_LIMIT']):
+        if not os.path.exists(file_path):
+            # members that have been loaded already do not need data
+            pending = [member for member in members.values()
+                       if member['task_id'] == task_id or
+                       not os.path.exists(member['file_path'])]
+            projections = [member['descriptor']['dictionary']['projection']
+                           for member in pending]
+            logger.info("Requesting {} fields of data set '{}' "
+                        "at once.".format(len(projections), data_set))
+            data = find_custom(server, data_set, cookie,
+                               ['_id'] + sorted(set(projections)))
+            for member, projection in zip(pending, projections):
+                os.makedirs(os.path.dirname(member['file_path']),
+                            exist_ok=True)
+                write_batch_file(member['file_path'] + BATCH_SUFFIX,
+                                 split_field(data, projection))
+    data = read_batch_file(file_path)
+    os.remove(file_path)
+    return data
+
+
+def write_batch_file(file_path: str, data: List[dict]) -> None:
+    """Store the records of a batch member. The records are encrypted like
+    the cache if FRACTALIS_ENCRYPT_CACHE is set.
+    :param file_path: File to write to.
+    :param data: The records.
+    """
+    content = json.dumps(data).encode('utf-8')
+    if app.config['FRACTALIS_ENCRYPT_CACHE']:
+        key = encryption.derive_key(app.config['SECRET_KEY'])
+        encryption.write_chunks([content], file_path, key)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(content)
+
+
+def read_batch_file(file_path: str) -> List[dict]:
+    """Read the records written by write_batch_file().
+    :param file_path: File to read.
+    :return: The records.
+    """
+    if encryption.is_chunked(file_path):
+        key = encryption.derive_key(app.config['SECRET_KEY'])
+        content = b''.join(encryption.read_chunks(file_path, key))
+    else:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    return json.loads(content.decode('utf-8'))
+
+
 def prepare_ids(data: List[dict]) -> List[dict]:
     new_data = []
     for row in data:
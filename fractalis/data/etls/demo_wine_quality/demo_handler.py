@@ -4,11 +4,15 @@ from fractalis.data.etlhandler import ETLHandler
 class DemoHandler(ETLHandler):
 
     _handler = 'demo_wine_quality'
+    shareable = True
 
     @staticmethod
     def make_label(descriptor):
         return descriptor.get('field')
 
+    def validate_access(self, descriptor: dict) -> bool:
+        return True
+
     def _get_token_for_credentials(self, server: str, auth: dict) -> str:
         return 'foo'
 
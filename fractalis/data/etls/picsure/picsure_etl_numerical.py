@@ -1,10 +1,9 @@
 """Provides NumericalETL for PIC-SURE API."""
 
 import json
-from typing import List
+from typing import Iterator
 
 import pandas as pd
-from io import StringIO
 
 from fractalis.data.etl import ETL
 from fractalis.data.etls.picsure import shared
@@ -15,24 +14,27 @@ class NumericalETL(ETL):
 
     name = 'pic-sure_numerical_etl'
     produces = 'numerical'
+    # waiting for PIC-SURE is limited by FRACTALIS_PICSURE_DEADLINE
+    max_retries = None
+    # the CSV is transformed and stored chunk by chunk while downloading
+    streaming = True
 
     @staticmethod
     def can_handle(handler: str, descriptor: dict) -> bool:
         return handler == 'pic-sure' and \
                descriptor['dataType'] == 'numerical'
 
-    def extract(self, server: str, token: str, descriptor: dict) -> List[str]:
-        result_id = shared.submit_query(
-            query=json.dumps(descriptor['query']), server=server, token=token)
-        shared.wait_for_completion(
+    def extract(self, server: str, token: str,
+                descriptor: dict) -> Iterator[pd.DataFrame]:
+        result_id = shared.wait_for_completion(
+            task=self, query=json.dumps(descriptor['query']),
+            server=server, token=token)
+        return shared.iter_data(
             result_id=result_id, server=server, token=token)
-        raw_data = shared.get_data(
-            result_id=result_id, server=server, token=token)
-        return raw_data
 
-    def transform(self, raw_data: List[dict],
+    def transform(self, raw_data: pd.DataFrame,
                   descriptor: dict) -> pd.DataFrame:
-        df = pd.read_csv(StringIO(raw_data))
+        df = raw_data
         feature = df.columns[1]
         df.columns = ['id', 'value']
         df.insert(1, 'feature', feature)
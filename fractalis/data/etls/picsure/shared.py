@@ -1,9 +1,14 @@
-from time import sleep
+import json
+import time
 import logging
+from typing import Iterator
 
 import requests
+import pandas as pd
+from celery import Task
 
-from fractalis import app
+from fractalis import app, redis
+from fractalis.data import httpclient
 
 
 logger = logging.getLogger(__name__)
@@ -17,7 +22,7 @@ def raise_for_status(r):
 
 
 def submit_query(query: str, server: str, token: str) -> int:
-    r = requests.post(
+    r = httpclient.get_client(server).post(
         url='{}/queryService/runQuery'.format(server),
         data=query,
         headers={
@@ -31,49 +36,98 @@ def submit_query(query: str, server: str, token: str) -> int:
     return result_id
 
 
-def wait_for_completion(result_id: int, server, token):
-    def _check_status():
-        r = requests.get(
-            url='{}/resultService/resultStatus/{}'.format(
-                server, result_id),
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': 'Bearer {}'.format(token)
-            },
-            verify=app.config['ETL_VERIFY_SSL_CERT']
-        )
-        raise_for_status(r)
-        # noinspection PyBroadException
-        try:
-            return r.json()['status']
-        except Exception:
-            return r.text
-    while True:
-        status = _check_status()
-        if (status == 'CREATED') or (status == 'RUNNING'):
-            sleep(1)
-            continue
-        elif status == 'AVAILABLE':
-            break
-        else:
-            error = f'PIC-SURE API reported an error: {status}'
-            logger.exception(error)
+def get_status(result_id: int, server: str, token: str) -> str:
+    r = httpclient.get_client(server).get(
+        url='{}/resultService/resultStatus/{}'.format(
+            server, result_id),
+        headers={
+            'Content-Type': 'application/json',
+            'Authorization': 'Bearer {}'.format(token)
+        },
+        verify=app.config['ETL_VERIFY_SSL_CERT']
+    )
+    raise_for_status(r)
+    # noinspection PyBroadException
+    try:
+        return r.json()['status']
+    except Exception:
+        return r.text
+
+
+def wait_for_completion(task: Task, query: str, server: str,
+                        token: str) -> int:
+    """Submit the query and return the result id once the result is
+    available. Instead of blocking the worker while PIC-SURE computes the
+    result, the task is retried with an exponential backoff. The result id
+    is kept in redis, so the query is submitted only by the first attempt.
+    :param task: The ETL task calling this.
+    :param query: The PIC-SURE query.
+    :param server: The PIC-SURE server.
+    :param token: The token used for authentication.
+    :return: The result id.
+    """
+    key = 'picsure:{}'.format(task.request.id)
+    deadline = app.config['FRACTALIS_PICSURE_DEADLINE']
+    value = redis.get(key)
+    if value is None:
+        value = json.dumps({
+            'result_id': submit_query(query=query, server=server, token=token),
+            'submitted': time.time()
+        })
+        redis.setex(name=key, value=value, time=deadline * 2)
+    query_state = json.loads(value)
+    result_id = query_state['result_id']
+    status = get_status(result_id=result_id, server=server, token=token)
+    if status == 'AVAILABLE':
+        redis.delete(key)
+        return result_id
+    if (status == 'CREATED') or (status == 'RUNNING'):
+        if time.time() - query_state['submitted'] > deadline:
+            redis.delete(key)
+            error = f'PIC-SURE result {result_id} has not been available ' \
+                    f'after {deadline} seconds.'
+            logger.error(error)
             raise RuntimeError(error)
+        countdown = min(app.config['FRACTALIS_PICSURE_MAX_POLL_INTERVAL'],
+                        app.config['FRACTALIS_PICSURE_POLL_INTERVAL'] *
+                        2 ** task.request.retries)
+        raise task.retry(countdown=countdown)
+    redis.delete(key)
+    error = f'PIC-SURE API reported an error: {status}'
+    logger.exception(error)
+    raise RuntimeError(error)
 
 
-def get_data(result_id, server, token):
-    r = requests.get(
+def iter_data(result_id, server, token) -> Iterator[pd.DataFrame]:
+    """Download the result as CSV and parse it while it is downloaded. All
+    columns are read as strings, so they are parsed the same way in every
+    chunk. The chunks are yielded as soon as they are parsed."""
+    r = httpclient.get_client(server).get(
         url='{}/resultService/result/{}/CSV'.format(
             server, result_id),
         headers={
             'Content-Type': 'application/json',
             'Authorization': 'Bearer {}'.format(token)
         },
-        verify=app.config['ETL_VERIFY_SSL_CERT']
+        verify=app.config['ETL_VERIFY_SSL_CERT'],
+        stream=True
     )
     raise_for_status(r)
-    if not r.text:
+    try:
+        # let urllib3 undo a possible content encoding
+        r.raw.decode_content = True
+        yield from pd.read_csv(
+            r.raw, dtype=str,
+            chunksize=app.config['FRACTALIS_PICSURE_CSV_CHUNK_SIZE'])
+    except pd.errors.EmptyDataError:
         error = f'PIC-SURE API returned no data.'
         logger.exception(error)
         raise RuntimeError(error)
-    return r.text
+    finally:
+        r.close()
+
+
+def get_data(result_id, server, token) -> pd.DataFrame:
+    """Download the result as CSV and parse it into a single data frame.
+    See iter_data()."""
+    return pd.concat(iter_data(result_id, server, token))
@@ -3,9 +3,10 @@ tranSMART."""
 
 import logging
 from enum import Enum
-import requests
 
+from fractalis.data import httpclient
 from fractalis.data.etlhandler import ETLHandler
+from fractalis.data.etls.transmart import shared
 
 
 logger = logging.getLogger(__name__)
@@ -25,26 +26,50 @@ class TransmartHandler(ETLHandler):
     """
 
     _handler = 'transmart'
+    shareable = True
 
     @staticmethod
     def make_label(descriptor: dict) -> str:
         return descriptor['label']
 
+    def validate_access(self, descriptor: dict) -> bool:
+        """Request the first observation of the descriptor from the endpoint
+        the ETLs download the data from. Counting the observations is not
+        enough, because tranSMART answers counts also for tokens that only
+        grant access to summary statistics.
+        """
+        params = shared.get_observation_params(descriptor)
+        params['limit'] = 1
+        r = httpclient.get_client(self._server).post(
+            url='{}/v2/observations'.format(self._server),
+            json=params,
+            headers={
+                'Accept': 'application/json',
+                'Authorization': 'Bearer {}'.format(self._token)
+            },
+            idempotent=True,
+            timeout=10,
+            stream=True)
+        # the status is all we need, so the body is never downloaded
+        r.close()
+        return r.status_code == 200
+
     @staticmethod
     def retrieve_token(url: str, client_id: str, user: str, passwd: str) -> str:
         """
         Retrieve access token from the server.
         """
-        r = requests.post(url=url,
-                          params={
-                              'grant_type': 'password',
-                              'client_id': client_id,
-                              'client_secret': '',
-                              'username': user,
-                              'password': passwd
-                          },
-                          headers={'Accept': 'application/json'},
-                          timeout=10)
+        r = httpclient.get_client(url).post(
+            url=url,
+            params={
+                'grant_type': 'password',
+                'client_id': client_id,
+                'client_secret': '',
+                'username': user,
+                'password': passwd
+            },
+            headers={'Accept': 'application/json'},
+            timeout=10)
         if r.status_code != 200:
             error = "Could not authenticate. " \
                     "Reason: [{}]: {}".format(r.status_code, r.text)
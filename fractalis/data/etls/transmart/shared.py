@@ -1,24 +1,28 @@
 """This module provides shared functionality to the transmart ETLs."""
 
 import logging
-import pandas as pd
+from typing import BinaryIO, List
 from urllib.parse import unquote_plus
 
-import requests
+import ijson
+import numpy as np
+import pandas as pd
 
+from fractalis.data import httpclient
 from fractalis.data.etl import ETL
 
 logger = logging.getLogger(__name__)
 
 NUMERICAL_FIELD = 'numericValue'
 CATEGORICAL_FIELD = 'stringValue'
+# number of cells decoded before they are moved into compact arrays
+CELL_BATCH_SIZE = 100000
 
 
-def extract_data(server: str, descriptor: dict, token: str) -> dict:
-    """Extract data from transmart.
-    :param server: The target server host.
+def get_observation_params(descriptor: dict) -> dict:
+    """Build the body of the /v2/observations request for the descriptor.
     :param descriptor: Dict describing the data to download.
-    :param token: The token used for authentication.
+    :return: The request parameters.
     """
     params = dict(
         constraint=descriptor['constraint'],
@@ -30,14 +34,30 @@ def extract_data(server: str, descriptor: dict, token: str) -> dict:
 
         if 'biomarker_constraint' in descriptor:
             params['biomarker_constraint'] = descriptor['biomarker_constraint']
+    return params
 
-    r = requests.post(url='{}/v2/observations'.format(server),
-                     json=params,
-                     headers={
-                         'Accept': 'application/json',
-                         'Authorization': 'Bearer {}'.format(token)
-                     },
-                     timeout=2000)
+
+def extract_data(server: str, descriptor: dict, token: str,
+                 value_field: str = NUMERICAL_FIELD) -> dict:
+    """Extract data from transmart. The response is decoded while it is
+    downloaded, see parse_observations().
+    :param server: The target server host.
+    :param descriptor: Dict describing the data to download.
+    :param token: The token used for authentication.
+    :param value_field: The cell field containing the values.
+    """
+    params = get_observation_params(descriptor)
+    # the observations are only read, so the request can be retried
+    r = httpclient.get_client(server).post(
+        url='{}/v2/observations'.format(server),
+        json=params,
+        headers={
+            'Accept': 'application/json',
+            'Authorization': 'Bearer {}'.format(token)
+        },
+        idempotent=True,
+        timeout=2000,
+        stream=True)
 
     logger.info('URL called: {}'.format(
         unquote_plus(r.url))
@@ -49,59 +69,136 @@ def extract_data(server: str, descriptor: dict, token: str) -> dict:
         raise ValueError(error)
 
     try:
-        return r.json()
+        # let urllib3 undo a possible content encoding
+        r.raw.decode_content = True
+        return parse_observations(r.raw, value_field)
     except Exception as e:
         logger.exception(e)
         raise ValueError("Got unexpected data format.")
+    finally:
+        r.close()
 
 
-def get_dimension_index(obs, dimension):
-    return list(obs['dimensionElements'].keys()).index(dimension)
+def to_index_array(indexes: List[List[int]]) -> np.ndarray:
+    """Turn the dimension indexes of several cells into a single array.
+    Missing indexes are -1.
+    :param indexes: The dimension indexes of every cell.
+    :return: Integer array with one row per cell.
+    """
+    width = max(map(len, indexes), default=0)
+    return np.array([row + [-1] * (width - len(row)) for row in indexes],
+                    dtype=np.int64).reshape(len(indexes), width)
 
 
-def get_dimension_element(obs, dimension, index):
-    return obs['dimensionElements'][dimension][index]
+def concat_index_arrays(arrays: List[np.ndarray]) -> np.ndarray:
+    """Concatenate the arrays returned by to_index_array().
+    :param arrays: The arrays to concatenate.
+    :return: Integer array with one row per cell.
+    """
+    width = max((array.shape[1] for array in arrays), default=0)
+    arrays = [np.pad(array, [(0, 0), (0, width - array.shape[1])],
+                     mode='constant', constant_values=-1)
+              for array in arrays]
+    return np.concatenate(arrays) if arrays else np.empty((0, 0), np.int64)
+
+
+def parse_observations(stream: BinaryIO, value_field: str,
+                       batch_size: int = CELL_BATCH_SIZE) -> dict:
+    """Decode a tranSMART hypercube incrementally. Instead of building a dict
+    for every cell, the dimension indexes and values of batch_size cells at a
+    time are moved into arrays, so the memory needed depends on the size of
+    the data and not on the size of the JSON.
+    :param stream: The response body.
+    :param value_field: The cell field containing the values.
+    :param batch_size: The number of cells to decode before they are moved
+    into arrays.
+    :return: Dict with the 'dimensionElements' of the hypercube, the
+    'dimensionIndexes' of all cells as integer array and the 'values' of all
+    cells as array.
+    """
+    dtype = float if value_field == NUMERICAL_FIELD else object
+    dimension_elements = {}
+    index_arrays, value_arrays = [], []
+    indexes, values = [], []
+    cell_indexes, cell_value = [], None
+    builder = None
+    events = ijson.parse(stream, use_float=True)
+    for i, (prefix, event, value) in enumerate(events):
+        if i == 0 and event != 'start_map':
+            raise ValueError("Observations must be a JSON object.")
+        if prefix == 'cells.item.dimensionIndexes.item':
+            cell_indexes.append(-1 if value is None else value)
+        elif prefix == 'cells.item.' + value_field:
+            cell_value = value
+        elif prefix == 'cells.item' and event == 'start_map':
+            cell_indexes, cell_value = [], None
+        elif prefix == 'cells.item' and event == 'end_map':
+            indexes.append(cell_indexes)
+            values.append(cell_value)
+            if len(values) >= batch_size:
+                index_arrays.append(to_index_array(indexes))
+                value_arrays.append(np.array(values, dtype=dtype))
+                indexes, values = [], []
+        elif prefix.startswith('dimensionElements'):
+            if builder is None:
+                builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            if prefix == 'dimensionElements' and event == 'end_map':
+                dimension_elements = builder.value
+    index_arrays.append(to_index_array(indexes))
+    value_arrays.append(np.array(values, dtype=dtype))
+    return {
+        'dimensionElements': dimension_elements,
+        'dimensionIndexes': concat_index_arrays(index_arrays),
+        'values': np.concatenate(value_arrays)
+    }
 
 
-def transform_clinical(raw_data: dict, value_field: str) -> pd.DataFrame:
-    patient_idx = get_dimension_index(raw_data, 'patient')
-    rows = []
+def get_dimension_index(obs, dimension):
+    return list(obs['dimensionElements'].keys()).index(dimension)
+
 
-    for entry in raw_data['cells']:
-        patient_element = entry['dimensionIndexes'][patient_idx]
-        patient = get_dimension_element(raw_data, 'patient', patient_element)
+def take_dimension_field(raw_data: dict, dimension: str,
+                         field: str) -> np.ndarray:
+    """Look up a field of the dimension element of every cell. The field of
+    all elements is collected once and then taken by the element indexes of
+    the cells in a single operation.
+    :param raw_data: The return value of parse_observations().
+    :param dimension: The dimension, e.g. 'patient'.
+    :param field: The field of the dimension elements, e.g. 'inTrialId'.
+    :return: Array with the field value for every cell.
+    """
+    indexes = raw_data['dimensionIndexes']
+    if not indexes.shape[0]:
+        return np.empty(0, dtype=object)
+    indexes = indexes[:, get_dimension_index(raw_data, dimension)]
+    if (indexes < 0).any():
+        error = "Found cells without '{}' dimension.".format(dimension)
+        logger.error(error)
+        raise ValueError(error)
+    labels = np.empty(len(raw_data['dimensionElements'][dimension]),
+                      dtype=object)
+    labels[:] = [element[field]
+                 for element in raw_data['dimensionElements'][dimension]]
+    return labels.take(indexes)
 
-        rows.append([
-            patient['inTrialId'],
-            entry[value_field]
-        ])
 
-    df = pd.DataFrame(rows, columns=['id', 'value'])
+def transform_clinical(raw_data: dict, value_field: str) -> pd.DataFrame:
+    df = pd.DataFrame({
+        'id': take_dimension_field(raw_data, 'patient', 'inTrialId'),
+        'value': raw_data['values']
+    }, columns=['id', 'value'])
     feature = df.columns[1]
     df.insert(1, 'feature', feature)
     return df
 
 
 def transform_highdim(raw_data: dict):
-    sample_idx = get_dimension_index(raw_data, 'assay')
-    feature_idx = get_dimension_index(raw_data, 'biomarker')
-    rows = []
-
-    for entry in raw_data['cells']:
-        sample_element = entry['dimensionIndexes'][sample_idx]
-        sample = get_dimension_element(raw_data, 'assay', sample_element)
-
-        feature_element = entry['dimensionIndexes'][feature_idx]
-        feature = get_dimension_element(raw_data, 'biomarker', feature_element)
-
-        rows.append([
-            sample['sampleCode'],
-            entry[NUMERICAL_FIELD],
-            feature['label']
-        ])
-
-    df = pd.DataFrame(rows, columns=['id', 'value', 'feature'])
-    return df
+    return pd.DataFrame({
+        'id': take_dimension_field(raw_data, 'assay', 'sampleCode'),
+        'value': raw_data['values'],
+        'feature': take_dimension_field(raw_data, 'biomarker', 'label')
+    }, columns=['id', 'value', 'feature'])
 
 
 def create_etl_type(name_, produces_, field_name):
@@ -123,7 +220,8 @@ def create_etl_type(name_, produces_, field_name):
             return handler == 'transmart' and descriptor['data_type'] == produces_
 
         def extract(self, server: str, token: str, descriptor: dict) -> dict:
-            return extract_data(server=server, descriptor=descriptor, token=token)
+            return extract_data(server=server, descriptor=descriptor,
+                                token=token, value_field=field_name)
 
         def transform(self, raw_data: dict, descriptor: dict) -> pd.DataFrame:
             if self.produces in ('numerical', 'categorical'):
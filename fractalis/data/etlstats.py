@@ -0,0 +1,185 @@
+"""This module measures the phases of ETL runs.
+
+Every ETL run measures the wall time, the CPU time, the peak resident set size
+(RSS) and the bytes downloaded during its extract, transform and load phases,
+together with the rows and cells it produced and the bytes it wrote. The
+statistics of a run are stored in the meta information of its data state and
+added to the totals of all runs in redis, which are served by /misc/metrics.
+"""
+
+import os
+import glob
+import time
+import logging
+import resource
+from collections import OrderedDict
+
+from fractalis import redis
+from fractalis.data import httpclient
+
+logger = logging.getLogger(__name__)
+
+PHASES = ['extract', 'transform', 'load']
+METRICS = ['wall_time', 'cpu_time', 'peak_rss', 'bytes_downloaded',
+           'rows', 'cells', 'bytes_written']
+HTTP_METRICS = ['requests', 'bytes', 'retries', 'errors']
+ETL_METRICS_KEY = 'metrics:etl'
+HTTP_METRICS_KEY = 'metrics:http'
+
+
+def peak_rss() -> int:
+    """Return the peak RSS of this process in bytes. The high water mark in
+    /proc is preferred, because unlike ru_maxrss it can be reset.
+    :return: The peak RSS.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak RSS of this process, so it reflects what happens from
+    now on rather than everything the worker process did before. This is
+    only possible on Linux and silently does nothing elsewhere."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def http_totals() -> dict:
+    """Sum up the statistics of all HTTP clients of this process.
+    :return: Dict with the totals of every metric in HTTP_METRICS.
+    """
+    totals = dict.fromkeys(HTTP_METRICS, 0)
+    for stats in httpclient.get_stats().values():
+        for metric in HTTP_METRICS:
+            totals[metric] += stats.get(metric, 0)
+    return totals
+
+
+def file_size(file_path: str) -> int:
+    """Return the size of the given cache file and all files stored next to
+    it, like its feature index.
+    :param file_path: The location of the cache file.
+    :return: The size in bytes.
+    """
+    paths = [file_path] + glob.glob(file_path + '.*')
+    return sum(os.path.getsize(path) for path in paths
+               if os.path.isfile(path))
+
+
+class ETLStats:
+    """Collects the statistics of a single ETL run. The run calls enter()
+    whenever it starts a phase. Time spent in a phase is added up, so
+    streaming ETLs can switch between phases for every chunk."""
+
+    def __init__(self) -> None:
+        self.phases = OrderedDict()
+        self.phase = None
+        self._start = None
+        self._http = http_totals()
+
+    def enter(self, phase: str) -> None:
+        """Stop measuring the current phase and start measuring the given
+        one.
+        :param phase: One of PHASES.
+        """
+        if phase == self.phase:
+            return
+        self._stop()
+        self.phase = phase
+        self.phases.setdefault(phase, dict.fromkeys(METRICS, 0))
+        reset_peak_rss()
+        self._start = (time.perf_counter(), time.process_time(),
+                       http_totals()['bytes'])
+
+    def _stop(self) -> None:
+        if self.phase is None:
+            return
+        wall_time, cpu_time, downloaded = self._start
+        stats = self.phases[self.phase]
+        stats['wall_time'] += time.perf_counter() - wall_time
+        stats['cpu_time'] += time.process_time() - cpu_time
+        stats['bytes_downloaded'] += http_totals()['bytes'] - downloaded
+        stats['peak_rss'] = max(stats['peak_rss'], peak_rss())
+        self.phase = None
+
+    def add(self, phase: str, **counts: int) -> None:
+        """Add counts like 'rows' or 'bytes_written' to the given phase.
+        :param phase: One of PHASES.
+        :param counts: The counts to add.
+        """
+        stats = self.phases.setdefault(phase, dict.fromkeys(METRICS, 0))
+        for metric, count in counts.items():
+            stats[metric] += count
+
+    def finish(self) -> dict:
+        """Stop measuring and return the statistics of the run.
+        :return: Dict with the statistics of every 'phase', their 'total' and
+        the 'http' requests sent during the run.
+        """
+        self._stop()
+        http = http_totals()
+        total = {metric: sum(stats[metric] for stats in self.phases.values())
+                 for metric in METRICS}
+        total['peak_rss'] = max([stats['peak_rss']
+                                 for stats in self.phases.values()] or [0])
+        return {
+            'phases': self.phases,
+            'total': total,
+            'http': {metric: http[metric] - self._http[metric]
+                     for metric in HTTP_METRICS}
+        }
+
+
+def record(name: str, etl_stats: dict) -> None:
+    """Add the statistics of an ETL run to the totals of all runs.
+    :param name: The name of the ETL.
+    :param etl_stats: The return value of ETLStats.finish().
+    """
+    pipe = redis.pipeline()
+    pipe.hincrby(ETL_METRICS_KEY, 'runs', 1)
+    pipe.hincrby(ETL_METRICS_KEY, 'runs.{}'.format(name), 1)
+    for phase, stats in etl_stats['phases'].items():
+        pipe.hincrby(ETL_METRICS_KEY, '{}.runs'.format(phase), 1)
+        for metric in METRICS:
+            pipe.hincrbyfloat(ETL_METRICS_KEY,
+                              '{}.{}'.format(phase, metric), stats[metric])
+    for metric, count in etl_stats['http'].items():
+        pipe.hincrby(HTTP_METRICS_KEY, metric, count)
+    pipe.execute()
+
+
+def get_metrics() -> dict:
+    """Read the totals of all ETL runs and compute the mean of every phase.
+    :return: Dict with the 'etl' and the 'http' metrics.
+    """
+    etl = redis.hgetall(ETL_METRICS_KEY)
+    phases = OrderedDict()
+    for phase in PHASES:
+        runs = int(etl.get('{}.runs'.format(phase), 0))
+        if not runs:
+            continue
+        phases[phase] = {'runs': runs}
+        for metric in METRICS:
+            value = float(etl.get('{}.{}'.format(phase, metric), 0))
+            phases[phase][metric] = {'total': value, 'mean': value / runs}
+    return {
+        'etl': {
+            'runs': int(etl.get('runs', 0)),
+            'runs_by_etl': {key.split('.', 1)[1]: int(value)
+                            for key, value in etl.items()
+                            if key.startswith('runs.')},
+            'phases': phases
+        },
+        'http': {metric: int(value) for metric, value in
+                 redis.hgetall(HTTP_METRICS_KEY).items()}
+    }
@@ -0,0 +1,96 @@
+"""This module provides the feature index for 'numerical_array' data.
+
+ETLs write 'numerical_array' data sorted by feature, so all rows of a feature
+are stored next to each other. The feature index lists the row range of every
+feature and is stored next to the regular cache file. With it, readers can
+work out which row groups (or encrypted chunks) contain the requested features
+and skip every other part of the file. The index of an encrypted cache is
+encrypted as well, because the feature labels (e.g. gene names) are part of
+the data.
+"""
+
+import os
+import json
+import logging
+from typing import List, Union
+
+import numpy as np
+from pandas import Categorical, DataFrame
+
+from fractalis.data import encryption
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.offsets.json'
+
+
+def sort(data_frame: DataFrame) -> DataFrame:
+    """Sort the data by feature. The order within a feature is kept.
+    :param data_frame: Data in the long id/feature/value format.
+    :return: The sorted data with a new default index.
+    """
+    data_frame = data_frame.sort_values('feature', kind='mergesort')
+    return data_frame.reset_index(drop=True)
+
+
+def write(data_frame: DataFrame, file_path: str, row_group_size: int,
+          key: bytes = None) -> None:
+    """Write the feature index for the given data.
+    :param data_frame: Data sorted with sort().
+    :param file_path: The location of the regular cache file.
+    :param row_group_size: The number of rows per row group the cache file
+    has been written with.
+    :param key: Encrypt the index with this AES key. Plain text if None.
+    """
+    features = Categorical(data_frame['feature'])
+    codes = features.codes
+    starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate([[0], starts]) if codes.size else starts
+    stops = np.append(starts[1:], codes.size)
+    offsets = {str(features.categories[codes[start]]): [int(start), int(stop)]
+               for start, stop in zip(starts, stops)}
+    content = json.dumps({'row_group_size': row_group_size,
+                          'offsets': offsets}).encode('utf-8')
+    if key is not None:
+        encryption.write_chunks([content], file_path + INDEX_SUFFIX, key)
+        return
+    with open(file_path + INDEX_SUFFIX, 'wb') as f:
+        f.write(content)
+
+
+def read(file_path: str, key: bytes = None) -> Union[dict, None]:
+    """Read the feature index stored for the given cache file.
+    :param file_path: The location of the regular cache file.
+    :param key: The AES key the index has been encrypted with.
+    :return: The feature index or None if there is none.
+    """
+    index_path = file_path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return None
+    if encryption.is_chunked(index_path):
+        if key is None:
+            error = "The feature index '{}' is encrypted, but no key was " \
+                    "given.".format(index_path)
+            logger.error(error)
+            raise ValueError(error)
+        content = b''.join(encryption.read_chunks(index_path, key))
+    else:
+        with open(index_path, 'rb') as f:
+            content = f.read()
+    return json.loads(content.decode('utf-8'))
+
+
+def row_groups(index: dict, features: List[str]) -> List[int]:
+    """Compute the row groups that contain the given features.
+    :param index: The feature index returned by read().
+    :param features: The features to look up. Unknown features are ignored.
+    :return: The sorted ids of all row groups containing the features.
+    """
+    size = index['row_group_size']
+    groups = set()
+    for feature in map(str, features):
+        if feature not in index['offsets']:
+            continue
+        start, stop = index['offsets'][feature]
+        groups.update(range(start // size, (stop - 1) // size + 1))
+    return sorted(groups)
@@ -0,0 +1,27 @@
+"""This module provides the 'feather' cache format."""
+
+from typing import List
+
+from pyarrow import feather
+from pandas import DataFrame
+
+from fractalis.data.cache import CacheFormat
+
+
+class FeatherFormat(CacheFormat):
+    """Implements CacheFormat via uncompressed Arrow/Feather files. Reading
+    them is little more than copying columns from disk into memory, which
+    makes this the fastest format to read. Only whole columns can be read
+    partially, row groups are selected after loading. Feather files are
+    always uncompressed, so `codec` is ignored."""
+
+    name = 'feather'
+
+    def write(self, data_frame: DataFrame, file_path: str) -> None:
+        # feather does not support storing the index
+        feather.write_feather(data_frame.reset_index(drop=True), file_path)
+
+    def read(self, file_path: str, columns: List[str] = None,
+             row_groups: List[int] = None) -> DataFrame:
+        data_frame = feather.read_feather(file_path, columns=columns)
+        return self.select(data_frame, row_groups=row_groups)
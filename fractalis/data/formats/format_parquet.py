@@ -0,0 +1,76 @@
+"""This module provides the 'parquet' cache format."""
+
+import logging
+from typing import List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from fractalis.data import compression, encoding
+from fractalis.data.cache import CacheFormat, CacheWriter
+
+logger = logging.getLogger(__name__)
+
+
+class ParquetFormat(CacheFormat):
+    """Implements CacheFormat via Apache Parquet files. The data are stored
+    column by column in row groups of `row_group_size` rows, so readers can
+    load single columns and row groups without touching the rest of the file.
+    Columns are compressed with `codec` as far as it is supported by Parquet.
+    Its compression level is ignored.
+    """
+
+    name = 'parquet'
+
+    def write(self, data_frame: DataFrame, file_path: str) -> None:
+        # parquet dictionary encodes strings on its own
+        data_frame = encoding.decode(data_frame)
+        table = pa.Table.from_pandas(data_frame, preserve_index=False)
+        name, _ = compression.parse(self.codec)
+        pq.write_table(table, file_path,
+                       row_group_size=self.row_group_size,
+                       compression=name.upper())
+
+    def read(self, file_path: str, columns: List[str] = None,
+             row_groups: List[int] = None) -> DataFrame:
+        if row_groups is None:
+            table = pq.read_table(file_path, columns=columns)
+        else:
+            parquet_file = pq.ParquetFile(file_path)
+            tables = [parquet_file.read_row_group(i, columns=columns)
+                      for i in row_groups
+                      if i < parquet_file.num_row_groups]
+            if not tables:
+                return DataFrame(columns=columns or parquet_file.schema.names)
+            table = pa.concat_tables(tables)
+        return table.to_pandas()
+
+    def open_writer(self, file_path: str) -> CacheWriter:
+        return ParquetWriter(self, file_path)
+
+
+class ParquetWriter(CacheWriter):
+    """Appends every data frame as one or more row groups to the file."""
+
+    def __init__(self, cache_format: ParquetFormat, file_path: str) -> None:
+        super().__init__(cache_format, file_path)
+        self.writer = None
+
+    def append(self, data_frame: DataFrame) -> None:
+        data_frame = encoding.decode(data_frame)
+        table = pa.Table.from_pandas(data_frame, preserve_index=False)
+        if self.writer is None:
+            name, _ = compression.parse(self.cache_format.codec)
+            self.writer = pq.ParquetWriter(self.file_path, table.schema,
+                                           compression=name.upper())
+        elif not table.schema.equals(self.writer.schema):
+            error = "All appended data frames must have the same schema."
+            logger.error(error)
+            raise ValueError(error)
+        self.writer.write_table(
+            table, row_group_size=self.cache_format.row_group_size)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,59 @@
+"""This module provides the 'pickle' cache format. This is the format
+Fractalis has always used and the fallback for data states that do not
+specify a format."""
+
+import pickle
+from typing import List
+
+from pandas import DataFrame, concat
+
+from fractalis.data import compression
+from fractalis.data.cache import CacheFormat, CacheWriter
+
+
+class PickleFormat(CacheFormat):
+    """Implements CacheFormat via pickle files compressed with `codec`.
+    Pickles can only be read as a whole, so column and row group selection
+    happens after the file has been loaded. Files written by a writer contain
+    one pickle per appended frame."""
+
+    name = 'pickle'
+    # files written before the codec was configurable are gzipped
+    codec = 'gzip'
+
+    def write(self, data_frame: DataFrame, file_path: str) -> None:
+        with compression.open_file(file_path, 'wb', self.codec) as f:
+            pickle.dump(data_frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def read(self, file_path: str, columns: List[str] = None,
+             row_groups: List[int] = None) -> DataFrame:
+        frames = []
+        with compression.open_file(file_path, 'rb', self.codec) as f:
+            while True:
+                try:
+                    frames.append(pickle.load(f))
+                except EOFError:
+                    break
+        if len(frames) == 1:
+            data_frame = frames[0]
+        else:
+            data_frame = concat(frames, ignore_index=True)
+        return self.select(data_frame, columns, row_groups)
+
+    def open_writer(self, file_path: str) -> CacheWriter:
+        return PickleWriter(self, file_path)
+
+
+class PickleWriter(CacheWriter):
+    """Appends every data frame as a pickle of its own to the file."""
+
+    def __init__(self, cache_format: PickleFormat, file_path: str) -> None:
+        super().__init__(cache_format, file_path)
+        self.file = compression.open_file(file_path, 'wb',
+                                          cache_format.codec)
+
+    def append(self, data_frame: DataFrame) -> None:
+        pickle.dump(data_frame, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,169 @@
+"""This module provides the HTTP clients used by the ETLs.
+
+Instead of calling requests.get() or requests.post(), which open a new
+connection for every call, ETLs get an HttpClient for their server from
+get_client(). Every worker process keeps one client per server, so
+connections are pooled and kept alive across ETL runs. Idempotent calls that
+fail because of a connection error or a temporary server error (502, 503, 504)
+are retried a few times with a jittered exponential backoff.
+"""
+
+import os
+import time
+import random
+import logging
+from collections import Counter
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fractalis import app
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'}
+RETRY_STATUS_CODES = {502, 503, 504}
+# the most we ever wait between two attempts in seconds
+MAX_BACKOFF = 30
+
+
+class HttpClient:
+    """A keep-alive session for a single server that retries failed
+    idempotent requests and counts what it does."""
+
+    def __init__(self, pool_size: int, retries: int, backoff: float) -> None:
+        """
+        :param pool_size: The number of connections kept alive.
+        :param retries: How often a failed idempotent request is retried.
+        :param backoff: The base of the exponential backoff in seconds.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = Counter()
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        # the session is shared by all users of this process, so cookies set
+        # by a response must never be sent along with later requests.
+        # Cookies passed to a single request are still sent.
+        self.session.cookies.set_policy(
+            DefaultCookiePolicy(allowed_domains=[]))
+        self.session.hooks['response'].append(self._count_response)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _count_response(self, r: requests.Response, *args, **kwargs) -> None:
+        """Response hook counting requests and received bytes. Streamed
+        bodies are counted by their announced length."""
+        self.stats['requests'] += 1
+        if kwargs.get('stream'):
+            length = r.headers.get('Content-Length', '')
+            self.stats['bytes'] += int(length) if length.isdigit() else 0
+        else:
+            self.stats['bytes'] += len(r.content)
+
+    def wait_time(self, attempt: int) -> float:
+        """Full jitter backoff, so many workers do not retry at once.
+        :param attempt: The number of the failed attempt, starting at 0.
+        :return: The number of seconds to wait before the next attempt.
+        """
+        return random.uniform(0, min(MAX_BACKOFF,
+                                     self.backoff * 2 ** attempt))
+
+    def request(self, method: str, url: str, idempotent: bool = None,
+                **kwargs) -> requests.Response:
+        """Send a request with the pooled session.
+        :param method: The HTTP method.
+        :param url: The URL to request.
+        :param idempotent: Whether the request may be retried. Defaults to
+        True for idempotent HTTP methods. Set it for POST requests that only
+        read data.
+        :param kwargs: Passed to requests.Session.request().
+        :return: The response.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            last_attempt = attempt + 1 == attempts
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats['errors'] += 1
+                if last_attempt:
+                    raise
+                reason = str(e)
+            else:
+                if last_attempt or r.status_code not in RETRY_STATUS_CODES:
+                    return r
+                reason = 'status code {}'.format(r.status_code)
+                r.close()
+            wait = self.wait_time(attempt)
+            logger.warning("Request {} {} failed ({}). Retrying in {:.1f} "
+                           "seconds.".format(method, url, reason, wait))
+            self.stats['retries'] += 1
+            time.sleep(wait)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def connection_stats(self) -> dict:
+        """Count the connections opened by the pools of this client.
+        :return: Dict with the number of 'connections' and the number of
+        requests that 'reused' an existing connection.
+        """
+        connections = reused = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                connections += pool.num_connections
+                reused += pool.num_requests - pool.num_connections
+        return {'connections': connections, 'reused': max(reused, 0)}
+
+
+# clients of this worker process by server
+_clients = {}
+_pid = None
+
+
+def get_client(url: str) -> HttpClient:
+    """Return the client of this process for the server of the given URL.
+    Clients are never shared between processes, because connections must not
+    be used by more than one process.
+    :param url: The server or any URL on it, e.g. 'https://example.com/api'.
+    :return: The client.
+    """
+    global _pid
+    server = '{0.scheme}://{0.netloc}'.format(urlsplit(url))
+    if _pid != os.getpid():
+        _clients.clear()
+        _pid = os.getpid()
+    if server not in _clients:
+        _clients[server] = HttpClient(
+            pool_size=app.config['FRACTALIS_HTTP_POOL_SIZE'],
+            retries=app.config['FRACTALIS_HTTP_RETRIES'],
+            backoff=app.config['FRACTALIS_HTTP_BACKOFF'])
+    return _clients[server]
+
+
+def get_stats() -> dict:
+    """Collect the statistics of all clients of this process.
+    :return: Dict with the statistics of every server.
+    """
+    return {server: dict(client.stats, **client.connection_stats())
+            for server, client in _clients.items()
+            if _pid == os.getpid()}
+
+
+def log_stats() -> None:
+    """Write the statistics of all clients of this process to the log."""
+    for server, stats in get_stats().items():
+        logger.info("HTTP client statistics for '{}': {}".format(
+            server, ', '.join('{}={}'.format(key, stats[key])
+                              for key in sorted(stats))))
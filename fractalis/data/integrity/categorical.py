@@ -3,7 +3,6 @@ for the 'categorical' fractalis format."""
 
 import logging
 
-import numpy as np
 import pandas as pd
 
 from fractalis.data.check import IntegrityCheck
@@ -15,6 +14,8 @@ class CategoricalIntegrityCheck(IntegrityCheck):
     """Implements IntegrityCheck for 'categorical' data type."""
 
     data_type = 'categorical'
+    unique_columns = ['id']
+    constant_columns = ['feature']
 
     def check(self, data: object) -> None:
         if not isinstance(data, pd.DataFrame):
@@ -26,23 +27,23 @@ class CategoricalIntegrityCheck(IntegrityCheck):
                     "'id', 'feature', and 'value'."
             logger.error(error)
             raise ValueError(error)
-        if data['id'].dtype != np.object:
+        if not self.is_string_column(data['id']):
             error = "'id' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
-        if data['feature'].dtype != np.object:
+        if not self.is_string_column(data['feature']):
             error = "'feature' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
-        if data['value'].dtype != np.object:
+        if not self.is_string_column(data['value']):
             error = "'value' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
-        if len(data['id'].unique().tolist()) != data.shape[0]:
+        if self.has_duplicates(self.sample(data), ['id']):
             error = "'id' column must be unique for this data type."
             logger.error(error)
             raise ValueError(error)
-        if len(data['feature'].unique().tolist()) != 1:
+        if not self.is_constant(data['feature']):
             error = "'feature' column must contain exactly one unique value " \
                     "for this data type."
             logger.error(error)
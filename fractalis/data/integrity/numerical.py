@@ -15,6 +15,8 @@ class NumericalIntegrityCheck(IntegrityCheck):
     """Implements IntegrityCheck for 'numerical' data type."""
 
     data_type = 'numerical'
+    unique_columns = ['id']
+    constant_columns = ['feature']
 
     def check(self, data: object) -> None:
         if not isinstance(data, pd.DataFrame):
@@ -26,11 +28,11 @@ class NumericalIntegrityCheck(IntegrityCheck):
                     "'id', 'feature', and 'value'."
             logger.error(error)
             raise ValueError(error)
-        if data['id'].dtype != np.object:
+        if not self.is_string_column(data['id']):
             error = "'id' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
-        if data['feature'].dtype != np.object:
+        if not self.is_string_column(data['feature']):
             error = "'feature' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
@@ -39,11 +41,11 @@ class NumericalIntegrityCheck(IntegrityCheck):
             error = "'value' column must be of type 'np.int' or 'np.float'."
             logger.error(error)
             raise ValueError(error)
-        if len(data['id'].unique().tolist()) != data.shape[0]:
+        if self.has_duplicates(self.sample(data), ['id']):
             error = "'id' column must be unique for this data type."
             logger.error(error)
             raise ValueError(error)
-        if len(data['feature'].unique().tolist()) != 1:
+        if not self.is_constant(data['feature']):
             error = "'feature' column must contain exactly one unique value " \
                     "for this data type."
             logger.error(error)
@@ -15,6 +15,7 @@ class NumericalArrayIntegrityCheck(IntegrityCheck):
     """Implements IntegrityCheck for 'numerical_array' data type."""
 
     data_type = 'numerical_array'
+    unique_columns = ['id', 'feature']
 
     def check(self, data: object) -> None:
         if not isinstance(data, pd.DataFrame):
@@ -26,11 +27,11 @@ class NumericalArrayIntegrityCheck(IntegrityCheck):
                     "'id', 'feature', and 'value'."
             logger.error(error)
             raise ValueError(error)
-        if data['id'].dtype != np.object:
+        if not self.is_string_column(data['id']):
             error = "'id' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
-        if data['feature'].dtype != np.object:
+        if not self.is_string_column(data['feature']):
             error = "'feature' column must be of type 'object' ('string')."
             logger.error(error)
             raise ValueError(error)
@@ -39,7 +40,9 @@ class NumericalArrayIntegrityCheck(IntegrityCheck):
             error = "'value' column must be of type 'np.int' or 'np.float'."
             logger.error(error)
             raise ValueError(error)
-        if data.groupby(['id', 'feature']).count().shape[0] != data.shape[0]:
+        if data['id'].isnull().values.any() or \
+                data['feature'].isnull().values.any() or \
+                self.has_duplicates(self.sample(data), ['id', 'feature']):
             error = "Every combination of 'id' and 'feature' must be unique."
             logger.error(error)
             raise ValueError(error)
@@ -0,0 +1,120 @@
+"""This module provides a dense matrix store for 'numerical_array' data.
+
+Next to the regular cache file the values are stored as a feature x id float
+matrix in NumPy format, together with two JSON files listing the features
+(rows) and ids (columns). Readers open the matrix with numpy.memmap, so the
+data are paged in from the OS page cache on demand and shared between all
+worker processes instead of being copied into each of them. The positions of
+missing values that were given explicitly are stored as well, because in the
+matrix they cannot be told apart from values that were never given.
+"""
+
+import os
+import json
+import logging
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MATRIX_SUFFIX = '.matrix.npy'
+FEATURES_SUFFIX = '.features.json'
+IDS_SUFFIX = '.ids.json'
+MISSING_SUFFIX = '.missing.npy'
+
+
+def exists(file_path: str) -> bool:
+    """Check whether a matrix has been stored for the given cache file.
+    :param file_path: The location of the regular cache file.
+    :return: True if all matrix files exist.
+    """
+    return all(os.path.exists(file_path + suffix)
+               for suffix in (MATRIX_SUFFIX, FEATURES_SUFFIX, IDS_SUFFIX))
+
+
+def pivot(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Pivot data in the long format into a feature x id matrix. Instead of
+    DataFrame.pivot() this works on the integer codes of the 'feature' and
+    'id' columns, which are computed only if the columns are not categorical
+    already. Rows and columns are sorted like the categories.
+    :param data_frame: Data in the long id/feature/value format.
+    :return: DataFrame with 'feature' as index and 'id' as columns.
+    """
+    features = pd.Categorical(data_frame['feature']).remove_unused_categories()
+    ids = pd.Categorical(data_frame['id']).remove_unused_categories()
+    values = np.full((len(features.categories), len(ids.categories)), np.nan)
+    values[features.codes, ids.codes] = data_frame['value'].values
+    return pd.DataFrame(
+        values,
+        index=pd.Index(np.asarray(features.categories), name='feature'),
+        columns=pd.Index(np.asarray(ids.categories), name='id'))
+
+
+def write(data_frame: pd.DataFrame, file_path: str) -> None:
+    """Store the given 'numerical_array' data as a dense matrix.
+    :param data_frame: Data in the long id/feature/value format.
+    :param file_path: The location of the regular cache file.
+    """
+    df = pivot(data_frame)
+    values = np.lib.format.open_memmap(file_path + MATRIX_SUFFIX, mode='w+',
+                                       dtype=np.float64, shape=df.shape)
+    values[:] = df.values
+    values.flush()
+    del values
+    with open(file_path + FEATURES_SUFFIX, 'w') as f:
+        json.dump(df.index.tolist(), f)
+    with open(file_path + IDS_SUFFIX, 'w') as f:
+        json.dump(df.columns.tolist(), f)
+    missing = data_frame[data_frame['value'].isnull().values]
+    np.save(file_path + MISSING_SUFFIX, np.column_stack((
+        df.index.get_indexer(np.asarray(missing['feature'], dtype=object)),
+        df.columns.get_indexer(np.asarray(missing['id'], dtype=object))
+    )).astype(np.int64))
+
+
+def read(file_path: str, features: List[str] = None,
+         ids: List[str] = None) -> pd.DataFrame:
+    """Open the matrix stored for the given cache file. If no selection is
+    made the returned DataFrame is a read-only view of the memory mapped file.
+    :param file_path: The location of the regular cache file.
+    :param features: Return only these rows. All if None. Like in the
+    id/feature/value format ids without a row for any of these features are
+    not part of the result.
+    :param ids: Return only these columns. All if None.
+    :return: DataFrame with 'feature' as index and 'id' as columns.
+    """
+    values = np.load(file_path + MATRIX_SUFFIX, mmap_mode='r')
+    with open(file_path + FEATURES_SUFFIX) as f:
+        index = pd.Index(json.load(f), name='feature')
+    with open(file_path + IDS_SUFFIX) as f:
+        columns = pd.Index(json.load(f), name='id')
+    keep = None
+    if features is not None:
+        rows = np.flatnonzero(index.isin(features))
+        values = values[rows]
+        index = index[rows]
+        keep = ~np.isnan(values).all(axis=0)
+        missing = read_missing(file_path)
+        keep[missing[np.in1d(missing[:, 0], rows), 1]] = True
+    if ids is not None:
+        requested = columns.isin(ids)
+        keep = requested if keep is None else keep & requested
+    if keep is not None:
+        cols = np.flatnonzero(keep)
+        values = values[:, cols]
+        columns = columns[cols]
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def read_missing(file_path: str) -> np.ndarray:
+    """Return the positions of the explicitly given missing values of the
+    matrix stored for the given cache file.
+    :param file_path: The location of the regular cache file.
+    :return: Array with a (row, column) pair per missing value.
+    """
+    if not os.path.exists(file_path + MISSING_SUFFIX):
+        # matrices stored before the positions were recorded
+        return np.empty((0, 2), dtype=np.int64)
+    return np.load(file_path + MISSING_SUFFIX)
@@ -0,0 +1,71 @@
+"""This module provides summary statistics for 'numerical_array' data.
+
+When the matrix of a 'numerical_array' is stored, the count, mean, median,
+variance, minimum and maximum of every feature (row) and every id (column) are
+computed once and stored next to the regular cache file. Tasks that rank
+features of the complete data, for instance by their variance, can use these
+summaries instead of computing the statistics over the whole matrix again for
+every request.
+"""
+
+import os
+import pickle
+import logging
+import warnings
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SUFFIX = '.summary.pkl'
+STATISTICS = ['count', 'mean', 'median', 'variance', 'min', 'max']
+
+
+def compute(df: pd.DataFrame, axis: int) -> pd.DataFrame:
+    """Compute the summary statistics along the given axis of the matrix.
+    Missing values are skipped like pandas does, except for the median which
+    is NaN if a value is missing, just like numpy.median().
+    :param df: Matrix with 'feature' as index and 'id' as columns.
+    :param axis: 1 to summarize every feature, 0 to summarize every id.
+    :return: DataFrame with one row per feature or id and one column per
+    statistic.
+    """
+    values = np.asarray(df.values, dtype=np.float64)
+    count = (~np.isnan(values)).sum(axis=axis)
+    # all-NaN rows or columns are expected and simply have NaN statistics
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        statistics = {
+            'count': count,
+            'mean': np.nanmean(values, axis=axis),
+            'median': np.median(values, axis=axis),
+            'variance': np.nanvar(values, axis=axis),
+            'min': np.nanmin(values, axis=axis),
+            'max': np.nanmax(values, axis=axis)
+        }
+    index = df.index if axis == 1 else df.columns
+    return pd.DataFrame(statistics, index=index, columns=STATISTICS)
+
+
+def write(df: pd.DataFrame, file_path: str) -> None:
+    """Compute and store the feature and id summaries of the given matrix.
+    :param df: Matrix with 'feature' as index and 'id' as columns.
+    :param file_path: The location of the regular cache file.
+    """
+    summary = {'feature': compute(df, axis=1), 'id': compute(df, axis=0)}
+    with open(file_path + SUMMARY_SUFFIX, 'wb') as f:
+        pickle.dump(summary, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read(file_path: str) -> Union[dict, None]:
+    """Read the summaries stored for the given cache file.
+    :param file_path: The location of the regular cache file.
+    :return: Dict with the 'feature' and the 'id' summary or None if there
+    are none.
+    """
+    if not os.path.exists(file_path + SUMMARY_SUFFIX):
+        return None
+    with open(file_path + SUMMARY_SUFFIX, 'rb') as f:
+        return pickle.load(f)
@@ -6,7 +6,9 @@ from typing import Tuple
 
 from flask import Blueprint, jsonify, Response
 
+from fractalis.analytics import framecache
 from fractalis.cleanup import janitor
+from fractalis.data import etlstats
 
 
 misc_blueprint = Blueprint('misc_blueprint', __name__)
@@ -20,3 +22,17 @@ def get_version() -> Tuple[Response, int]:
     # first requests sent by the front-end on initialization
     janitor.delay()
     return jsonify({'version': version}), 201
+
+
+@misc_blueprint.route('/metrics', methods=['GET'])
+def get_metrics() -> Tuple[Response, int]:
+    """Get the statistics of all ETL runs and of the HTTP requests they sent.
+    The statistics of a single run are part of its meta information. Also
+    contains the hits, misses and evictions of the frame caches of all
+    worker processes.
+    :return: The aggregated metrics.
+    """
+    logger.debug("Received GET request on /misc/metrics.")
+    metrics = etlstats.get_metrics()
+    metrics['frame_cache'] = framecache.get_metrics()
+    return jsonify(metrics), 200
@@ -90,7 +90,8 @@ def request_state_access(state_id: UUID) -> Tuple[Response, int]:
     task_ids = etl_handler.handle(descriptors=meta_state['descriptors'],
                                   data_tasks=session['data_tasks'],
                                   use_existing=True,
-                                  wait=wait)
+                                  wait=wait,
+                                  sid=session.sid)
 
     session['data_tasks'] += task_ids
     session['data_tasks'] = list(set(session['data_tasks']))
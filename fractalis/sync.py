@@ -6,6 +6,7 @@ db and the file system.
 import os
 import json
 import logging
+from glob import glob, escape
 from shutil import rmtree
 
 from fractalis import redis, app, celery
@@ -14,19 +15,71 @@ from fractalis import redis, app, celery
 logger = logging.getLogger(__name__)
 
 
-def remove_data(task_id: str) -> None:
+def add_reference(task_id: str, sid: str) -> None:
+    """Register the given session as user of the given data. Data used by
+    several sessions are only removed once no session uses them anymore.
+    This also extends the lifetime of the data.
+    :param task_id: The id associated with a data state.
+    :param sid: The session id.
+    """
+    lifetime = app.config['FRACTALIS_DATA_LIFETIME']
+    redis.sadd('refs:{}'.format(task_id), sid)
+    redis.expire('refs:{}'.format(task_id), lifetime)
+    value = redis.get('data:{}'.format(task_id))
+    if value:
+        redis.expire('data:{}'.format(task_id), lifetime)
+        digest = json.loads(value).get('digest')
+        if redis.get('shared:{}'.format(digest)) == task_id:
+            redis.expire('shared:{}'.format(digest), lifetime)
+
+
+def has_live_references(task_id: str) -> bool:
+    """Check whether any existing session still uses the given data.
+    :param task_id: The id associated with a data state.
+    :return: True if at least one referencing session is still alive.
+    """
+    sids = redis.smembers('refs:{}'.format(task_id))
+    return any(redis.exists('session:{}'.format(sid)) for sid in sids)
+
+
+def release_data(task_id: str, sid: str) -> bool:
+    """Remove the reference of the given session to the given data.
+    :param task_id: The id associated with a data state.
+    :param sid: The session id.
+    :return: True if no other live session uses the data anymore, meaning
+    the data can be removed.
+    """
+    redis.srem('refs:{}'.format(task_id), sid)
+    return not has_live_references(task_id)
+
+
+def remove_data(task_id: str, sid: str = None, wait: bool = False) -> None:
     """Remove all traces of any data associated with the given id. That includes
-    redis and the file system.
+    redis and the file system. If a session id is given and other sessions
+    still use the data, only the reference of this session is removed.
     :param task_id: The id associated with a data state
-    :param wait: Wait for all subtasks to finish before returning
+    :param sid: The id of the session that does not need the data anymore.
+    :param wait: Wait for the running ETL to be revoked before returning.
     """
+    if sid is not None and not release_data(task_id, sid):
+        logger.info("Data for task id '{}' are still used by other sessions. "
+                    "Only removing the reference.".format(task_id))
+        return
     key = 'data:{}'.format(task_id)
     value = redis.get(key)
-    celery.control.revoke(task_id, terminate=True, signal='SIGUSR1')
+    celery.control.revoke(task_id, terminate=True, signal='SIGUSR1',
+                          wait=wait)
     redis.delete(key)
+    redis.delete('refs:{}'.format(task_id))
     if value:
         data_state = json.loads(value)
+        digest = data_state.get('digest')
+        if redis.get('shared:{}'.format(digest)) == task_id:
+            redis.delete('shared:{}'.format(digest))
         remove_file(data_state['file_path'])
+        # files stored next to the cache file, e.g. the numerical_array matrix
+        for file_path in glob(escape(data_state['file_path']) + '.*'):
+            remove_file(file_path)
     else:
         logger.warning("Can't delete file for task id '{}',because there is "
                        "no associated entry in Redis.".format(task_id))
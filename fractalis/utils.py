@@ -41,7 +41,8 @@ def list_classes_with_base_class(
 
 
 def get_cache_encrypt_key(key):
-    """Prepare key for use with crypto libs.
+    """Prepare key for use with crypto libs. Only used to read cache files
+    that have been encrypted before fractalis.data.encryption was introduced.
     :param key: Passphrase used for encryption.
     """
     key += (16 - (len(key) % 16)) * '-'
@@ -32,6 +32,10 @@ setup(
         'requests==2.18.4',
         'PyYAML==3.12',
         'pycryptodomex==3.4.7',
+        'pyarrow==0.8.0',
+        'ijson==3.1.4',
+        'lz4==2.1.0',
+        'zstandard==0.14.1',
         'rpy2==2.9.3',
         'tzlocal',
         'flake8',
@@ -19,3 +19,11 @@ class TestMisc:
         rv = test_client.get('/misc/version')
         body = flask.json.loads(rv.get_data())
         assert re.match('^\d+.\d+.\d+$', body['version'])
+
+    def test_get_metrics_returns_metrics(self, test_client):
+        rv = test_client.get('/misc/metrics')
+        assert rv.status_code == 200
+        body = flask.json.loads(rv.get_data())
+        assert 'runs' in body['etl']
+        assert 'http' in body
+        assert set(body['frame_cache']) == {'hits', 'misses', 'evictions'}
@@ -93,3 +93,37 @@ class TestBoxplotAnalytics:
                                  id_filter=[], subsets=[])
         assert 'foo//female//s1' in results['statistics']
         assert 'foo//male//s1' not in results['statistics']
+
+    def test_statistics_match_per_group_computation(self):
+        np.random.seed(0)
+        df = pd.DataFrame({'id': np.arange(200),
+                           'feature': np.repeat(['foo', 'bar'], 100),
+                           'value': np.round(np.random.normal(size=200) * 10)})
+        df.loc[[0, 150], 'value'] = [500, -500]
+        categories = pd.DataFrame({'id': np.arange(200),
+                                   'feature': 'gender',
+                                   'value': np.tile(['female', 'male'], 100)})
+        subsets = [list(range(0, 120)), list(range(80, 200))]
+        results = self.task.main(features=[df[['id', 'feature', 'value']]],
+                                 categories=[categories[['id', 'feature',
+                                                         'value']]],
+                                 transformation='identity',
+                                 id_filter=[], subsets=subsets)
+        data = pd.DataFrame.from_dict(json.loads(results['data']))
+        assert len(results['statistics']) == 8
+        for label, stats in results['statistics'].items():
+            feature, category, subset = label.split('//')
+            group = data[(data['feature'] == feature) &
+                         (data['category'] == category) &
+                         (data['subset'] == int(subset[1:]) - 1)]
+            values = group['value'].values
+            assert np.allclose(np.percentile(values, [25, 50, 75]),
+                               [stats['l_qrt'], stats['median'],
+                                stats['u_qrt']])
+            iqr = stats['u_qrt'] - stats['l_qrt']
+            inliers = values[(values >= stats['l_qrt'] - 1.5 * iqr) &
+                             (values <= stats['u_qrt'] + 1.5 * iqr)]
+            assert stats['l_wsk'] == inliers.min()
+            assert stats['u_wsk'] == inliers.max()
+            assert group['outlier'].tolist() == \
+                ((values < inliers.min()) | (values > inliers.max())).tolist()
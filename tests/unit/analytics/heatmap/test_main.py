@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 
 from fractalis.analytics.tasks.heatmap.main import HeatmapTask
+from fractalis.data import matrix, summary
 
 
 # noinspection PyMissingTypeHints
@@ -256,3 +257,54 @@ class TestHeatmap:
                                 subsets=subsets)
         stats = result['stats']['t']
         assert all([stats[i] > stats[i + 1] for i in range(len(stats) - 1)])
+
+    def test_summary_gives_same_result_as_full_matrix(self):
+        df = pd.DataFrame([[101, 'foo', 5], [101, 'bar', 6], [101, 'baz', 1],
+                           [102, 'foo', 10], [102, 'bar', 11],
+                           [103, 'foo', 15], [103, 'bar', 36],
+                           [104, 'foo', 20], [104, 'bar', 21]],
+                          columns=['id', 'feature', 'value'])
+        mat = matrix.pivot(df)
+        for ranking_method in ['mean', 'median', 'variance']:
+            args = dict(numerical_arrays=[mat], numericals=[],
+                        categoricals=[], ranking_method=ranking_method,
+                        params={}, id_filter=[], max_rows=2, subsets=[])
+            task = HeatmapTask()
+            expected = task.main(**args)
+            task.data_summaries = {'numerical_arrays': [{
+                'feature': summary.compute(mat, axis=1),
+                'id': summary.compute(mat, axis=0)
+            }]}
+            assert task.get_feature_summary(mat) is not None
+            result = task.main(**args)
+            assert result['data'] == expected['data']
+            assert result['stats']['feature'] == expected['stats']['feature']
+            assert np.allclose(result['stats'][ranking_method],
+                               expected['stats'][ranking_method])
+
+    def test_rank_keeps_best_features_in_order(self):
+        values = np.array([0.5, np.nan, 0.01, 0.2, 0.01, 0.9])
+        assert self.task.rank(values, 'P.Value', 3).tolist() == [2, 4, 3]
+        assert self.task.rank(values, 'B', 2).tolist() == [5, 0]
+        assert self.task.rank(values, 'B', 100).tolist() == [5, 0, 3, 2, 4, 1]
+        values = np.array([-3, 1, 3, -2, 2])
+        assert self.task.rank(values, 'logFC', 4).tolist() == [0, 2, 3, 4]
+
+    def test_zscores_are_computed_per_feature(self):
+        np.random.seed(0)
+        mat = pd.DataFrame(np.random.normal(size=(20, 6)),
+                           index=['f{}'.format(i) for i in range(20)],
+                           columns=list(range(6)))
+        mat.iloc[3, 2] = np.nan
+        mat.index.name = 'feature'
+        mat.columns.name = 'id'
+        result = self.task.main(numerical_arrays=[mat], numericals=[],
+                                categoricals=[], ranking_method='variance',
+                                params={}, id_filter=[], max_rows=5,
+                                subsets=[])
+        data = pd.DataFrame(result['data'])
+        assert data.shape[0] == 5 * 6
+        for feature, group in data.groupby('feature'):
+            values = mat.loc[feature, group['id']]
+            expected = (values - values.mean()) / values.std(ddof=0)
+            assert np.allclose(group['zscore'], expected, equal_nan=True)
@@ -0,0 +1,58 @@
+"""This module contains tests for the kde module in the shared package."""
+
+import pytest
+import numpy as np
+import scipy.stats
+
+from fractalis.analytics.tasks.shared import kde
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestKDE:
+
+    @staticmethod
+    def scipy_kde(values, xs, bw_factor):
+        def bw(obj):
+            return np.power(obj.n, -1.0 / 5) * bw_factor
+        return scipy.stats.gaussian_kde(values, bw_method=bw)(xs)
+
+    def test_bandwidth_matches_scipy(self):
+        values = np.random.RandomState(0).normal(size=100)
+        for bw_factor in [0.5, 1, 2]:
+            expected = scipy.stats.gaussian_kde(
+                values, bw_method=lambda obj: np.power(obj.n, -0.2) *
+                bw_factor).covariance[0, 0] ** 0.5
+            assert np.isclose(kde.bandwidth(values, bw_factor), expected)
+
+    def test_small_samples_are_exact(self):
+        values = np.random.RandomState(0).lognormal(size=kde.EXACT_MAX_VALUES)
+        xs = np.linspace(values.min(), values.max(), 200)
+        assert np.allclose(kde.gaussian_kde(values, xs, bw_factor=0.5),
+                           self.scipy_kde(values, xs, 0.5),
+                           rtol=1e-10, atol=0)
+
+    @pytest.mark.parametrize('distribution', ['normal', 'lognormal'])
+    @pytest.mark.parametrize('bw_factor', [0.25, 1, 3])
+    def test_binned_estimate_is_within_error_bound(self, distribution,
+                                                   bw_factor):
+        rng = np.random.RandomState(0)
+        values = np.append(getattr(rng, distribution)(size=10000),
+                           rng.normal(20, 0.01, size=1000))
+        xs = np.linspace(values.min(), values.max(), 200)
+        h = kde.bandwidth(values, bw_factor)
+        error = np.abs(kde.gaussian_kde(values, xs, bw_factor=bw_factor) -
+                       self.scipy_kde(values, xs, bw_factor))
+        assert error.max() < 2.5e-4 / (np.sqrt(2 * np.pi) * h)
+
+    def test_evaluates_outside_of_the_data(self):
+        values = np.random.RandomState(0).normal(size=10000)
+        xs = np.linspace(-100, 100, 20001)
+        density = kde.gaussian_kde(values, xs)
+        assert np.all(density >= 0)
+        assert density[0] < 1e-12 and density[-1] < 1e-12
+        assert np.isclose(np.trapz(density, xs), 1, atol=1e-3)
+
+    def test_raises_for_constant_values(self):
+        with pytest.raises(ValueError) as e:
+            kde.gaussian_kde(np.array([1.0, 1.0, 1.0]), np.array([1.0]))
+        assert 'two distinct values' in str(e.value)
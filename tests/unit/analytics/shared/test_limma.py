@@ -0,0 +1,90 @@
+"""This module contains tests for the limma module in the shared package."""
+
+import pytest
+import numpy as np
+import pandas as pd
+import scipy.stats
+
+from fractalis.analytics.tasks.shared import limma, array_stats
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestLimma:
+
+    @staticmethod
+    def random_df(features, samples):
+        rng = np.random.RandomState(0)
+        values = rng.normal(size=(features, samples))
+        values[:features // 2, :samples // 2] += 1
+        return pd.DataFrame(values,
+                            index=['gene_{}'.format(i)
+                                   for i in range(features)],
+                            columns=list(range(samples)))
+
+    def test_raises_for_invalid_subsets(self):
+        df = pd.DataFrame([[5, 10, 15, 20]], index=['foo'],
+                          columns=[0, 1, 2, 3])
+        with pytest.raises(ValueError) as e:
+            limma.get_limma_stats(df=df, subsets=[[0, 1]])
+        assert 'requires at least two' in str(e.value)
+
+    def test_raises_for_invalid_df(self):
+        df = pd.DataFrame([], index=['foo'], columns=[])
+        with pytest.raises(ValueError) as e:
+            limma.get_limma_stats(df=df, subsets=[[0], [0]])
+        assert 'dimension 1x2 or more' in str(e.value)
+
+    def test_raises_for_empty_groups(self):
+        df = pd.DataFrame([[5, 10, 15, 20]], index=['foo'],
+                          columns=[0, 1, 2, 3])
+        with pytest.raises(ValueError) as e:
+            limma.get_limma_stats(df=df, subsets=[[0, 1], []])
+        assert 'non-empty' in str(e.value)
+
+    def test_single_feature_equals_t_test(self):
+        df = pd.DataFrame([[5, 10, 15, 20]], index=['foo'],
+                          columns=[0, 1, 2, 3])
+        stats = limma.get_limma_stats(df=df, subsets=[[0, 1], [2, 3]])
+        t, p = scipy.stats.ttest_ind([15, 20], [5, 10])
+        assert list(stats) == ['feature', 'logFC', 'AveExpr', 't',
+                               'P.Value', 'adj.P.Val', 'B']
+        assert stats['feature'].tolist() == ['foo']
+        assert np.isclose(stats['logFC'][0], 10)
+        assert np.isclose(stats['AveExpr'][0], 12.5)
+        assert np.isclose(stats['t'][0], t)
+        assert np.isclose(stats['P.Value'][0], p)
+        assert np.isclose(stats['adj.P.Val'][0], p)
+
+    def test_returns_f_statistic_for_more_than_2_groups(self):
+        df = pd.DataFrame([[5, 10, 15, 20]], index=['foo'],
+                          columns=[0, 1, 2, 3])
+        stats = limma.get_limma_stats(df=df, subsets=[[0, 1], [2], [3]])
+        assert list(stats) == ['feature', 'group3-group1', 'group3-group2',
+                               'group2-group1', 'AveExpr', 'F', 'P.Value',
+                               'adj.P.Val']
+        assert np.isclose(stats['F'][0], 4.5)
+
+    def test_p_adjust_bh_ignores_missing_values(self):
+        p = np.array([0.01, np.nan, 0.04, 0.03, 0.02])
+        adjusted = limma.p_adjust_bh(p)
+        assert np.isnan(adjusted[1])
+        assert np.allclose(adjusted[[0, 2, 3, 4]], [0.04, 0.04, 0.04, 0.04])
+
+    @pytest.mark.parametrize('subsets', [
+        [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]],
+        [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]],
+        [[0, 1, 2, 3], [2, 3, 4, 5], [6, 7], [8, 9, 0]]
+    ])
+    def test_matches_r_limma(self, subsets):
+        df = self.random_df(features=200, samples=10)
+        df.iloc[3, 2] = np.nan
+        expected = array_stats.get_limma_stats(df=df, subsets=subsets)
+        stats = limma.get_limma_stats(df=df, subsets=subsets)
+        assert stats.shape == expected.shape
+        assert stats['feature'].tolist() == expected['feature'].tolist()
+        # R names the contrasts differently, so compare them by position
+        for column, expected_column in zip(list(stats)[1:],
+                                           list(expected)[1:]):
+            assert np.allclose(stats[column].astype(float),
+                               expected[expected_column].astype(float),
+                               equal_nan=True)
@@ -0,0 +1,100 @@
+"""This module contains tests for the rpool module in the shared package."""
+
+import os
+import threading
+
+import pytest
+
+from fractalis.analytics.tasks.shared import rpool
+
+
+def init_nothing():
+    pass
+
+
+def init_failing():
+    raise ImportError('R is not installed')
+
+
+def get_pid():
+    return os.getpid()
+
+
+def add(a, b=0):
+    return a + b
+
+
+def fail():
+    raise ValueError('invalid input')
+
+
+def crash():
+    os._exit(1)
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestRPool:
+
+    @pytest.fixture
+    def pool(self):
+        pool = rpool.RPool(size=1, timeout=10, initializer=init_nothing)
+        yield pool
+        pool.shutdown()
+
+    def test_run_returns_result(self, pool):
+        assert pool.run(add, 1, b=2) == 3
+        assert pool.run(get_pid) != os.getpid()
+
+    def test_worker_is_reused(self, pool):
+        pid = pool.run(get_pid)
+        assert pool.run(get_pid) == pid
+        assert pool.stats['started'] == 1
+
+    def test_exceptions_are_raised_and_worker_is_kept(self, pool):
+        pid = pool.run(get_pid)
+        with pytest.raises(ValueError) as e:
+            pool.run(fail)
+        assert 'invalid input' in str(e.value)
+        assert pool.run(get_pid) == pid
+
+    def test_worker_is_replaced_if_it_dies(self, pool):
+        pid = pool.run(get_pid)
+        with pytest.raises(RuntimeError) as e:
+            pool.run(crash)
+        assert 'died' in str(e.value)
+        assert pool.run(get_pid) != pid
+        assert pool.stats['failed'] == 1
+
+    def test_worker_is_recycled_after_max_calls(self):
+        pool = rpool.RPool(size=1, max_calls=2, initializer=init_nothing)
+        pids = [pool.run(get_pid) for _ in range(4)]
+        pool.shutdown()
+        assert pids[0] == pids[1] != pids[2] == pids[3]
+        assert pool.stats['recycled'] == 2
+
+    def test_worker_is_recycled_above_max_memory(self):
+        pool = rpool.RPool(size=1, max_memory=1, initializer=init_nothing)
+        assert pool.run(get_pid) != pool.run(get_pid)
+        pool.shutdown()
+        assert pool.stats['recycled'] == 2
+
+    def test_failing_initializer_raises(self):
+        pool = rpool.RPool(size=1, initializer=init_failing)
+        with pytest.raises(ImportError) as e:
+            pool.run(get_pid)
+        assert 'not installed' in str(e.value)
+
+    def test_workers_are_shared_between_threads(self):
+        pool = rpool.RPool(size=2, initializer=init_nothing)
+        pool.warm_up()
+        results = []
+        threads = [threading.Thread(
+            target=lambda i=i: results.append(pool.run(add, i, 1)))
+            for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.shutdown()
+        assert sorted(results) == list(range(1, 9))
+        assert pool.stats['started'] == 2
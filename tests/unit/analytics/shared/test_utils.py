@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 
 from fractalis.analytics.tasks.shared import utils
+from fractalis.data import encoding
 
 
 # noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
@@ -17,6 +18,37 @@ class TestCommonTasks:
         result = utils.apply_subsets(df=df, subsets=subsets)
         assert result['subset'].tolist() == [0, 0, 2, 2]
 
+    def test_apply_subsets_keeps_row_order_and_index(self):
+        df = pd.DataFrame([['b', 'foo', 1], ['a', 'foo', 2], ['b', 'foo', 3]],
+                          columns=['id', 'feature', 'value'],
+                          index=[10, 11, 12])
+        df['id'] = df['id'].astype('category')
+        subsets = [['a', 'b', 'a'], ['c'], ['b']]
+        result = utils.apply_subsets(df=df, subsets=subsets)
+        assert result.index.tolist() == [10, 11, 12, 10, 12]
+        assert result['value'].tolist() == [1, 2, 3, 1, 3]
+        assert result['subset'].tolist() == [0, 0, 0, 2, 2]
+
+    def test_apply_subsets_without_subsets_uses_all_rows(self):
+        df = pd.DataFrame([[101, 'foo', 1], [102, 'foo', 2]],
+                          columns=['id', 'feature', 'value'])
+        result = utils.apply_subsets(df=df, subsets=[])
+        assert result['subset'].tolist() == [0, 0]
+
+    def test_apply_subsets_raises_if_nothing_matches(self):
+        df = pd.DataFrame([[101, 'foo', 1]],
+                          columns=['id', 'feature', 'value'])
+        with pytest.raises(ValueError) as e:
+            utils.apply_subsets(df=df, subsets=[[102], []])
+        assert 'No data match' in str(e.value)
+
+    def test_apply_subsets_raises_if_all_subsets_are_empty(self):
+        df = pd.DataFrame([[101, 'foo', 1]],
+                          columns=['id', 'feature', 'value'])
+        with pytest.raises(ValueError) as e:
+            utils.apply_subsets(df=df, subsets=[[], []])
+        assert 'No data match' in str(e.value)
+
     def test_apply_categorys(self):
         df = pd.DataFrame([[101, 'foo', 1], [102, 'foo', 2], [103, 'foo', 3]],
                           columns=['id', 'feature', 'value'])
@@ -32,6 +64,53 @@ class TestCommonTasks:
         assert result['category'].tolist()[:2] == ['a', 'b AND f']
         assert np.isnan(result['category'].tolist()[2])
 
+    def test_apply_categories_ignores_empty_values(self):
+        df = pd.DataFrame([['a', 'foo', 1], ['b', 'foo', 2], ['c', 'foo', 3]],
+                          columns=['id', 'feature', 'value'])
+        df['id'] = df['id'].astype('category')
+        c1 = pd.DataFrame([['a', 'c1', ''], ['b', 'c1', 'x']],
+                          columns=['id', 'feature', 'value'])
+        c2 = pd.DataFrame([['a', 'c2', 'y'], ['b', 'c2', 'y'],
+                           ['c', 'c2', '']],
+                          columns=['id', 'feature', 'value'])
+        result = utils.apply_categories(df=df, categories=[c1, c2])
+        assert result['category'].tolist() == ['y', 'x AND y', '']
+
+    def test_apply_categories_accepts_encoded_frames(self):
+        df = pd.DataFrame([['a', 'foo', 1], ['b', 'foo', 2], ['c', 'foo', 3]],
+                          columns=['id', 'feature', 'value'])
+        c1 = pd.DataFrame([['c', 'c1', 'x'], ['a', 'c1', 'y'],
+                           ['b', 'c1', 'x']],
+                          columns=['id', 'feature', 'value'])
+        expected = utils.apply_categories(df=df, categories=[c1])
+        result = utils.apply_categories(df=encoding.encode(df),
+                                        categories=[encoding.encode(c1)])
+        assert result['category'].tolist() == ['y', 'x', 'x']
+        assert result['category'].tolist() == expected['category'].tolist()
+        assert result['id'].astype(str).tolist() == ['a', 'b', 'c']
+
+    def test_concat_keeps_encoded_columns(self):
+        df1 = pd.DataFrame([['b', 'foo', 1]],
+                           columns=['id', 'feature', 'value'])
+        df2 = pd.DataFrame([['a', 'bar', 2]],
+                           columns=['id', 'feature', 'value'])
+        df = utils.concat([encoding.encode(df1), encoding.encode(df2)])
+        assert list(df) == ['id', 'feature', 'value']
+        assert df['id'].dtype.name == 'category'
+        assert df['feature'].dtype.name == 'category'
+        assert df['id'].tolist() == ['b', 'a']
+        assert df['feature'].tolist() == ['foo', 'bar']
+        assert df['value'].tolist() == [1, 2]
+
+    def test_concat_accepts_encoded_and_plain_frames(self):
+        df1 = pd.DataFrame([['b', 'foo', 1]],
+                           columns=['id', 'feature', 'value'])
+        df2 = pd.DataFrame([['a', 'bar', 2]],
+                           columns=['id', 'feature', 'value'])
+        df = utils.concat([encoding.encode(df1), df2])
+        assert df['id'].astype(str).tolist() == ['b', 'a']
+        assert df['feature'].astype(str).tolist() == ['foo', 'bar']
+
     def test_drop_unused_subset_ids(self):
         df = pd.DataFrame([[101, 'foo', 1], [102, 'foo', 2], [103, 'foo', 3]],
                           columns=['id', 'feature', 'value'])
@@ -0,0 +1,98 @@
+"""This module provides tests for the worker-local data frame cache."""
+
+import pandas as pd
+
+from fractalis import redis
+from fractalis.analytics import framecache
+from fractalis.analytics.framecache import FrameCache
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestFrameCache:
+
+    metrics_key = 'metrics:frame_cache_test'
+
+    def setup_method(self, method):
+        redis.delete(self.metrics_key, framecache.FRAME_CACHE_METRICS_KEY)
+
+    def teardown_method(self, method):
+        redis.delete(self.metrics_key, framecache.FRAME_CACHE_METRICS_KEY)
+
+    @staticmethod
+    def make_df():
+        return pd.DataFrame([[101, 'foo', 5.0], [102, 'foo', None]],
+                            columns=['id', 'feature', 'value'])
+
+    def test_get_loads_only_once(self):
+        cache = FrameCache(10 ** 6)
+        calls = []
+
+        def load():
+            calls.append(1)
+            return self.make_df()
+
+        cache.get('a', load)
+        df = cache.get('a', load)
+        assert len(calls) == 1
+        assert df.equals(self.make_df())
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_modifying_result_does_not_modify_cache(self):
+        cache = FrameCache(10 ** 6)
+        df = cache.get('a', self.make_df)
+        df.dropna(inplace=True)
+        df['value'] = 0
+        df = cache.get('a', self.make_df)
+        df.loc[0, 'id'] = 1
+        assert cache.get('a', self.make_df).equals(self.make_df())
+
+    def test_least_recently_used_entries_are_evicted(self):
+        size = FrameCache.frame_size(self.make_df())
+        cache = FrameCache(size * 2)
+        cache.get('a', self.make_df)
+        cache.get('b', self.make_df)
+        cache.get('a', self.make_df)
+        cache.get('c', self.make_df)
+        stats = cache.stats()
+        assert stats['entries'] == 2
+        assert stats['evictions'] == 1
+        assert stats['size'] <= stats['max_size']
+        cache.get('b', self.make_df)
+        assert cache.stats()['misses'] == 4
+
+    def test_zero_size_disables_cache(self):
+        cache = FrameCache(0)
+        cache.get('a', self.make_df)
+        cache.get('a', self.make_df)
+        assert cache.stats()['misses'] == 2
+        assert cache.stats()['entries'] == 0
+
+    def test_counters_are_recorded_in_redis(self):
+        size = FrameCache.frame_size(self.make_df())
+        cache = FrameCache(size, metrics_key=self.metrics_key)
+        cache.get('a', self.make_df)
+        assert redis.hgetall(self.metrics_key) == {'misses': '1'}
+        cache.get('a', self.make_df)
+        assert redis.hgetall(self.metrics_key) == {'misses': '1',
+                                                   'hits': '1'}
+        cache.get('b', self.make_df)
+        assert redis.hgetall(self.metrics_key) == {'misses': '2',
+                                                   'hits': '1',
+                                                   'evictions': '1'}
+
+    def test_get_metrics_returns_totals_of_all_caches(self):
+        key = framecache.FRAME_CACHE_METRICS_KEY
+        assert framecache.get_metrics() == {'hits': 0, 'misses': 0,
+                                            'evictions': 0}
+        for cache in [FrameCache(10 ** 6, metrics_key=key),
+                      FrameCache(10 ** 6, metrics_key=key)]:
+            cache.get('a', self.make_df)
+            cache.get('a', self.make_df)
+        assert framecache.get_metrics() == {'hits': 2, 'misses': 2,
+                                            'evictions': 0}
+
+    def test_counters_are_not_recorded_without_key(self):
+        cache = FrameCache(10 ** 6)
+        cache.get('a', self.make_df)
+        assert framecache.get_metrics()['misses'] == 0
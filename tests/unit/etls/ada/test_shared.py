@@ -0,0 +1,30 @@
+"""This module provides tests for the code shared by the Ada ETLs."""
+
+import pytest
+
+from fractalis import app
+from fractalis.data.etls.ada import shared
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestShared:
+
+    def test_split_field_behaves_like_filtered_request(self):
+        data = [{'_id': 1, 'foo': 1, 'bar': ''},
+                {'_id': 2, 'foo': '', 'bar': 'a'},
+                {'_id': 3, 'bar': None}]
+        assert shared.split_field(data, 'foo') == [{'_id': 1, 'foo': 1},
+                                                   {'_id': 3}]
+        assert shared.split_field(data, 'bar') == [{'_id': 2, 'bar': 'a'},
+                                                   {'_id': 3, 'bar': None}]
+
+    @pytest.mark.parametrize('encrypt', [False, True])
+    def test_batch_files_are_encrypted_like_the_cache(self, encrypt,
+                                                      tmpdir, monkeypatch):
+        monkeypatch.setitem(app.config, 'FRACTALIS_ENCRYPT_CACHE', encrypt)
+        file_path = str(tmpdir.join('foo' + shared.BATCH_SUFFIX))
+        data = [{'_id': {'$oid': 'patient-1'}, 'foo': 'secret'}]
+        shared.write_batch_file(file_path, data)
+        with open(file_path, 'rb') as f:
+            assert (b'secret' in f.read()) != encrypt
+        assert shared.read_batch_file(file_path) == data
@@ -0,0 +1,50 @@
+"""This module provides tests for the compression codecs of the cache."""
+
+import os
+
+import pytest
+
+from fractalis import app
+from fractalis.data import compression
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestCompression:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'codec_test')
+    data = b'foo bar baz ' * 1000
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def test_parse_returns_name_and_level(self):
+        assert compression.parse('gzip') == ('gzip', None)
+        assert compression.parse('zstd:9') == ('zstd', 9)
+
+    def test_parse_raises_for_unknown_codec(self):
+        with pytest.raises(ValueError):
+            compression.parse('foo:1')
+
+    def test_for_data_type_falls_back_to_default(self, monkeypatch):
+        monkeypatch.setitem(app.config, 'FRACTALIS_CACHE_CODEC',
+                            {'default': 'gzip', 'numerical_array': 'lz4'})
+        assert compression.for_data_type('numerical_array') == 'lz4'
+        assert compression.for_data_type('categorical') == 'gzip'
+
+    @pytest.mark.parametrize('codec', ['none', 'gzip:1', 'lz4', 'zstd:3'])
+    def test_decompress_returns_compressed_data(self, codec):
+        compressed = compression.compress(self.data, codec)
+        assert compression.decompress(compressed, codec) == self.data
+
+    @pytest.mark.parametrize('codec', ['none', 'gzip', 'lz4:3', 'zstd'])
+    def test_open_file_reads_written_data(self, codec):
+        with compression.open_file(self.file_path, 'wb', codec) as f:
+            f.write(self.data)
+        with compression.open_file(self.file_path, 'rb', codec) as f:
+            assert f.read() == self.data
+        if codec != 'none':
+            assert os.path.getsize(self.file_path) < len(self.data)
@@ -0,0 +1,36 @@
+"""This module provides tests for the dictionary encoding of the cache."""
+
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+
+from fractalis.data import encoding, matrix
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestEncoding:
+
+    @staticmethod
+    def make_df():
+        return pd.DataFrame([['101', 'foo', 5.0], ['101', 'bar', 6.0],
+                             ['102', 'foo', 7.0]],
+                            columns=['id', 'feature', 'value'])
+
+    def test_encode_only_string_columns(self):
+        df = encoding.encode(self.make_df())
+        assert is_categorical_dtype(df['id'])
+        assert is_categorical_dtype(df['feature'])
+        assert df['value'].dtype == float
+
+    def test_decode_returns_original_data(self):
+        df = encoding.decode(encoding.encode(self.make_df()))
+        assert df['id'].dtype == object
+        assert df.equals(self.make_df())
+
+    def test_pivot_works_for_encoded_data(self):
+        df = encoding.encode(self.make_df())
+        df = df[df['feature'] == 'foo']
+        result = matrix.pivot(df)
+        expected = matrix.pivot(self.make_df()).loc[['foo']]
+        assert result.equals(expected)
+        assert result.index.tolist() == ['foo']
+        assert result.columns.tolist() == ['101', '102']
@@ -0,0 +1,53 @@
+"""This module provides tests for the chunked cache encryption."""
+
+import os
+
+import pytest
+
+from fractalis import app
+from fractalis.data import encryption
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestEncryption:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'enc_test')
+    key = encryption.derive_key('foo')
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def test_derive_key_is_cached(self):
+        assert encryption.derive_key('foo') is self.key
+        assert len(self.key) == 32
+
+    def test_read_returns_written_chunks(self):
+        chunks = [b'abc', b'def', b'g']
+        encryption.write_chunks(iter(chunks), self.file_path, self.key)
+        assert encryption.is_chunked(self.file_path)
+        assert list(encryption.read_chunks(self.file_path, self.key)) == chunks
+
+    def test_read_only_requested_chunks(self):
+        chunks = [b'abc', b'def', b'g']
+        encryption.write_chunks(chunks, self.file_path, self.key)
+        result = encryption.read_chunks(self.file_path, self.key, [0, 2])
+        assert list(result) == [b'abc', b'g']
+
+    def test_read_raises_for_wrong_key(self):
+        encryption.write_chunks([b'abc'], self.file_path, self.key)
+        with pytest.raises(ValueError):
+            list(encryption.read_chunks(self.file_path,
+                                        encryption.derive_key('bar')))
+
+    def test_read_raises_for_truncated_file(self):
+        encryption.write_chunks([b'abc', b'def'], self.file_path, self.key)
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+        with open(self.file_path, 'wb') as f:
+            f.write(data[:-(4 + 16 + 3)])
+        with pytest.raises(ValueError):
+            list(encryption.read_chunks(self.file_path, self.key))
@@ -1,11 +1,14 @@
 """This module provides test for the 'etl' module."""
 
+import os
 import json
 
 import pandas as pd
+import pytest
 
-from fractalis import redis
+from fractalis import app, redis
 from fractalis.data.etl import ETL
+from fractalis.data.cache import CacheFormat
 
 
 # noinspection PyMissingOrEmptyDocstring
@@ -41,6 +44,20 @@ class MockETL(ETL):
         return ''
 
 
+# noinspection PyMissingOrEmptyDocstring
+class StreamingMockETL(MockETL):
+
+    produces = 'numerical'
+    streaming = True
+    chunks = []
+
+    def extract(self, server: str, token: str, descriptor: dict) -> object:
+        return iter(self.chunks)
+
+    def transform(self, raw_data: object, descriptor: dict) -> pd.DataFrame:
+        return raw_data
+
+
 # noinspection PyMissingOrEmptyDocstring, PyMissingTypeHints
 class TestETL:
 
@@ -64,3 +81,41 @@ class TestETL:
         self.etl.update_redis(data_frame=df3)
         data_state = json.loads(redis.get('data:123'))
         assert data_state['meta']['features'] == []
+
+    @staticmethod
+    def make_chunk(ids):
+        return pd.DataFrame([[str(i), 'foo', float(i)] for i in ids],
+                            columns=['id', 'feature', 'value'])
+
+    @pytest.mark.parametrize('cache_format', ['pickle', 'parquet'])
+    def test_streaming_run_appends_all_chunks(self, cache_format):
+        etl = StreamingMockETL()
+        etl.request_stack = RequestStackDummy()
+        etl.chunks = [self.make_chunk(range(0, 3)), self.make_chunk([3]),
+                      self.make_chunk(range(4, 6))]
+        file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], '123')
+        redis.set('data:123', json.dumps({'meta': {}}))
+        etl.run(server='', token='', descriptor={}, file_path=file_path,
+                encrypt=False, cache_format=cache_format, codec='none')
+        reader = CacheFormat.factory(cache_format)
+        reader.codec = 'none'
+        df = reader.read(file_path)
+        os.remove(file_path)
+        assert df['id'].astype(str).tolist() == [str(i) for i in range(6)]
+        data_state = json.loads(redis.get('data:123'))
+        assert data_state['meta']['features'] == ['foo']
+        etl_stats = data_state['meta']['etl_stats']
+        assert etl_stats['total']['rows'] == 6
+        assert etl_stats['phases']['load']['bytes_written'] > 0
+
+    def test_streaming_run_detects_duplicates_across_chunks(self):
+        etl = StreamingMockETL()
+        etl.request_stack = RequestStackDummy()
+        etl.chunks = [self.make_chunk(range(0, 3)), self.make_chunk([1])]
+        file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], '123')
+        redis.set('data:123', json.dumps({'meta': {}}))
+        with pytest.raises(RuntimeError) as e:
+            etl.run(server='', token='', descriptor={}, file_path=file_path,
+                    encrypt=False)
+        assert 'Data transformation failed' in str(e.value)
+        assert not os.path.exists(file_path)
@@ -307,3 +307,65 @@ class TestETLHandler:
                                           use_existing=True)
         assert len(task_ids) == 1
         assert len(redis.keys('data:*')) == 1
+
+    def test_descriptor_to_digest_ignores_key_order(self, redis):
+        digest_1 = self.etlhandler.descriptor_to_digest({'a': 1, 'b': 2})
+        digest_2 = self.etlhandler.descriptor_to_digest({'b': 2, 'a': 1})
+        digest_3 = self.etlhandler.descriptor_to_digest({'a': 2, 'b': 2})
+        assert digest_1 == digest_2
+        assert digest_1 != digest_3
+
+    def test_handle_shares_data_between_sessions(self, monkeypatch, redis):
+        monkeypatch.setattr(self.etlhandler, 'shareable', True)
+        monkeypatch.setattr(self.etlhandler, 'validate_access',
+                            lambda descriptor: True)
+
+        class FakeAsyncResult:
+            def __init__(self, *args, **kwargs):
+                self.state = 'SUBMITTED'
+
+            def get(self, *args, **kwargs):
+                pass
+        monkeypatch.setattr(celery, 'AsyncResult', FakeAsyncResult)
+        descriptor = {'data_type': 'default'}
+        task_ids_1 = self.etlhandler.handle(descriptors=[descriptor],
+                                            data_tasks=[],
+                                            use_existing=True, sid='abc')
+        task_ids_2 = self.etlhandler.handle(descriptors=[descriptor],
+                                            data_tasks=[],
+                                            use_existing=True, sid='def')
+        assert task_ids_1 == task_ids_2
+        assert len(redis.keys('data:*')) == 1
+        assert redis.smembers('refs:{}'.format(task_ids_1[0])) == \
+            {'abc', 'def'}
+
+    def test_handle_does_not_share_without_access(self, monkeypatch, redis):
+        monkeypatch.setattr(self.etlhandler, 'shareable', True)
+        monkeypatch.setattr(self.etlhandler, 'validate_access',
+                            lambda descriptor: False)
+        descriptor = {'data_type': 'default'}
+        task_ids_1 = self.etlhandler.handle(descriptors=[descriptor],
+                                            data_tasks=[],
+                                            use_existing=True, sid='abc')
+        task_ids_2 = self.etlhandler.handle(descriptors=[descriptor],
+                                            data_tasks=[],
+                                            use_existing=True, sid='def')
+        assert task_ids_1 != task_ids_2
+        assert len(redis.keys('data:*')) == 2
+
+    def test_make_batches_groups_by_batch_key(self, monkeypatch, redis):
+        monkeypatch.setattr(self.etlhandler, 'batch_key',
+                            lambda descriptor: descriptor.get('data_set'))
+        submissions = [
+            (None, task_id, {'file_path': task_id, 'descriptor': descriptor})
+            for task_id, descriptor in [('1', {'data_set': 'a'}),
+                                        ('2', {'data_set': 'b'}),
+                                        ('3', {'data_set': 'a'}),
+                                        ('4', {})]]
+        self.etlhandler.make_batches(submissions)
+        kwargs = {task_id: kwargs for _, task_id, kwargs in submissions}
+        assert kwargs['1']['batch'] is kwargs['3']['batch']
+        assert [member['task_id'] for member
+                in kwargs['1']['batch']['members']] == ['1', '3']
+        assert 'batch' not in kwargs['2']
+        assert 'batch' not in kwargs['4']
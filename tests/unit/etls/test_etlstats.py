@@ -0,0 +1,54 @@
+"""This module provides tests for the etlstats module."""
+
+import time
+
+from fractalis import redis
+from fractalis.data import etlstats
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestETLStats:
+
+    def setup_method(self, method):
+        redis.delete(etlstats.ETL_METRICS_KEY, etlstats.HTTP_METRICS_KEY)
+
+    def teardown_method(self, method):
+        redis.delete(etlstats.ETL_METRICS_KEY, etlstats.HTTP_METRICS_KEY)
+
+    def test_phases_add_up_time_spent_in_them(self):
+        stats = etlstats.ETLStats()
+        stats.enter('extract')
+        time.sleep(0.01)
+        stats.enter('transform')
+        stats.enter('extract')
+        time.sleep(0.01)
+        stats.add('transform', rows=3, cells=9)
+        result = stats.finish()
+        assert list(result['phases']) == ['extract', 'transform']
+        assert result['phases']['extract']['wall_time'] >= 0.02
+        assert result['phases']['transform']['rows'] == 3
+        assert result['total']['cells'] == 9
+        assert result['total']['peak_rss'] > 0
+        assert result['total']['wall_time'] == \
+            sum(phase['wall_time'] for phase in result['phases'].values())
+
+    def test_record_aggregates_runs(self):
+        for _ in range(2):
+            stats = etlstats.ETLStats()
+            stats.enter('extract')
+            stats.add('extract', bytes_downloaded=100)
+            etlstats.record('foo_etl', stats.finish())
+        metrics = etlstats.get_metrics()
+        assert metrics['etl']['runs'] == 2
+        assert metrics['etl']['runs_by_etl'] == {'foo_etl': 2}
+        extract = metrics['etl']['phases']['extract']
+        assert extract['runs'] == 2
+        assert extract['bytes_downloaded'] == {'total': 200, 'mean': 100}
+        assert 'load' not in metrics['etl']['phases']
+        assert metrics['http']['requests'] == 0
+
+    def test_get_metrics_without_runs(self):
+        metrics = etlstats.get_metrics()
+        assert metrics['etl']['runs'] == 0
+        assert metrics['etl']['phases'] == {}
+        assert metrics['http'] == {}
@@ -0,0 +1,70 @@
+"""This module provides tests for the feature index."""
+
+import os
+
+import pytest
+import pandas as pd
+
+from fractalis import app
+from fractalis.data import feature_index, encryption
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestFeatureIndex:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'index_test')
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.file_path + feature_index.INDEX_SUFFIX):
+            os.remove(self.file_path + feature_index.INDEX_SUFFIX)
+
+    @staticmethod
+    def make_df():
+        return pd.DataFrame([[101, 'foo', 1], [101, 'bar', 2],
+                             [102, 'foo', 3], [102, 'bar', 4],
+                             [103, 'baz', 5], [103, 'foo', 6]],
+                            columns=['id', 'feature', 'value'])
+
+    def test_sort_keeps_order_within_feature(self):
+        df = feature_index.sort(self.make_df())
+        assert df['feature'].tolist() == ['bar', 'bar', 'baz',
+                                          'foo', 'foo', 'foo']
+        assert df['value'].tolist() == [2, 4, 5, 1, 3, 6]
+        assert df.index.tolist() == list(range(6))
+
+    def test_read_returns_none_without_index(self):
+        assert feature_index.read(self.file_path) is None
+
+    def test_write_and_read_returns_row_ranges(self):
+        df = feature_index.sort(self.make_df())
+        feature_index.write(df, self.file_path, 2)
+        index = feature_index.read(self.file_path)
+        assert index['row_group_size'] == 2
+        assert index['offsets'] == {'bar': [0, 2], 'baz': [2, 3],
+                                    'foo': [3, 6]}
+
+    def test_row_groups_covers_requested_features(self):
+        df = feature_index.sort(self.make_df())
+        feature_index.write(df, self.file_path, 2)
+        index = feature_index.read(self.file_path)
+        assert feature_index.row_groups(index, ['bar']) == [0]
+        assert feature_index.row_groups(index, ['baz']) == [1]
+        assert feature_index.row_groups(index, ['foo']) == [1, 2]
+        assert feature_index.row_groups(index, ['bar', 'abc']) == [0]
+        assert feature_index.row_groups(index, ['abc']) == []
+
+    def test_index_of_encrypted_cache_is_encrypted(self):
+        key = encryption.derive_key('foo')
+        df = feature_index.sort(self.make_df())
+        feature_index.write(df, self.file_path, 2, key)
+        with open(self.file_path + feature_index.INDEX_SUFFIX, 'rb') as f:
+            assert b'baz' not in f.read()
+        index = feature_index.read(self.file_path, key)
+        assert index['offsets'] == {'bar': [0, 2], 'baz': [2, 3],
+                                    'foo': [3, 6]}
+        with pytest.raises(ValueError) as e:
+            feature_index.read(self.file_path)
+        assert 'no key' in str(e.value)
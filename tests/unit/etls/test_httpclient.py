@@ -0,0 +1,78 @@
+"""This module provides tests for the pooled HTTP clients of the ETLs."""
+
+import pytest
+import requests
+import responses
+
+from fractalis.data import httpclient
+from fractalis.data.httpclient import HttpClient
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestHttpClient:
+
+    url = 'http://foo.bar/baz'
+
+    def test_get_client_returns_one_client_per_server(self):
+        client = httpclient.get_client('http://foo.bar')
+        assert httpclient.get_client('http://foo.bar/baz?a=b') is client
+        assert httpclient.get_client('https://foo.bar') is not client
+
+    def test_idempotent_request_is_retried(self):
+        client = HttpClient(pool_size=1, retries=2, backoff=0)
+        with responses.RequestsMock() as response:
+            response.add(response.GET, self.url, status=502)
+            response.add(response.GET, self.url, status=200, body='ok')
+            r = client.get(self.url)
+            assert r.status_code == 200
+            assert len(response.calls) == 2
+        assert client.stats['retries'] == 1
+        assert client.stats['requests'] == 2
+
+    def test_retries_are_bounded(self):
+        client = HttpClient(pool_size=1, retries=2, backoff=0)
+        with responses.RequestsMock() as response:
+            response.add(response.GET, self.url, status=503)
+            r = client.get(self.url)
+            assert r.status_code == 503
+            assert len(response.calls) == 3
+
+    def test_post_is_only_retried_if_idempotent(self):
+        client = HttpClient(pool_size=1, retries=2, backoff=0)
+        with responses.RequestsMock() as response:
+            response.add(response.POST, self.url, status=502)
+            assert client.post(self.url).status_code == 502
+            assert len(response.calls) == 1
+            client.post(self.url, idempotent=True)
+            assert len(response.calls) == 4
+
+    def test_connection_errors_are_raised_after_retries(self):
+        client = HttpClient(pool_size=1, retries=1, backoff=0)
+        with responses.RequestsMock() as response:
+            response.add(response.GET, self.url,
+                         body=requests.ConnectionError('refused'))
+            with pytest.raises(requests.ConnectionError):
+                client.get(self.url)
+            assert len(response.calls) == 2
+        assert client.stats['errors'] == 2
+
+    def test_wait_time_is_jittered_and_bounded(self):
+        client = HttpClient(pool_size=1, retries=1, backoff=1)
+        for attempt in range(10):
+            wait = client.wait_time(attempt)
+            assert 0 <= wait <= min(httpclient.MAX_BACKOFF, 2 ** attempt)
+
+    def test_cookies_of_responses_are_not_kept(self):
+        client = HttpClient(pool_size=1, retries=0, backoff=0)
+        with responses.RequestsMock() as response:
+            response.add(response.POST, 'http://foo.bar/login', status=200,
+                         headers={'Set-Cookie': 'PLAY2AUTH_SESS_ID=user-a'})
+            response.add(response.GET, self.url, status=200)
+            response.add(response.GET, self.url, status=200)
+            client.post('http://foo.bar/login')
+            client.get(self.url)
+            client.get(self.url, cookies={'PLAY2AUTH_SESS_ID': 'user-b'})
+            assert 'Cookie' not in response.calls[1].request.headers
+            assert response.calls[2].request.headers['Cookie'] == \
+                'PLAY2AUTH_SESS_ID=user-b'
+        assert len(client.session.cookies) == 0
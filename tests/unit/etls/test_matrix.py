@@ -0,0 +1,69 @@
+"""This module provides tests for the memory mapped matrix store."""
+
+import os
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+from fractalis import app
+from fractalis.data import matrix
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestMatrix:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'matrix_test')
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        df = pd.DataFrame([[101, 'foo', 5], [101, 'bar', 6],
+                           [102, 'foo', 10], [102, 'bar', 11],
+                           [103, 'foo', 15]],
+                          columns=['id', 'feature', 'value'])
+        matrix.write(df, self.file_path)
+
+    def teardown_method(self, method):
+        for file_path in glob(self.file_path + '.*'):
+            os.remove(file_path)
+
+    def test_exists(self):
+        assert matrix.exists(self.file_path)
+        assert not matrix.exists(self.file_path + 'foo')
+
+    def test_read_returns_pivoted_data(self):
+        df = matrix.read(self.file_path)
+        assert df.index.name == 'feature'
+        assert df.columns.name == 'id'
+        assert df.index.tolist() == ['bar', 'foo']
+        assert df.columns.tolist() == [101, 102, 103]
+        assert df.loc['foo'].tolist() == [5, 10, 15]
+        assert pd.isnull(df.loc['bar', 103])
+
+    def test_read_only_requested_features_and_ids(self):
+        df = matrix.read(self.file_path, features=['foo'], ids=[101, 103])
+        assert df.index.tolist() == ['foo']
+        assert df.columns.tolist() == [101, 103]
+        assert df.values.tolist() == [[5, 15]]
+
+    def test_read_drops_ids_without_value_for_requested_features(self):
+        df = matrix.read(self.file_path, features=['bar'])
+        assert df.index.tolist() == ['bar']
+        assert df.columns.tolist() == [101, 102]
+        df = matrix.read(self.file_path, features=['bar'], ids=[101, 103])
+        assert df.columns.tolist() == [101]
+
+    def test_read_keeps_ids_with_explicit_missing_values(self):
+        df = pd.DataFrame([[101, 'foo', 5], [101, 'bar', 6],
+                           [102, 'foo', 10], [102, 'bar', np.nan],
+                           [103, 'foo', np.nan]],
+                          columns=['id', 'feature', 'value'])
+        matrix.write(df, self.file_path)
+        df = matrix.read(self.file_path)
+        assert df.columns.tolist() == [101, 102, 103]
+        df = matrix.read(self.file_path, features=['bar'])
+        assert df.columns.tolist() == [101, 102]
+        df = matrix.read(self.file_path, features=['foo'])
+        assert df.columns.tolist() == [101, 102, 103]
+        df = matrix.read(self.file_path, features=['foo'], ids=[101, 103])
+        assert df.columns.tolist() == [101, 103]
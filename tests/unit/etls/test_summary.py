@@ -0,0 +1,59 @@
+"""This module provides tests for the numerical_array summaries."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from fractalis import app
+from fractalis.data import summary
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestSummary:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'summary_test')
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.file_path + summary.SUMMARY_SUFFIX):
+            os.remove(self.file_path + summary.SUMMARY_SUFFIX)
+
+    @staticmethod
+    def make_matrix():
+        return pd.DataFrame([[1, 2, np.nan], [3, 5, 7], [np.nan] * 3],
+                            index=pd.Index(['foo', 'bar', 'baz'],
+                                           name='feature'),
+                            columns=pd.Index([101, 102, 103], name='id'))
+
+    def test_compute_matches_pandas_and_numpy(self):
+        df = self.make_matrix()
+        stats = summary.compute(df, axis=1)
+        assert stats.index.tolist() == ['foo', 'bar', 'baz']
+        assert stats['count'].tolist() == [2, 3, 0]
+        assert np.allclose(stats['mean'], np.mean(df, axis=1),
+                           equal_nan=True)
+        assert np.allclose(stats['variance'], np.var(df, axis=1),
+                           equal_nan=True)
+        assert np.allclose(stats['median'], np.median(df, axis=1),
+                           equal_nan=True)
+        assert stats['min'].tolist()[:2] == [1, 3]
+        assert stats['max'].tolist()[:2] == [2, 7]
+
+    def test_compute_summarizes_ids(self):
+        stats = summary.compute(self.make_matrix(), axis=0)
+        assert stats.index.tolist() == [101, 102, 103]
+        assert stats['count'].tolist() == [2, 2, 1]
+        assert stats['mean'].tolist() == [2, 3.5, 7]
+
+    def test_read_returns_none_without_summary(self):
+        assert summary.read(self.file_path) is None
+
+    def test_write_and_read(self):
+        df = self.make_matrix()
+        summary.write(df, self.file_path)
+        stats = summary.read(self.file_path)
+        assert stats['feature'].equals(summary.compute(df, axis=1))
+        assert stats['id'].equals(summary.compute(df, axis=0))
@@ -1,10 +1,13 @@
 """This module provides test for the numerical data ETL for tranSMART"""
 
+import io
 import json
 
+import numpy as np
 import pytest
 import responses
 
+from fractalis.data.etls.transmart import shared
 from fractalis.data.etls.transmart.etl_numerical import NumericalETL
 
 
@@ -76,3 +79,23 @@ class TestNumericalETL:
             assert df.shape == (1, 3)
             assert df.values.tolist() == [['3052', 'value', 52.0]]
             assert list(df) == ['id', 'feature', 'value']
+
+    def test_parse_observations_decodes_cells_in_batches(self):
+        body = {
+            "dimensionDeclarations": [{"name": "patient"}],
+            "cells": [{"dimensionIndexes": [1, None], "numericValue": 1.5},
+                      {"dimensionIndexes": [0], "numericValue": None},
+                      {"dimensionIndexes": [1, 0], "numericValue": 3}],
+            "dimensionElements": {"patient": [{"inTrialId": "a"},
+                                              {"inTrialId": "b"}]}
+        }
+        stream = io.BytesIO(json.dumps(body).encode('utf-8'))
+        raw_data = shared.parse_observations(stream, shared.NUMERICAL_FIELD,
+                                             batch_size=2)
+        assert raw_data['dimensionElements'] == body['dimensionElements']
+        assert raw_data['dimensionIndexes'].tolist() == [[1, -1], [0, -1],
+                                                         [1, 0]]
+        assert np.allclose(raw_data['values'], [1.5, np.nan, 3],
+                           equal_nan=True)
+        df = self.etl.transform(raw_data=raw_data, descriptor=self.descriptor)
+        assert df['id'].tolist() == ['b', 'a', 'b']
@@ -1,5 +1,7 @@
 """This module provides tests for the transmart etl handler."""
 
+import json
+
 import pytest
 import responses
 
@@ -95,3 +97,31 @@ class TestTransmartHandler:
                                  auth={'user': 'foo', 'passwd': 'bar', 'authServiceType': 'transmart'})
             assert '[400]' in str(e.value)
 
+    def test_validate_access_requires_access_to_observations(self):
+        tmh = TransmartHandler(server='http://foo.bar', auth={'token': 'foo'})
+        descriptor = {'constraint': {'type': 'true'},
+                      'data_type': 'numerical'}
+        with responses.RequestsMock(
+                assert_all_requests_are_fired=False) as response:
+            response.add(response.POST,
+                         'http://foo.bar/v2/observations/counts',
+                         body='{"observationCount": 10}', status=200,
+                         content_type='application/json')
+            response.add(response.POST, 'http://foo.bar/v2/observations',
+                         body='{"error": "forbidden"}', status=403,
+                         content_type='application/json')
+            assert not tmh.validate_access(descriptor)
+
+    def test_validate_access_requests_first_observation_only(self):
+        tmh = TransmartHandler(server='http://foo.bar', auth={'token': 'foo'})
+        descriptor = {'constraint': {'type': 'true'},
+                      'data_type': 'numerical'}
+        with responses.RequestsMock() as response:
+            response.add(response.POST, 'http://foo.bar/v2/observations',
+                         body='{"cells": []}', status=200,
+                         content_type='application/json')
+            assert tmh.validate_access(descriptor)
+            body = json.loads(response.calls[0].request.body)
+            assert body['limit'] == 1
+            assert body['constraint'] == {'type': 'true'}
+            assert body['type'] == 'clinical'
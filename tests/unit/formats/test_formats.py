@@ -0,0 +1,83 @@
+"""This module provides tests for the cache format implementations."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from fractalis import app
+from fractalis.data.cache import CacheFormat
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestCacheFormats:
+
+    file_path = os.path.join(app.config['FRACTALIS_TMP_DIR'], 'format_test')
+
+    def setup_method(self, method):
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    @staticmethod
+    def make_df(rows):
+        return pd.DataFrame([[str(i), 'foo', float(i)] for i in range(rows)],
+                            columns=['id', 'feature', 'value'])
+
+    def test_factory_raises_for_unknown_format(self):
+        with pytest.raises(NotImplementedError):
+            CacheFormat.factory('foo')
+
+    @pytest.mark.parametrize('name', ['pickle', 'parquet', 'feather'])
+    def test_write_and_read_returns_same_data(self, name):
+        cache_format = CacheFormat.factory(name)
+        df = self.make_df(10)
+        cache_format.write(df, self.file_path)
+        result = cache_format.read(self.file_path)
+        assert result.values.tolist() == df.values.tolist()
+        assert list(result) == list(df)
+
+    @pytest.mark.parametrize('name', ['pickle', 'parquet', 'feather'])
+    def test_read_only_requested_columns(self, name):
+        cache_format = CacheFormat.factory(name)
+        df = self.make_df(10)
+        cache_format.write(df, self.file_path)
+        result = cache_format.read(self.file_path, columns=['id', 'value'])
+        assert list(result) == ['id', 'value']
+        assert result['value'].tolist() == df['value'].tolist()
+
+    @pytest.mark.parametrize('name', ['pickle', 'parquet', 'feather'])
+    def test_read_only_requested_row_groups(self, name, monkeypatch):
+        cache_format = CacheFormat.factory(name)
+        monkeypatch.setattr(cache_format, 'row_group_size', 4)
+        df = self.make_df(10)
+        cache_format.write(df, self.file_path)
+        result = cache_format.read(self.file_path, row_groups=[0, 2])
+        assert result['id'].tolist() == ['0', '1', '2', '3', '8', '9']
+
+    @pytest.mark.parametrize('name', ['pickle', 'parquet', 'feather'])
+    def test_writer_appends_frames(self, name):
+        cache_format = CacheFormat.factory(name)
+        df = self.make_df(10)
+        with cache_format.open_writer(self.file_path) as writer:
+            writer.append(df[:4])
+            writer.append(df[4:])
+        result = cache_format.read(self.file_path)
+        assert result.values.tolist() == df.values.tolist()
+
+    @pytest.mark.parametrize('codec', ['none', 'gzip', 'lz4', 'zstd:3'])
+    def test_pickle_write_and_read_with_codec(self, codec):
+        cache_format = CacheFormat.factory('pickle')
+        cache_format.codec = codec
+        df = self.make_df(10)
+        cache_format.write(df, self.file_path)
+        result = cache_format.read(self.file_path)
+        assert result.equals(df)
+
+    def test_pickle_reads_legacy_files(self):
+        df = self.make_df(10)
+        df.to_pickle(self.file_path, compression='gzip')
+        result = CacheFormat.factory('pickle').read(self.file_path)
+        assert result.equals(df)
@@ -59,3 +59,17 @@ class TestCategoricalIntegrityCheck:
         with pytest.raises(ValueError) as e:
             self.checker.check(df)
             assert 'must be unique' in e
+
+    def test_correct_check_9(self):
+        df = pd.DataFrame([['1', '2', '3'], ['4', '2', '3']],
+                          columns=['id', 'feature', 'value'])
+        df = df.astype('category')
+        self.checker.check(df)
+
+    def test_correct_check_10(self):
+        df = pd.DataFrame([['1', '2', 3], ['4', '2', 3]],
+                          columns=['id', 'feature', 'value'])
+        df['value'] = df['value'].astype('category')
+        with pytest.raises(ValueError) as e:
+            self.checker.check(df)
+            assert "must be of type 'object'" in e
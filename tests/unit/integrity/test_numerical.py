@@ -59,3 +59,12 @@ class TestNumericalIntegrityCheck:
         with pytest.raises(ValueError) as e:
             self.checker.check(df)
             assert 'must be unique' in e
+
+    def test_check_chunk_detects_several_features_across_chunks(self):
+        df1 = pd.DataFrame([['1', '2', 3]], columns=['id', 'feature', 'value'])
+        df2 = pd.DataFrame([['4', '4', 3]], columns=['id', 'feature', 'value'])
+        self.checker.start()
+        self.checker.check_chunk(df1)
+        with pytest.raises(ValueError) as e:
+            self.checker.check_chunk(df2)
+        assert 'must contain exactly one' in str(e.value)
@@ -57,3 +57,89 @@ class TestNumericalArrayIntegrityCheck:
         with pytest.raises(ValueError) as e:
             self.checker.check(df)
             assert "must be unique" in e
+
+    def test_correct_check_9(self):
+        df = pd.DataFrame([['1', '2', 3], ['1', '4', 3], ['4', '2', 3]],
+                          columns=['id', 'feature', 'value'])
+        df['id'] = df['id'].astype('category')
+        df['feature'] = df['feature'].astype('category')
+        self.checker.check(df)
+
+    def test_correct_check_10(self):
+        df = pd.DataFrame([['1', '2', 3], ['1', '4', 3], ['1', '2', 3]],
+                          columns=['id', 'feature', 'value'])
+        df['id'] = df['id'].astype('category')
+        df['feature'] = df['feature'].astype('category')
+        with pytest.raises(ValueError) as e:
+            self.checker.check(df)
+            assert "must be unique" in e
+
+    def test_check_chunk_detects_duplicates_across_chunks(self):
+        df1 = pd.DataFrame([['1', '2', 3], ['1', '4', 3]],
+                           columns=['id', 'feature', 'value'])
+        df2 = pd.DataFrame([['4', '2', 3], ['1', '4', 5]],
+                           columns=['id', 'feature', 'value'])
+        self.checker.start()
+        self.checker.check_chunk(df1)
+        self.checker.check_chunk(df2)
+        with pytest.raises(ValueError) as e:
+            self.checker.finish()
+        assert 'must be unique' in str(e.value)
+
+    def test_check_chunk_accepts_unique_chunks(self):
+        df1 = pd.DataFrame([['1', '2', 3], ['1', '4', 3]],
+                           columns=['id', 'feature', 'value'])
+        df2 = pd.DataFrame([['4', '2', 3], ['4', '4', 5]],
+                           columns=['id', 'feature', 'value'])
+        self.checker.start()
+        self.checker.check_chunk(df1)
+        self.checker.check_chunk(df2)
+        self.checker.finish()
+
+    def test_sampled_check_still_checks_types(self):
+        checker = IntegrityCheck.factory('numerical_array', sample_size=2)
+        df = pd.DataFrame([['1', str(i), '3'] for i in range(10)],
+                          columns=['id', 'feature', 'value'])
+        with pytest.raises(ValueError) as e:
+            checker.check(df)
+        assert "'value' column must be of type" in str(e.value)
+
+    def test_sample_keeps_duplicates_together(self):
+        checker = IntegrityCheck.factory('numerical_array', sample_size=20)
+        df = pd.DataFrame([[str(i), 'foo', 3] for i in range(1000)] * 2,
+                          columns=['id', 'feature', 'value'])
+        sample = checker.sample(df)
+        assert 0 < sample.shape[0] < df.shape[0]
+        assert (sample['id'].value_counts() == 2).all()
+
+    def test_sampled_check_detects_duplicates(self):
+        checker = IntegrityCheck.factory('numerical_array', sample_size=20)
+        df = pd.DataFrame([[str(i), 'foo', 3] for i in range(1000)] * 2,
+                          columns=['id', 'feature', 'value'])
+        with pytest.raises(ValueError) as e:
+            checker.check(df)
+        assert 'must be unique' in str(e.value)
+        df['id'] = df['id'].astype('category')
+        with pytest.raises(ValueError) as e:
+            checker.check(df)
+        assert 'must be unique' in str(e.value)
+
+    def test_sampled_check_chunk_detects_duplicates_across_chunks(self):
+        checker = IntegrityCheck.factory('numerical_array', sample_size=20)
+        df = pd.DataFrame([[str(i), 'foo', 3] for i in range(1000)],
+                          columns=['id', 'feature', 'value'])
+        checker.start()
+        checker.check_chunk(df)
+        checker.check_chunk(df.iloc[::-1])
+        with pytest.raises(ValueError) as e:
+            checker.finish()
+        assert 'must be unique' in str(e.value)
+
+    def test_has_duplicates_compares_combinations(self):
+        df = pd.DataFrame([['1', '2'], ['2', '1'], ['1', None], [None, '1']],
+                          columns=['id', 'feature'])
+        assert not self.checker.has_duplicates(df, ['id', 'feature'])
+        assert self.checker.has_duplicates(df, ['id'])
+        df = df.append(pd.DataFrame([['1', None]], columns=['id', 'feature']))
+        df['id'] = df['id'].astype('category')
+        assert self.checker.has_duplicates(df, ['id', 'feature'])
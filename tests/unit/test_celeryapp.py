@@ -0,0 +1,79 @@
+"""This module provides tests for the routing of celery tasks."""
+
+import pytest
+
+from fractalis import app, celery
+from fractalis.celeryapp import route_task, check_priority_class, \
+    warm_up_r_pool
+from fractalis.analytics.tasks.shared import rpool
+from fractalis.analytics.tasks.heatmap.main import HeatmapTask
+from fractalis.analytics.tasks.histogram.main import HistogramTask
+from fractalis.data.etls.ada.etl_integer import IntegerETL
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestRouting:
+
+    queues = app.config['FRACTALIS_TASK_QUEUES']
+
+    def test_etls_are_routed_to_etl_queue(self):
+        route = route_task(IntegerETL.name, (), {}, {})
+        assert route == {'queue': self.queues['etl']}
+
+    def test_analytics_are_routed_to_their_priority_class(self):
+        route = route_task(HistogramTask.name, (), {}, {})
+        assert route == {'queue': self.queues['interactive']}
+        route = route_task(HeatmapTask.name, (), {}, {})
+        assert route == {'queue': self.queues['heavy']}
+
+    def test_other_tasks_are_routed_to_default_class(self):
+        route = route_task('fractalis.cleanup.janitor', (), {}, {})
+        default = app.config['FRACTALIS_DEFAULT_PRIORITY_CLASS']
+        assert route == {'queue': self.queues[default]}
+
+    def test_router_is_used_by_celery(self):
+        queue = celery.amqp.router.route({}, HeatmapTask.name)['queue']
+        assert queue.name == self.queues['heavy']
+
+    def test_unknown_priority_class_raises(self):
+        class FooTask(HistogramTask):
+            priority_class = 'foo'
+        with pytest.raises(ValueError) as e:
+            check_priority_class(FooTask)
+        assert 'no queue' in str(e.value)
+
+
+# noinspection PyMissingOrEmptyDocstring,PyMissingTypeHints
+class TestWarmUp:
+
+    queues = app.config['FRACTALIS_TASK_QUEUES']
+
+    @pytest.fixture
+    def warmed_up(self, monkeypatch):
+        warmed_up = []
+
+        class Pool:
+            def warm_up(self):
+                warmed_up.append(True)
+        monkeypatch.setattr(rpool, 'get_pool', Pool)
+        return warmed_up
+
+    @pytest.mark.parametrize('priority_class, expected', [
+        ('heavy', [True]),
+        ('interactive', []),
+        ('etl', [])
+    ])
+    def test_r_pool_is_only_warmed_up_by_heavy_workers(
+            self, monkeypatch, warmed_up, priority_class, expected):
+        monkeypatch.setattr(celery.amqp.queues, '_consume_from',
+                            {self.queues[priority_class]: None})
+        warm_up_r_pool()
+        assert warmed_up == expected
+
+    def test_r_pool_is_not_warmed_up_if_disabled(self, monkeypatch,
+                                                 warmed_up):
+        monkeypatch.setattr(celery.amqp.queues, '_consume_from',
+                            {self.queues['heavy']: None})
+        monkeypatch.setitem(app.config, 'FRACTALIS_R_POOL_WARM_UP', False)
+        warm_up_r_pool()
+        assert not warmed_up
@@ -86,3 +86,24 @@ class TestCleanup:
         monkeypatch.setattr(celery, 'AsyncResult', FakeAsyncResult)
         janitor()
         assert redis.exists('data:123')
+
+    def test_janitor_removes_shared_data_without_live_session(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = os.path.join(self.data_dir, '123')
+        Path(path).touch()
+        redis.set('data:123', json.dumps({'file_path': path}))
+        redis.sadd('refs:123', 'abc', 'def')
+        janitor()
+        assert not redis.exists('data:123')
+        assert not os.path.exists(path)
+
+    def test_janitor_keeps_shared_data_with_live_session(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = os.path.join(self.data_dir, '123')
+        Path(path).touch()
+        redis.set('data:123', json.dumps({'file_path': path}))
+        redis.sadd('refs:123', 'abc', 'def')
+        redis.set('session:def', '{}')
+        janitor()
+        assert redis.exists('data:123')
+        assert os.path.exists(path)